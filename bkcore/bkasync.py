@@ -0,0 +1,215 @@
+"""
+Asyncio search front-end with request coalescing and micro-batching
+"""
+# --- Imports
+
+# Standard library
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+# --- Async Search Class
+
+class AsyncBKIndex:
+    """
+    Asyncio front-end for searches of a tree or other index
+
+    Searches run in a thread executor rather than on the event loop.  By
+    default this is a single worker thread, which serializes access to the
+    tree so that update can run alongside searches; a BKSearchPool can be
+    passed as the tree to spread the work of each batch over processes.
+
+    Concurrent searches for the same string and threshold are coalesced into
+    one computation whose result every caller receives.  Distinct searches
+    queued during the same event loop iteration, or within batch_delay
+    seconds, are micro-batched into one call of the tree's search_many or
+    nearest_neighbors_many method, so they share a single traversal, with
+    at most batch_size search strings per batch.
+
+    At most max_pending distinct searches are queued or running at a time,
+    and further searches wait for one of them to finish.  With max_waiting
+    set, a search arriving while that many searches are already waiting
+    raises asyncio.QueueFull instead, so that bursts are shed rather than
+    queued without bound.  coalesced and batches count the searches that
+    joined a computation already in progress and the batches run.
+    """
+    def __init__(self, tree, executor=None, batch_size=64, batch_delay=0.0,
+                 max_pending=1024, max_waiting=None):
+        self.tree = tree
+        self.own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=1)
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_pending = max_pending
+        self.max_waiting = max_waiting
+        self.inflight = {}
+        self.queues = {}
+        self.flush_handle = None
+        self.slots = None
+        self.waiting = 0
+        self.coalesced = 0
+        self.batches = 0
+
+    def __str__(self):
+        return str(self.tree)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Shut down the executor, if it was created by this index.
+        """
+        if self.own_executor:
+            self.executor.shutdown()
+
+    def count(self):
+        """
+        Get total number of strings in tree.
+        """
+        return self.tree.count()
+
+    async def search(self, search_string, threshold=0):
+        """
+        Get list of strings within threshold value from search string.
+
+        Exceptions
+        ----------
+        asyncio.QueueFull - max_waiting searches are already waiting
+        """
+        return list(await self.submit('search', search_string, threshold))
+
+    async def nearest_neighbors(self, search_string):
+        """
+        Get lowest string distance from search string and list of strings
+        found at that distance.
+
+        Exceptions
+        ----------
+        asyncio.QueueFull - max_waiting searches are already waiting
+        """
+        distance, strings = await self.submit('nearest', search_string, None)
+        return distance, list(strings)
+
+    async def update(self, strings=None):
+        """
+        Add strings to tree in the executor.  With the default executor,
+        the update runs between batches of searches.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.tree.update, strings)
+
+    async def submit(self, mode, search_string, parameter):
+        """
+        Get result of search, joining the computation of an identical search
+        in progress or queueing a new one.
+        """
+        key = (mode, search_string, parameter)
+        future = self.inflight.get(key)
+        if future is None:
+            await self.acquire()
+            future = self.inflight.get(key)
+            if future is None:
+                loop = asyncio.get_running_loop()
+                future = self.inflight[key] = loop.create_future()
+                queue = self.queues.setdefault((mode, parameter), [])
+                queue.append(search_string)
+                self.schedule_flush(loop, len(queue) >= self.batch_size)
+            else:
+                self.slots.release()
+                self.coalesced += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    async def acquire(self):
+        """
+        Wait for one of max_pending slots for a new search.
+
+        Exceptions
+        ----------
+        asyncio.QueueFull - max_waiting searches are already waiting
+        """
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_pending)
+        if self.slots.locked() and self.max_waiting is not None and \
+                self.waiting >= self.max_waiting:
+            raise asyncio.QueueFull('%d searches are already waiting'
+                                    % (self.waiting,))
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+
+    def schedule_flush(self, loop, full=False):
+        """
+        Schedule queued searches to be submitted to the executor at the end
+        of the current event loop iteration, or after batch_delay, or at
+        once if a queue is full.
+        """
+        if full:
+            if self.flush_handle is not None:
+                self.flush_handle.cancel()
+            self.flush()
+        elif self.flush_handle is None:
+            if self.batch_delay:
+                self.flush_handle = loop.call_later(self.batch_delay,
+                                                    self.flush)
+            else:
+                self.flush_handle = loop.call_soon(self.flush)
+
+    def flush(self):
+        """
+        Submit queued searches to the executor in batches of up to
+        batch_size search strings.
+        """
+        self.flush_handle = None
+        queues = self.queues
+        self.queues = {}
+        loop = asyncio.get_running_loop()
+        for (mode, parameter), search_strings in queues.items():
+            for start in range(0, len(search_strings), self.batch_size):
+                batch = search_strings[start:start + self.batch_size]
+                self.batches += 1
+                run = loop.run_in_executor(self.executor, self.run_batch,
+                                           mode, parameter, batch)
+                run.add_done_callback(partial(self.complete, mode,
+                                              parameter, batch))
+
+    def run_batch(self, mode, parameter, search_strings):
+        """
+        Search tree for a batch of search strings, in one traversal if the
+        tree supports it.  Runs in the executor.
+        """
+        if mode == 'search':
+            if hasattr(self.tree, 'search_many'):
+                return self.tree.search_many(search_strings, parameter)
+            return [self.tree.search(search_string, parameter)
+                    for search_string in search_strings]
+        if hasattr(self.tree, 'nearest_neighbors_many'):
+            return self.tree.nearest_neighbors_many(search_strings)
+        return [self.tree.nearest_neighbors(search_string)
+                for search_string in search_strings]
+
+    def complete(self, mode, parameter, search_strings, run):
+        """
+        Deliver the results of a batch, or its exception, to the searches
+        waiting for them and release their slots.
+        """
+        exception = None if run.cancelled() else run.exception()
+        for position, search_string in enumerate(search_strings):
+            future = self.inflight.pop((mode, search_string, parameter))
+            self.slots.release()
+            if future.done():
+                continue
+            if run.cancelled():
+                future.cancel()
+            elif exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(run.result()[position])
@@ -0,0 +1,501 @@
+"""
+Benchmark suite for tree construction, searches and string distance kernels
+
+Run as a script to benchmark synthetic corpora and write the results as
+JSON, for comparison between releases:
+
+    python bkbench.py --sizes 10000 100000 --output results.json
+"""
+# --- Imports
+
+# Standard library
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+# BKTree
+from bktree import BKTree
+from bktree import bk_nearest_neighbor_search
+from bktree import bk_search
+
+# String distance metrics
+from strdistlib import calculate_levenshtein_distance
+from strdistlib import calculate_bounded_levenshtein_distance
+from strdistlib import LevenshteinPattern
+from strdistlib import calculate_bit_parallel_levenshtein_distance
+from strdistlib import generate_symbol_histogram
+from strdistlib import calculate_histogram_lower_bound
+from strdistlib import calculate_lc_substring_length
+from strdistlib import calculate_hamming_distance
+from strdistlib import count_hamming_mismatches
+from strdistlib import generate_q_gram_matrix
+from strdistlib import generate_q_gram_profile
+from strdistlib import count_shared_q_grams
+from strdistlib import calculate_q_gram_profile_distance
+from strdistlib import calculate_jaccard_profile_distance
+from strdistlib import calculate_q_gram_distance
+from strdistlib import calculate_jaccard_distance
+from strdistlib import encode_strings
+from strdistlib import calculate_levenshtein_distances
+from strdistlib import calculate_hamming_distances
+from strdistlib import calculate_q_gram_distances
+from strdistlib import calculate_jaccard_distances
+from strdistlib import DistanceMemo
+from strdistlib import numpy
+
+
+# --- Benchmark Parameters
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+DEFAULT_THRESHOLDS = (1, 2, 3)
+PERCENTILES = (50, 90, 99)
+
+# Kernels of strdistlib, with the form of their arguments: 'pair' takes two
+# strings, 'pair_q' two strings and a q-gram window size, 'bounded' two
+# strings and a maximum distance, 'equal_pair' two strings of equal length,
+# 'single' and 'single_q' one string, 'histogram' and 'profile' the
+# histograms and q-gram profiles of two strings, 'pattern' a pattern built
+# from one string applied to another, 'memo' two strings looked up in a
+# DistanceMemo created empty for each run, so every lookup misses and
+# computes the distance, and 'many', 'many_q' and 'batch' a search string
+# and a list of strings.  The vectorized kernels need NumPy.
+KERNELS = {
+    'calculate_levenshtein_distance':
+        ('pair', calculate_levenshtein_distance),
+    'calculate_bounded_levenshtein_distance':
+        ('bounded', calculate_bounded_levenshtein_distance),
+    'LevenshteinPattern.distance': ('pattern', LevenshteinPattern),
+    'calculate_bit_parallel_levenshtein_distance':
+        ('pair', calculate_bit_parallel_levenshtein_distance),
+    'generate_symbol_histogram': ('single', generate_symbol_histogram),
+    'calculate_histogram_lower_bound':
+        ('histogram', calculate_histogram_lower_bound),
+    'calculate_lc_substring_length':
+        ('pair', calculate_lc_substring_length),
+    'calculate_hamming_distance': ('pair', calculate_hamming_distance),
+    'count_hamming_mismatches': ('equal_pair', count_hamming_mismatches),
+    'generate_q_gram_matrix': ('pair_q', generate_q_gram_matrix),
+    'generate_q_gram_profile': ('single_q', generate_q_gram_profile),
+    'count_shared_q_grams': ('profile', count_shared_q_grams),
+    'calculate_q_gram_profile_distance':
+        ('profile', calculate_q_gram_profile_distance),
+    'calculate_jaccard_profile_distance':
+        ('profile', calculate_jaccard_profile_distance),
+    'calculate_q_gram_distance': ('pair_q', calculate_q_gram_distance),
+    'calculate_jaccard_distance': ('pair_q', calculate_jaccard_distance),
+    'DistanceMemo': ('memo', DistanceMemo),
+    'encode_strings': ('batch', encode_strings),
+    'calculate_levenshtein_distances':
+        ('many', calculate_levenshtein_distances),
+    'calculate_hamming_distances': ('many', calculate_hamming_distances),
+    'calculate_q_gram_distances': ('many_q', calculate_q_gram_distances),
+    'calculate_jaccard_distances': ('many_q', calculate_jaccard_distances),
+}
+VECTORIZED_KERNELS = ('encode_strings', 'calculate_levenshtein_distances',
+                      'calculate_hamming_distances',
+                      'calculate_q_gram_distances',
+                      'calculate_jaccard_distances')
+
+
+# --- Synthetic Corpora
+
+def generate_corpus(size, min_length=4, max_length=12,
+                    alphabet='abcdefghijklmnopqrstuvwxyz',
+                    length_distribution='uniform',
+                    symbol_distribution='uniform', seed=0):
+    """
+    Generate a reproducible list of random strings.
+
+    Parameters
+    ----------
+    size : int
+        number of strings
+    min_length : int
+        minimum string length
+    max_length : int
+        maximum string length
+    alphabet : str
+        symbols strings are made of
+    length_distribution : str
+        'uniform' for lengths drawn uniformly from the range, or 'normal'
+        for lengths concentrated around its middle
+    symbol_distribution : str
+        'uniform' for equally frequent symbols, or 'zipf' for symbol
+        frequencies inversely proportional to their rank in alphabet, as in
+        natural language text
+    seed : int
+        random number generator seed
+
+    Return value
+    ------------
+    strings : list
+        generated strings, possibly with duplicates
+
+    Exceptions
+    ----------
+    ValueError - unknown distribution
+    """
+    if length_distribution not in ('uniform', 'normal'):
+        raise ValueError('Unknown length distribution: %r'
+                         % (length_distribution,))
+    if symbol_distribution not in ('uniform', 'zipf'):
+        raise ValueError('Unknown symbol distribution: %r'
+                         % (symbol_distribution,))
+    generator = random.Random(seed)
+    symbols = list(alphabet)
+    if symbol_distribution == 'zipf':
+        weights = [1.0 / rank for rank in range(1, len(symbols) + 1)]
+    else:
+        weights = None
+    middle = (min_length + max_length) / 2.0
+    deviation = (max_length - min_length) / 4.0
+    strings = []
+    for string in range(size):
+        if length_distribution == 'uniform':
+            length = generator.randint(min_length, max_length)
+        else:
+            length = int(round(generator.gauss(middle, deviation)))
+            length = min(max(length, min_length), max_length)
+        strings.append(''.join(generator.choices(symbols, weights,
+                                                 k=length)))
+    return strings
+
+
+def generate_queries(strings, count, max_edits=2, alphabet=None, seed=0):
+    """
+    Generate search strings by applying up to max_edits random
+    substitutions, insertions and deletions to strings drawn from a corpus,
+    with symbols drawn from alphabet, or from the corpus by default.
+    """
+    generator = random.Random(seed)
+    symbols = sorted(set(alphabet or ''.join(strings[:1000]))) or ['a']
+    queries = []
+    for query in range(count):
+        string = list(generator.choice(strings))
+        for edit in range(generator.randint(0, max_edits)):
+            operation = generator.choice(('substitute', 'insert', 'delete'))
+            position = generator.randint(0, len(string))
+            if operation == 'insert':
+                string.insert(position, generator.choice(symbols))
+            elif string and position < len(string):
+                if operation == 'delete':
+                    del string[position]
+                else:
+                    string[position] = generator.choice(symbols)
+        queries.append(''.join(string))
+    return queries
+
+
+# --- Measurements
+
+def summarize(latencies):
+    """
+    Get the mean, maximum and percentiles of a list of latencies in
+    seconds, by the nearest-rank method.
+    """
+    ordered = sorted(latencies)
+    summary = {'count': len(ordered),
+               'mean': sum(ordered) / len(ordered) if ordered else None,
+               'max': ordered[-1] if ordered else None}
+    for percentile in PERCENTILES:
+        if ordered:
+            rank = max(int(-(-percentile * len(ordered) // 100)), 1)
+            summary['p%d' % percentile] = ordered[rank - 1]
+        else:
+            summary['p%d' % percentile] = None
+    return summary
+
+
+def measure_tree_memory(tree):
+    """
+    Get the number of bytes held by the nodes of tree: the nodes themselves
+    with their child tables, profiles, signatures, payload lists and leaf
+    buckets.  The strings are not counted, since the tree shares them with
+    the list it was built from.
+    """
+    allocated = 0
+    stack = [tree.root]
+    while stack:
+        node = stack.pop()
+        allocated += (sys.getsizeof(node) + sys.getsizeof(node.children) +
+                      sys.getsizeof(node.edges))
+        for value in [node.signatures, node.payloads]:
+            if value is not None:
+                allocated += sys.getsizeof(value)
+        if node.profile is not node.string:
+            allocated += sys.getsizeof(node.profile)
+        if node.bucket is not None:
+            allocated += (sys.getsizeof(node.bucket) +
+                          sys.getsizeof(node.bucket.records) +
+                          sys.getsizeof(node.bucket.distances))
+            stack.extend(node.bucket)
+        stack.extend(node.children.values())
+    return allocated
+
+
+def measure_build(strings, **options):
+    """
+    Build tree from strings and measure build time and memory.
+
+    The tree is built once, and its memory is measured by walking the
+    built tree rather than by tracing allocations, which would slow the
+    timed construction down.
+
+    Return values
+    -------------
+    tree : BKTree
+        built tree
+    result : dict
+        build time in seconds, strings per second, number of nodes and bytes
+        held per node
+    """
+    start = time.perf_counter()
+    tree = BKTree(strings, **options)
+    seconds = time.perf_counter() - start
+    nodes = tree.count()
+    allocated = measure_tree_memory(tree)
+    return tree, {'seconds': seconds,
+                  'strings_per_second': len(strings) / seconds
+                  if seconds else None,
+                  'nodes': nodes,
+                  'bytes_per_node': allocated / nodes if nodes else None}
+
+
+def measure_searches(tree, queries, thresholds=DEFAULT_THRESHOLDS):
+    """
+    Measure latency of bk_search at each threshold and of
+    bk_nearest_neighbor_search for each of queries.
+
+    Return value
+    ------------
+    result : dict
+        latency summary and mean number of matches, keyed by
+        'bk_search_<threshold>' and 'bk_nearest_neighbor_search'
+    """
+    results = {}
+    for threshold in thresholds:
+        latencies = []
+        matches = 0
+        for query in queries:
+            start = time.perf_counter()
+            found = bk_search(query, tree, threshold)
+            latencies.append(time.perf_counter() - start)
+            matches += len(found) - 1
+        summary = summarize(latencies)
+        summary['mean_matches'] = matches / len(queries) if queries else None
+        results['bk_search_%s' % (threshold,)] = summary
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        bk_nearest_neighbor_search(query, tree)
+        latencies.append(time.perf_counter() - start)
+    results['bk_nearest_neighbor_search'] = summarize(latencies)
+    return results
+
+
+def kernel_calls(kind, kernel, strings, q_value=2):
+    """
+    Get a function making the calls to kernel benchmarked for strings, and
+    the number of string pairs it computes.  Arguments such as profiles are
+    prepared beforehand, so only the kernel itself is timed.
+    """
+    pairs = list(zip(strings, strings[1:] + strings[:1]))
+    if kind == 'pair':
+        return lambda: [kernel(string1, string2)
+                        for string1, string2 in pairs], len(pairs)
+    if kind == 'pair_q':
+        return lambda: [kernel(string1, string2, q_value)
+                        for string1, string2 in pairs], len(pairs)
+    if kind == 'bounded':
+        return lambda: [kernel(string1, string2, 2)
+                        for string1, string2 in pairs], len(pairs)
+    if kind == 'equal_pair':
+        pairs = [(string1, (string2 * len(string1))[:len(string1)]
+                  if string2 else string1)
+                 for string1, string2 in pairs]
+        return lambda: [kernel(string1, string2)
+                        for string1, string2 in pairs], len(pairs)
+    if kind == 'single':
+        return lambda: [kernel(string) for string in strings], len(strings)
+    if kind == 'single_q':
+        return lambda: [kernel(string, q_value)
+                        for string in strings], len(strings)
+    if kind == 'histogram':
+        pairs = [(generate_symbol_histogram(string1),
+                  generate_symbol_histogram(string2))
+                 for string1, string2 in pairs]
+        return lambda: [kernel(histogram1, histogram2)
+                        for histogram1, histogram2 in pairs], len(pairs)
+    if kind == 'profile':
+        pairs = [(generate_q_gram_profile(string1, q_value),
+                  generate_q_gram_profile(string2, q_value))
+                 for string1, string2 in pairs]
+        return lambda: [kernel(profile1, profile2)
+                        for profile1, profile2 in pairs], len(pairs)
+    if kind == 'pattern':
+        patterns = [(kernel(string1), string2) for string1, string2 in pairs]
+        return lambda: [pattern.distance(string2)
+                        for pattern, string2 in patterns], len(pairs)
+    if kind == 'memo':
+        # Each run gets an empty memo, so that the distances computed by one
+        # run are not served from the cache to the next
+        def run():
+            memo = kernel(calculate_levenshtein_distance)
+            return [memo(string1, string2) for string1, string2 in pairs]
+        return run, len(pairs)
+    if kind == 'batch':
+        return lambda: kernel(strings), len(strings)
+    if kind == 'many':
+        return lambda: kernel(strings[0], strings), len(strings)
+    if kind == 'many_q':
+        return lambda: kernel(strings[0], strings, q_value), len(strings)
+    raise ValueError('Unknown kernel argument form: %r' % (kind,))
+
+
+def measure_kernels(strings, q_value=2, repeat=3):
+    """
+    Measure throughput of every kernel in KERNELS on strings, taking the
+    best of repeat runs.
+
+    Return value
+    ------------
+    result : dict
+        string pairs per second for each kernel, or None for vectorized
+        kernels when NumPy is not installed
+    """
+    results = {}
+    for name, (kind, kernel) in KERNELS.items():
+        if name in VECTORIZED_KERNELS and numpy is None:
+            results[name] = None
+            continue
+        calls, pairs = kernel_calls(kind, kernel, strings, q_value)
+        best = None
+        for run in range(repeat):
+            start = time.perf_counter()
+            calls()
+            seconds = time.perf_counter() - start
+            if best is None or seconds < best:
+                best = seconds
+        results[name] = pairs / best if best else None
+    return results
+
+
+# --- Benchmark Suite
+
+def run_benchmark(sizes=DEFAULT_SIZES, queries=100,
+                  thresholds=DEFAULT_THRESHOLDS, kernel_strings=2000,
+                  metric='levenshtein', q_value=2, seed=0,
+                  **corpus_options):
+    """
+    Benchmark tree construction and searches on a synthetic corpus of each
+    size, and the string distance kernels on a corpus of kernel_strings
+    strings.
+
+    Parameters
+    ----------
+    sizes : tuple
+        number of strings of each corpus
+    queries : int
+        number of search strings per corpus
+    thresholds : tuple
+        thresholds of the bk_search measurements
+    kernel_strings : int
+        number of strings of the kernel corpus, or 0 to skip the kernels
+    metric : str
+        string distance metric of the trees
+    q_value : int
+        size of q-gram window for q-gram metrics and kernels
+    seed : int
+        random number generator seed
+    corpus_options : dict
+        keyword arguments of generate_corpus
+
+    Return value
+    ------------
+    results : dict
+        JSON-serializable benchmark results
+    """
+    results = {
+        'environment': {'python': platform.python_version(),
+                        'implementation': platform.python_implementation(),
+                        'platform': platform.platform(),
+                        'numpy': numpy.__version__ if numpy else None},
+        'parameters': dict(corpus_options, sizes=list(sizes),
+                           queries=queries, thresholds=list(thresholds),
+                           kernel_strings=kernel_strings, metric=metric,
+                           q_value=q_value, seed=seed),
+        'corpora': [],
+        'kernels': None,
+    }
+    for size in sizes:
+        strings = generate_corpus(size, seed=seed, **corpus_options)
+        search_strings = generate_queries(
+            strings, queries, alphabet=corpus_options.get('alphabet'),
+            seed=seed)
+        tree, build = measure_build(strings, metric=metric, q_value=q_value)
+        results['corpora'].append({
+            'size': size,
+            'build': build,
+            'search': measure_searches(tree, search_strings, thresholds)})
+        del tree
+    if kernel_strings:
+        results['kernels'] = measure_kernels(
+            generate_corpus(kernel_strings, seed=seed, **corpus_options),
+            q_value)
+    return results
+
+
+def main(argv=None):
+    """
+    Run benchmark suite from the command line and write the results as
+    JSON to a file or standard output.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=list(DEFAULT_SIZES),
+                        help='number of strings of each corpus')
+    parser.add_argument('--queries', type=int, default=100,
+                        help='number of search strings per corpus')
+    parser.add_argument('--thresholds', type=int, nargs='+',
+                        default=list(DEFAULT_THRESHOLDS),
+                        help='bk_search thresholds')
+    parser.add_argument('--kernel-strings', type=int, default=2000,
+                        help='strings in the kernel corpus, 0 to skip')
+    parser.add_argument('--metric', default='levenshtein',
+                        help='string distance metric of the trees')
+    parser.add_argument('--q-value', type=int, default=2,
+                        help='q-gram window size')
+    parser.add_argument('--min-length', type=int, default=4)
+    parser.add_argument('--max-length', type=int, default=12)
+    parser.add_argument('--alphabet', default='abcdefghijklmnopqrstuvwxyz')
+    parser.add_argument('--length-distribution', default='uniform',
+                        choices=['uniform', 'normal'])
+    parser.add_argument('--symbol-distribution', default='uniform',
+                        choices=['uniform', 'zipf'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None,
+                        help='JSON output file, standard output by default')
+    arguments = parser.parse_args(argv)
+    results = run_benchmark(
+        sizes=arguments.sizes, queries=arguments.queries,
+        thresholds=arguments.thresholds,
+        kernel_strings=arguments.kernel_strings, metric=arguments.metric,
+        q_value=arguments.q_value, seed=arguments.seed,
+        min_length=arguments.min_length, max_length=arguments.max_length,
+        alphabet=arguments.alphabet,
+        length_distribution=arguments.length_distribution,
+        symbol_distribution=arguments.symbol_distribution)
+    if arguments.output is None:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    else:
+        with open(arguments.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Symmetric deletion levenshtein search index
+"""
+# --- Imports
+
+# String distance metrics
+from bkmetrics import get_metric
+from strdistlib import LevenshteinPattern
+
+
+# --- Deletion Functions
+
+def generate_deletions(string, max_deletions):
+    """
+    Get set of strings formed by deleting up to max_deletions symbols from
+    string, including string itself.
+    """
+    deletions = {string}
+    level = [string]
+    for deletion in range(max_deletions):
+        next_level = []
+        for current in level:
+            for position in range(len(current)):
+                shorter = current[:position] + current[position + 1:]
+                if shorter not in deletions:
+                    deletions.add(shorter)
+                    next_level.append(shorter)
+        level = next_level
+    return deletions
+
+
+# --- Deletion Index Class
+
+class DeletionIndex:
+    """
+    Symmetric deletion index class for levenshtein distance, after SymSpell
+
+    An alternative engine to BKTree with the same search methods, for
+    levenshtein distance up to max_distance only.  Every string deleting up
+    to max_distance symbols from the prefix of an indexed string is entered
+    in a hash table.  Two strings within distance d of each other have a
+    common string reachable from both of their prefixes by at most d
+    deletions, so a search looks up the deletions of the prefix of the
+    search string and only computes distances to the strings found there,
+    with a bounded levenshtein kernel.
+
+    Searches return the same strings as bk_search on a tree of the same
+    strings, in insertion order, but are limited to thresholds up to
+    max_distance.  The table grows with the number of deletions of each
+    prefix, so a shorter prefix_length uses less memory at the cost of
+    more candidates per search; a prefix_length of None indexes whole
+    strings.
+    """
+    def __init__(self, strings=None, max_distance=2, prefix_length=7,
+                 metric='levenshtein', q_value=2):
+        if get_metric(metric).name != 'levenshtein':
+            raise ValueError('DeletionIndex supports levenshtein distance '
+                             'only, not %r' % (metric,))
+        self.metric = metric
+        self.q_value = q_value
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.strings = []
+        self.members = {}
+        self.deletions = {}
+        self.update(strings)
+
+    def __str__(self):
+        return 'DeletionIndex of %d strings' % (len(self.strings),)
+
+    def count(self):
+        """
+        Get total number of strings in index.
+        """
+        return len(self.strings)
+
+    def prefix(self, string):
+        """
+        Get the part of string whose deletions are indexed.
+        """
+        if self.prefix_length is None:
+            return string
+        return string[:self.prefix_length]
+
+    def update(self, strings=None):
+        """
+        Add strings to index, with the deletions of their prefixes.  Strings
+        already in the index are ignored.
+        """
+        if strings is None:
+            return
+        for string in strings:
+            if string in self.members:
+                continue
+            number = self.members[string] = len(self.strings)
+            self.strings.append(string)
+            for deletion in generate_deletions(self.prefix(string),
+                                               self.max_distance):
+                self.deletions.setdefault(deletion, []).append(number)
+
+    def candidates(self, search_string, threshold):
+        """
+        Get sorted list of the numbers of indexed strings that may be within
+        threshold value from search string.
+
+        Exceptions
+        ----------
+        ValueError - threshold greater than max_distance
+        """
+        if threshold > self.max_distance:
+            raise ValueError('Threshold %r exceeds the maximum distance %r '
+                             'of the index' % (threshold, self.max_distance))
+        numbers = set()
+        for deletion in generate_deletions(self.prefix(search_string),
+                                           threshold):
+            numbers.update(self.deletions.get(deletion, ()))
+        return sorted(numbers)
+
+    def search(self, search_string, threshold=0):
+        """
+        Get list of strings within threshold value from search string.
+
+        Exceptions
+        ----------
+        ValueError - threshold greater than max_distance
+        """
+        return [string for string, string_distance in self.iter_search(
+            search_string, threshold)]
+
+    def iter_search(self, search_string, threshold=0):
+        """
+        Generate (string, distance) tuples for the strings within threshold
+        value from search string, in insertion order.  Candidates are only
+        verified as far as the matches are consumed.
+
+        Exceptions
+        ----------
+        ValueError - threshold greater than max_distance
+        """
+        numbers = self.candidates(search_string, threshold)
+        distance = LevenshteinPattern(search_string).distance
+        for number in numbers:
+            string = self.strings[number]
+            string_distance = distance(string, threshold)
+            if string_distance <= threshold:
+                yield string, string_distance
+
+    def nearest_neighbors(self, search_string):
+        """
+        Get lowest string distance from search string and list of strings
+        found at that distance.  Only distances up to max_distance are
+        searched, and the distance is None when no string is that close.
+        """
+        for threshold in range(self.max_distance + 1):
+            matches = self.search(search_string, threshold)
+            if matches:
+                return threshold, matches
+        return None, []
+
+    def k_nearest_neighbors(self, search_string, k):
+        """
+        Get list of (string, distance) tuples for up to k strings closest to
+        search string, ordered by distance.  Only strings within
+        max_distance of the search string are returned.
+        """
+        if k <= 0:
+            return []
+        matches = list(self.iter_search(search_string, self.max_distance))
+        matches.sort(key=lambda match: match[1])
+        return matches[:k]
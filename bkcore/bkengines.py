@@ -0,0 +1,111 @@
+"""
+Search engine selection
+"""
+# --- Imports
+
+# BKTree
+from bkdeletion import DeletionIndex
+from bkmetrics import Metric
+from bkmetrics import get_metric
+from bkpivot import PivotTable
+from bkpivot import VPTree
+from bktree import BKTree
+from bktrie import TrieIndex
+
+
+# --- Engine Selection
+
+ENGINES = {'bktree': BKTree,
+           'vptree': VPTree,
+           'pivot_table': PivotTable,
+           'trie': TrieIndex,
+           'deletion': DeletionIndex}
+
+# Engines computing distances through the metric kernel, whose distance
+# calls count_distance_calls can compare; the trie and deletion index
+# compute their own
+METRIC_ENGINES = ('bktree', 'vptree', 'pivot_table')
+
+
+def create_index(strings=None, engine='bktree', **options):
+    """
+    Create search index of strings with the named engine.
+
+    Parameters
+    ----------
+    strings : list
+        strings to add to index
+    engine : str
+        'bktree', 'vptree', 'pivot_table', 'trie' or 'deletion'
+    options : dict
+        keyword arguments of the engine class, such as metric and q_value
+
+    Return value
+    ------------
+    index : BKTree, VPTree, PivotTable, TrieIndex or DeletionIndex
+        index containing strings
+
+    Exceptions
+    ----------
+    ValueError - no engine registered under name
+    """
+    try:
+        engine_class = ENGINES[engine]
+    except KeyError:
+        raise ValueError('Unknown search engine: %r' % (engine,))
+    return engine_class(strings, **options)
+
+
+def count_distance_calls(strings, search_strings, threshold=2,
+                         engines=None, metric='levenshtein', q_value=2):
+    """
+    Count the distance computations each engine makes to index strings and
+    to search for every search string within threshold.
+
+    The engines are given a private, unregistered counting copy of the
+    metric with the scalar kernel only, so every distance computed is
+    counted exactly once, whether or not the metric has bounded or batch
+    kernels.
+
+    Parameters
+    ----------
+    strings : list
+        strings to index
+    search_strings : list
+        strings to search for
+    threshold : int
+        maximum string distance for matches
+    engines : list
+        engine names, defaulting to METRIC_ENGINES
+    metric : str
+        string distance metric
+    q_value : int
+        size of q-gram window for q-gram metrics
+
+    Return value
+    ------------
+    calls : dict
+        (build calls, search calls, matches) tuple for each engine name
+    """
+    base = get_metric(metric)
+    calls = [0]
+
+    def kernel(profile1, profile2):
+        calls[0] += 1
+        return base.kernel(profile1, profile2)
+
+    counted = Metric(base.name, kernel, preprocess=base.preprocess,
+                     parameters=base.parameters,
+                     triangle_inequality=base.triangle_inequality,
+                     symmetric=base.symmetric)
+    results = {}
+    for engine in engines or METRIC_ENGINES:
+        calls[0] = 0
+        index = create_index(list(strings), engine, metric=counted,
+                             q_value=q_value)
+        build_calls = calls[0]
+        calls[0] = 0
+        matches = sum(len(index.search(search_string, threshold))
+                      for search_string in search_strings)
+        results[engine] = (build_calls, calls[0], matches)
+    return results
@@ -0,0 +1,135 @@
+"""
+Length-partitioned Hamming distance index
+"""
+# --- Imports
+
+# BKTree
+from bktree import BKTree
+from strdistlib import count_hamming_mismatches
+
+
+# --- Hamming Index Class
+
+class HammingIndex:
+    """
+    Index of strings under Hamming distance, partitioned by length
+
+    Hamming distance is only defined between strings of equal length, so
+    the strings of each length are kept in a separate B-K Tree using the
+    'hamming_mismatch' metric, and each search only visits the tree for the
+    length of its search string.
+
+    Setting segments adds a pigeonhole multi-index for fixed-length codes
+    such as barcodes and hashes.  Every string is cut into that many
+    segments, each entered into a hash table of its own.  Two strings
+    within distance r of each other, where r is less than segments, agree
+    exactly on at least one segment, so a search with such a threshold
+    probes the tables with the segments of the search string and only
+    computes distances to the strings found there.  Searches with larger
+    thresholds use the tree.
+    """
+    def __init__(self, strings=None, segments=None):
+        self.segments = segments
+        self.members = set()
+        self.partitions = {}
+        self.tables = {}
+        self.update(strings)
+
+    def count(self):
+        """
+        Get total number of strings in index.
+        """
+        return len(self.members)
+
+    def segment_bounds(self, length):
+        """
+        Get list of (start, end) positions of the segments of strings of
+        length.
+        """
+        return [(length * segment // self.segments,
+                 length * (segment + 1) // self.segments)
+                for segment in range(self.segments)]
+
+    def update(self, strings=None):
+        """
+        Add strings to index.  Strings already in the index are ignored.
+        """
+        if strings is None:
+            return
+        for string in strings:
+            if string in self.members:
+                continue
+            self.members.add(string)
+            length = len(string)
+            tree = self.partitions.get(length)
+            if tree is None:
+                self.partitions[length] = BKTree([string],
+                                                 metric='hamming_mismatch')
+                if self.segments:
+                    self.tables[length] = [{} for segment in
+                                           range(self.segments)]
+            else:
+                tree.update([string])
+            if self.segments:
+                for table, (start, end) in zip(self.tables[length],
+                                               self.segment_bounds(length)):
+                    table.setdefault(string[start:end], []).append(string)
+
+    def search(self, search_string, threshold=0):
+        """
+        Get list of strings of the same length as search string within
+        threshold value from it.
+        """
+        length = len(search_string)
+        tree = self.partitions.get(length)
+        if tree is None:
+            return []
+        if not self.segments or threshold >= self.segments:
+            return tree.search(search_string, threshold)
+        return [string for string, string_distance in self.iter_search(
+            search_string, threshold)]
+
+    def iter_search(self, search_string, threshold=0):
+        """
+        Generate (string, distance) tuples for the strings of the same
+        length as search string within threshold value from it, in the
+        order search returns them.  Only as many candidates are checked as
+        the matches consumed require.
+        """
+        length = len(search_string)
+        tree = self.partitions.get(length)
+        if tree is None:
+            return
+        if not self.segments or threshold >= self.segments:
+            yield from tree.iter_search(search_string, threshold)
+            return
+        candidates = {}
+        for table, (start, end) in zip(self.tables[length],
+                                       self.segment_bounds(length)):
+            for string in table.get(search_string[start:end], ()):
+                candidates[string] = None
+        for string in candidates:
+            string_distance = count_hamming_mismatches(string, search_string)
+            if string_distance <= threshold:
+                yield string, string_distance
+
+    def nearest_neighbors(self, search_string):
+        """
+        Get lowest string distance from search string and list of strings
+        of the same length found at that distance.  The distance is None
+        when the index holds no strings of that length.
+        """
+        tree = self.partitions.get(len(search_string))
+        if tree is None:
+            return None, []
+        return tree.nearest_neighbors(search_string)
+
+    def k_nearest_neighbors(self, search_string, k):
+        """
+        Get list of (string, distance) tuples for the k strings of the same
+        length as search string closest to it, ordered by distance.
+        """
+        tree = self.partitions.get(len(search_string))
+        if tree is None:
+            return []
+        return tree.k_nearest_neighbors(search_string, k)
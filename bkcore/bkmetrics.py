@@ -0,0 +1,343 @@
+"""
+String distance metric registry
+"""
+# --- Imports
+
+# String distance metrics
+from strdistlib import calculate_levenshtein_distance
+from strdistlib import calculate_bounded_levenshtein_distance
+from strdistlib import LevenshteinPattern
+from strdistlib import generate_symbol_histogram
+from strdistlib import calculate_histogram_lower_bound
+from strdistlib import calculate_lc_substring_length
+from strdistlib import calculate_hamming_distance
+from strdistlib import count_hamming_mismatches
+from strdistlib import generate_q_gram_profile
+from strdistlib import calculate_q_gram_profile_distance
+from strdistlib import calculate_jaccard_profile_distance
+from strdistlib import encode_strings
+from strdistlib import calculate_levenshtein_distances
+from strdistlib import calculate_hamming_distances
+from strdistlib import calculate_q_gram_distances
+from strdistlib import calculate_jaccard_distances
+from strdistlib import numpy
+
+
+# --- Metric Classes
+
+class LowerBound:
+    """
+    Cheap lower bound on a metric, computed from signatures of the two
+    strings
+
+    signature(string) builds the signature of a string, once per node on
+    insertion and once per search string, and bound(signature1,
+    signature2) returns a value no greater than the distance between the
+    strings.
+    """
+    def __init__(self, name, signature, bound):
+        self.name = name
+        self.signature = signature
+        self.bound = bound
+
+    def __str__(self):
+        return self.name
+
+
+class Metric:
+    """
+    String distance metric with its kernels and capabilities
+
+    Only the scalar kernel is required.  The optional kernels are used
+    automatically when present, so a metric can be made faster by
+    registering it again with more of them:
+
+    * kernel(profile1, profile2) computes the distance between two profiles.
+    * preprocess(string, **parameters) builds the profile of a string, once
+      per node on insertion and once per search string.  Without it, the
+      profile of a string is the string itself.
+    * bounded_kernel(profile1, profile2, max_distance) returns any value
+      greater than max_distance when the distance exceeds it, which allows
+      the computation to stop early.
+    * query_kernel(profile) preprocesses a search string profile into a
+      function of (profile, max_distance), bounded as above.
+    * batch_kernel(search_string, strings, max_distance, **parameters)
+      returns the distances from a search string to a list of strings, with
+      the same bound; max_distance may be None.
+    * batch_encoder(strings) encodes a list of strings for the batch kernel
+      as a tuple of NumPy arrays with one row per string, so that strings
+      scanned repeatedly are encoded once.  The batch kernel then takes the
+      encoding, or a selection of its rows, as the encoded keyword.
+
+    The parameters named in parameters, such as q_value for q-gram metrics,
+    are passed from the tree to preprocess and batch_kernel.  The
+    capabilities triangle_inequality and symmetric describe the metric to
+    search engines that rely on them.
+
+    lower_bounds is a chain of LowerBound filters, cheapest first, that are
+    tried before a bounded distance computation: when any of them exceeds
+    the cutoff, the exact distance is not computed.
+    """
+    def __init__(self, name, kernel, preprocess=None, bounded_kernel=None,
+                 query_kernel=None, batch_kernel=None, batch_encoder=None,
+                 parameters=(), triangle_inequality=True, symmetric=True,
+                 lower_bounds=()):
+        self.name = name
+        self.kernel = kernel
+        self.preprocess = preprocess
+        self.bounded_kernel = bounded_kernel
+        self.query_kernel = query_kernel
+        self.batch_kernel = batch_kernel
+        self.batch_encoder = batch_encoder
+        self.parameters = tuple(parameters)
+        self.triangle_inequality = triangle_inequality
+        self.symmetric = symmetric
+        self.lower_bounds = tuple(lower_bounds)
+
+    def __str__(self):
+        return self.name
+
+    def arguments(self, q_value):
+        """
+        Get keyword arguments passed to preprocess and batch_kernel.
+        """
+        if 'q_value' in self.parameters:
+            return {'q_value': q_value}
+        return {}
+
+    def profile(self, string, q_value=2):
+        """
+        Get the form of string that the kernels are computed on.
+        """
+        if self.preprocess is None:
+            return string
+        return self.preprocess(string, **self.arguments(q_value))
+
+    def signatures(self, string):
+        """
+        Get the signatures of string for each of the metric's lower bounds.
+        """
+        return tuple(lower_bound.signature(string)
+                     for lower_bound in self.lower_bounds)
+
+    def distance(self, string1, string2, q_value=2):
+        """
+        Compute the distance between two strings.
+        """
+        return self.kernel(self.profile(string1, q_value),
+                           self.profile(string2, q_value))
+
+    def query(self, search_string, q_value=2, memo=None, counts=None):
+        """
+        Get function computing the distance from a node to search string,
+        using the fastest kernel available.  The function takes the node
+        profile, a cutoff, which may be None, and optionally the node
+        signatures, and returns any value greater than the cutoff when the
+        distance exceeds it.
+
+        Given signatures and a cutoff, the lower bounds are tried first,
+        and the first one exceeding the cutoff is returned in place of the
+        distance, counting the skipped computation under its name in the
+        optional counts dictionary.  For metrics computed on the strings
+        themselves, an optional DistanceMemo is then consulted before
+        computing a distance, and exact distances are stored in it.  A
+        symmetric memo, which ignores the order of the strings, is only used
+        with symmetric metrics.
+        """
+        query_profile = self.profile(search_string, q_value)
+        if self.query_kernel is not None:
+            query_distance = self.query_kernel(query_profile)
+        else:
+            kernel = self.kernel
+            bounded_kernel = self.bounded_kernel
+
+            def query_distance(profile, max_distance):
+                if max_distance is None or bounded_kernel is None:
+                    return kernel(profile, query_profile)
+                return bounded_kernel(profile, query_profile, max_distance)
+
+        if memo is not None and self.preprocess is None and \
+                (self.symmetric or not memo.symmetric):
+            exact_distance = query_distance
+
+            def query_distance(string, max_distance):
+                string_distance = memo.get(string, search_string)
+                if string_distance is None:
+                    string_distance = exact_distance(string, max_distance)
+                    if max_distance is None or \
+                            string_distance <= max_distance:
+                        memo.put(string, search_string, string_distance)
+                return string_distance
+
+        bounds = [(lower_bound.name, lower_bound.bound, query_signature)
+                  for lower_bound, query_signature in zip(
+                      self.lower_bounds, self.signatures(search_string))]
+
+        def filtered_distance(profile, max_distance, signatures=None):
+            if signatures is not None and max_distance is not None:
+                for (name, bound, query_signature), signature in zip(
+                        bounds, signatures):
+                    lower_bound = bound(signature, query_signature)
+                    if lower_bound > max_distance:
+                        if counts is not None:
+                            counts[name] = counts.get(name, 0) + 1
+                        return lower_bound
+            return query_distance(profile, max_distance)
+
+        return filtered_distance
+
+    def batch(self, search_string, strings, q_value=2, max_distance=None,
+              encoded=None):
+        """
+        Compute the distances from search string to each of strings, with
+        the batch kernel if the metric has one, passing it the optional
+        encoding of strings by the batch encoder.
+        """
+        if self.batch_kernel is not None:
+            arguments = self.arguments(q_value)
+            if encoded is not None:
+                arguments['encoded'] = encoded
+            distances = self.batch_kernel(search_string, strings,
+                                          max_distance, **arguments)
+            if hasattr(distances, 'tolist'):
+                return distances.tolist()
+            return list(distances)
+        distance = self.query(search_string, q_value)
+        return [distance(self.profile(string, q_value), max_distance)
+                for string in strings]
+
+
+# --- Metric Registry
+
+METRICS = {}
+
+
+def register_metric(name, kernel, preprocess=None, bounded_kernel=None,
+                    query_kernel=None, batch_kernel=None, batch_encoder=None,
+                    parameters=(), triangle_inequality=True, symmetric=True,
+                    lower_bounds=()):
+    """
+    Register a string distance metric under name, replacing any metric
+    already registered under it.  See Metric for the kernel signatures.
+
+    Parameters
+    ----------
+    name : str
+        metric name passed to trees and search functions
+    kernel : function
+        distance between two profiles
+    preprocess : function
+        optional profile generator
+    bounded_kernel : function
+        optional distance with a cutoff
+    query_kernel : function
+        optional search string preprocessor returning a bounded distance
+        function
+    batch_kernel : function
+        optional distances from one search string to many strings
+    batch_encoder : function
+        optional encoder of strings for the batch kernel
+    parameters : tuple
+        names of tree parameters passed to preprocess and batch_kernel
+    triangle_inequality : bool
+        whether the metric satisfies the triangle inequality
+    symmetric : bool
+        whether the distance is independent of argument order
+    lower_bounds : tuple
+        LowerBound filters, cheapest first
+
+    Return value
+    ------------
+    metric : Metric
+        registered metric
+    """
+    metric = Metric(name, kernel, preprocess=preprocess,
+                    bounded_kernel=bounded_kernel, query_kernel=query_kernel,
+                    batch_kernel=batch_kernel,
+                    batch_encoder=batch_encoder, parameters=parameters,
+                    triangle_inequality=triangle_inequality,
+                    symmetric=symmetric, lower_bounds=lower_bounds)
+    METRICS[name] = metric
+    return metric
+
+
+def get_metric(metric):
+    """
+    Get registered metric by name.  A Metric instance is returned as is, so
+    that trees can be given a metric that is not registered.
+
+    Exceptions
+    ----------
+    ValueError - no metric registered under name
+    """
+    if isinstance(metric, Metric):
+        return metric
+    try:
+        return METRICS[metric]
+    except KeyError:
+        raise ValueError('Unknown string distance metric: %r' % (metric,))
+
+
+# --- NumPy Batch Kernels
+
+def _levenshtein_batch(search_string, strings, max_distance, encoded=None):
+    """
+    Batch kernel of the levenshtein metric.
+    """
+    return calculate_levenshtein_distances(search_string, strings,
+                                           max_distance, encoded)
+
+
+def _hamming_mismatch_batch(search_string, strings, max_distance):
+    """
+    Batch kernel of the hamming_mismatch metric.
+    """
+    return calculate_hamming_distances(search_string, strings)
+
+
+def _q_gram_batch(search_string, strings, max_distance, q_value):
+    """
+    Batch kernel of the q_gram metric.
+    """
+    return calculate_q_gram_distances(search_string, strings, q_value)
+
+
+def _jaccard_batch(search_string, strings, max_distance, q_value):
+    """
+    Batch kernel of the jaccard metric.
+    """
+    return calculate_jaccard_distances(search_string, strings, q_value)
+
+
+# --- Built-in Metrics
+
+# Batch kernels are only registered when NumPy is installed
+register_metric('levenshtein', calculate_levenshtein_distance,
+                bounded_kernel=calculate_bounded_levenshtein_distance,
+                query_kernel=lambda profile: LevenshteinPattern(
+                    profile).distance,
+                batch_kernel=_levenshtein_batch if numpy else None,
+                batch_encoder=encode_strings if numpy else None,
+                lower_bounds=(
+                    LowerBound('length', len,
+                               lambda length1, length2: abs(length1 -
+                                                            length2)),
+                    LowerBound('histogram', generate_symbol_histogram,
+                               calculate_histogram_lower_bound)))
+# Longest common substring length and hamming match count are similarities
+# rather than distances
+register_metric('lcs', calculate_lc_substring_length,
+                triangle_inequality=False)
+register_metric('hamming', calculate_hamming_distance,
+                triangle_inequality=False)
+# Hamming distance proper, defined for strings of equal length only
+register_metric('hamming_mismatch', count_hamming_mismatches,
+                batch_kernel=_hamming_mismatch_batch if numpy else None)
+register_metric('q_gram', calculate_q_gram_profile_distance,
+                preprocess=generate_q_gram_profile,
+                batch_kernel=_q_gram_batch if numpy else None,
+                parameters=('q_value',))
+register_metric('jaccard', calculate_jaccard_profile_distance,
+                preprocess=generate_q_gram_profile,
+                batch_kernel=_jaccard_batch if numpy else None,
+                parameters=('q_value',))
@@ -0,0 +1,301 @@
+"""
+Process-pool parallel B-K Tree search
+"""
+# --- Imports
+
+# Standard library
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import threading
+
+# BKTree
+from bkmetrics import get_metric
+from bktree import BKNode
+from bktree import BKTree
+from bktree import FrozenBKTree
+
+
+# --- Worker Process State
+
+# Tree searched by the current worker process and lowest nearest-neighbor
+# distance shared by all worker processes, set by _initialize_worker
+_worker_tree = None
+_worker_bound = None
+
+
+def _initialize_worker(source, bound):
+    """
+    Load tree into worker process from an index file path or a pickled
+    FrozenBKTree.
+    """
+    global _worker_tree, _worker_bound
+    if isinstance(source, str):
+        _worker_tree = FrozenBKTree.load(source)
+    else:
+        _worker_tree = source
+    _worker_bound = bound
+
+
+def _search_subtree(search_string, threshold, start):
+    """
+    Search subtree rooted at node index start in worker process.
+    """
+    return _worker_tree.search(search_string, threshold, start)
+
+
+def _distances_to_pivots(metric, q_value, pieces):
+    """
+    Compute edge weights from each pivot string to the strings paired with
+    it in pieces, a list of (pivot, strings) tuples, as one flat list.
+    """
+    metric = get_metric(metric)
+    distances = []
+    for pivot, strings in pieces:
+        distances.extend(metric.batch(pivot, strings, q_value))
+    return distances
+
+
+def _nn_search_subtree(search_string, start):
+    """
+    Nearest-neighbor search of subtree rooted at node index start in worker
+    process, pruned by the shared lowest distance.
+    """
+    return _worker_tree.nearest_neighbors(search_string, start,
+                                          _worker_bound)
+
+
+# --- Parallel Search Class
+
+class BKSearchPool:
+    """
+    Pool of worker processes searching subtrees of a B-K Tree in parallel
+
+    The tree is compiled into a FrozenBKTree and shared read-only with the
+    workers: trees opened with FrozenBKTree.load are re-opened from their
+    index file in each worker, so all workers share the page-cached file,
+    and other trees are copied into each worker once when it starts.
+
+    A pool has the same search and nearest_neighbors methods as the tree
+    classes, so it can be passed as the tree argument of bk_search and
+    bk_nearest_neighbor_search.  Matches are returned in the same order
+    as a sequential search of a FrozenBKTree.
+    """
+    def __init__(self, tree, processes=None):
+        if not isinstance(tree, FrozenBKTree):
+            tree = tree.compile()
+        self.tree = tree
+        self.metric = tree.metric
+        self.processes = processes or os.cpu_count() or 1
+        self.bound = multiprocessing.Value('d', 0.0)
+        self.nn_lock = threading.Lock()
+        source = tree.path if tree.mapping is not None else tree
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.processes, initializer=_initialize_worker,
+            initargs=(source, self.bound))
+
+    def __str__(self):
+        return str(self.tree)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Shut down worker processes.
+        """
+        self.executor.shutdown()
+
+    def count(self):
+        """
+        Get total number of nodes in tree.
+        """
+        return self.tree.count()
+
+    def search(self, search_string, threshold=0):
+        """
+        Get list of strings within threshold value from search string.
+
+        The top levels of the tree are searched in this process, one level
+        at a time, until enough subtrees are in range to keep every worker
+        busy.  Each of those subtrees is then searched by a worker.
+        """
+        distances = {}
+        frontier = [0] if len(self.tree.edges) else []
+        while frontier and len(frontier) < 4 * self.processes:
+            next_frontier = []
+            for index in frontier:
+                string_distance = self.tree.string_distance(index,
+                                                            search_string)
+                distances[index] = string_distance
+                next_frontier.extend(self.tree.children_in_range(
+                    index, string_distance - threshold,
+                    string_distance + threshold))
+            frontier = next_frontier
+
+        # Walk the expanded levels in the same order as a sequential search,
+        # submitting a task for each subtree below them
+        results = []
+        stack = [0] if len(self.tree.edges) else []
+        while stack:
+            index = stack.pop()
+            if index not in distances:
+                results.append(self.executor.submit(
+                    _search_subtree, search_string, threshold, index))
+                continue
+            string_distance = distances[index]
+            if string_distance <= threshold:
+                results.append([self.tree.string(index)])
+            stack.extend(reversed(self.tree.children_in_range(
+                index, string_distance - threshold,
+                string_distance + threshold)))
+        matches = []
+        for result in results:
+            if isinstance(result, list):
+                matches.extend(result)
+            else:
+                matches.extend(result.result())
+        return matches
+
+    def iter_search(self, search_string, threshold=0):
+        """
+        Generate (string, distance) tuples for the strings within threshold
+        value from search string, in the order search returns them.  Matches
+        are generated by a sequential search in this process, which stops as
+        soon as the caller stops consuming them.
+        """
+        return self.tree.iter_search(search_string, threshold)
+
+    def nearest_neighbors(self, search_string):
+        """
+        Get lowest string distance from search string and list of strings
+        found at that distance.
+
+        Each subtree of the root in range is searched by a worker, and the
+        workers share the lowest distance found so far, so that every
+        worker prunes with the closest match found by any of them.
+        """
+        if not len(self.tree.edges):
+            return None, []
+        with self.nn_lock:
+            threshold = self.tree.string_distance(0, search_string)
+            self.bound.value = threshold
+            futures = [self.executor.submit(_nn_search_subtree,
+                                            search_string, child)
+                       for child in self.tree.children_in_range(
+                           0, 0, 2 * threshold)]
+            results = [(threshold, [self.tree.string(0)])]
+            results.extend(future.result() for future in futures)
+        distance = min(result[0] for result in results
+                       if result[0] is not None)
+        matches = []
+        for result in results:
+            if result[0] == distance:
+                matches.extend(result[1])
+        return distance, matches
+
+
+# --- Parallel Construction
+
+def build_tree(strings, metric='levenshtein', q_value=2, processes=None,
+               chunk_size=1000):
+    """
+    Build tree from strings, computing edge weights in a pool of worker
+    processes.
+
+    The tree is built one level at a time.  Every string still to be placed
+    below a node is compared against that node's string in parallel, and
+    the strings are then partitioned by distance: the first string at each
+    distance becomes the child on that edge, and the rest are placed below
+    it on the next level.  The result is identical to inserting the strings
+    one at a time with BKTree.
+
+    The comparisons of a level are packed into tasks of chunk_size strings
+    regardless of which node they belong to, so the many small subtrees of
+    the lower levels share tasks rather than costing one round trip to a
+    worker each.
+
+    Parameters
+    ----------
+    strings : iterable
+        strings to add to tree, or an open text file with one string per
+        line
+    metric : str
+        string distance metric
+    q_value : int
+        size of q-gram window for q-gram metrics
+    processes : int
+        number of worker processes, defaulting to the number of CPUs
+    chunk_size : int
+        number of strings compared in each worker task
+
+    Return value
+    ------------
+    tree : BKTree
+        tree containing strings
+
+    Exceptions
+    ----------
+    ValueError - metric returns an error message instead of a distance
+    """
+    if hasattr(strings, 'readline'):
+        strings = [line.rstrip('\n') for line in strings]
+    else:
+        strings = list(strings)
+    if not strings:
+        return BKTree(metric=metric, q_value=q_value)
+    tree = BKTree(strings[:1], metric=metric, q_value=q_value)
+    level = [(tree.root, strings[1:])]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        while level:
+            tasks = []
+            pieces = []
+            size = 0
+            for node, bucket in level:
+                start = 0
+                while start < len(bucket):
+                    piece = bucket[start:start + chunk_size - size]
+                    pieces.append((node.string, piece))
+                    size += len(piece)
+                    start += len(piece)
+                    if size == chunk_size:
+                        tasks.append(executor.submit(
+                            _distances_to_pivots, metric, q_value, pieces))
+                        pieces = []
+                        size = 0
+            if pieces:
+                tasks.append(executor.submit(_distances_to_pivots, metric,
+                                             q_value, pieces))
+            distances = []
+            for task in tasks:
+                distances.extend(task.result())
+            next_level = []
+            position = 0
+            for node, bucket in level:
+                partitions = {}
+                for string, edge_weight in zip(
+                        bucket, distances[position:position + len(bucket)]):
+                    # Metrics report errors, such as the hamming distance
+                    # of strings of different lengths, as strings
+                    if isinstance(edge_weight, str):
+                        raise ValueError(edge_weight)
+                    if edge_weight == 0 and string == node.string:
+                        node.count += 1
+                        continue
+                    partitions.setdefault(edge_weight, []).append(string)
+                for edge_weight, partition in partitions.items():
+                    child = BKNode(partition[0], parent=node,
+                                   profile=get_metric(metric).profile(
+                                       partition[0], q_value))
+                    node.children[edge_weight] = child
+                    if len(partition) > 1:
+                        next_level.append((child, partition[1:]))
+                node.edges = sorted(node.children)
+                tree.nodes += len(partitions)
+                position += len(bucket)
+            level = next_level
+
+    return tree
@@ -0,0 +1,465 @@
+"""
+Multi-pivot metric index engines
+"""
+# --- Imports
+
+# Standard library
+from heapq import heappop
+from heapq import heappush
+
+# BKTree
+from bkmetrics import get_metric
+from strdistlib import numpy
+
+
+# --- Closest String Selection
+
+def _nearest(candidates):
+    """
+    Get lowest distance among (string, distance) candidates and list of
+    strings found at that distance, or None and an empty list if there are
+    no candidates.
+    """
+    matches = []
+    threshold = None
+    for string, string_distance in candidates:
+        if threshold is None or string_distance < threshold:
+            threshold = string_distance
+            matches = [string]
+        elif string_distance == threshold:
+            matches.append(string)
+    return threshold, matches
+
+
+def _k_nearest(candidates, k):
+    """
+    Get list of (string, distance) tuples for the k closest of (string,
+    distance) candidates, ordered by distance, with ties kept in the order
+    found.
+    """
+    closest = []
+    found = 0
+    for string, string_distance in candidates:
+        found += 1
+        heappush(closest, (-string_distance, -found, string))
+        if len(closest) > k:
+            heappop(closest)
+    return [(string, -negative_distance) for negative_distance, order,
+            string in sorted(closest, reverse=True)]
+
+
+# --- Vantage-Point Tree Classes
+
+class VPNode:
+    """
+    Vantage-point tree node class
+
+    The strings below a node are split by their distance from the node's
+    string, the vantage point: those within radius are stored in the
+    inside subtree and the rest in the outside subtree.  A node without
+    children has a radius of None.
+    """
+    __slots__ = ('string', 'profile', 'radius', 'inside', 'outside')
+
+    def __init__(self, string, profile=None):
+        self.string = string
+        self.profile = string if profile is None else profile
+        self.radius = None
+        self.inside = None
+        self.outside = None
+
+    def __str__(self):
+        return str(self.string)
+
+
+class VPTree:
+    """
+    Vantage-point tree class
+
+    An alternative engine to BKTree with the same search methods.  Where a
+    B-K Tree node fans out into one child per distance, a vantage-point
+    node splits the strings below it in two at the median distance from
+    its string, so a search in range of only one side of the median skips
+    the other side entirely.  Strings given to the constructor are split at
+    their medians, while strings added later by update descend to a free
+    position, as in a B-K Tree.
+
+    The metric must satisfy the triangle inequality.
+    """
+    def __init__(self, strings=None, metric='levenshtein', q_value=2):
+        if not get_metric(metric).triangle_inequality:
+            raise ValueError('Metric %r does not satisfy the triangle '
+                             'inequality' % (metric,))
+        self.metric = metric
+        self.q_value = q_value
+        self.members = set()
+        self.root = None
+        self.update(strings)
+
+    def __str__(self):
+        return '' if self.root is None else str(self.root.string)
+
+    def count(self):
+        """
+        Get total number of strings in tree.
+        """
+        return len(self.members)
+
+    def update(self, strings=None):
+        """
+        Add strings to tree.  Strings already in the tree are ignored.
+        """
+        if strings is None:
+            return
+        metric = get_metric(self.metric)
+        nodes = []
+        for string in strings:
+            if string not in self.members:
+                self.members.add(string)
+                nodes.append(VPNode(string,
+                                    metric.profile(string, self.q_value)))
+        if self.root is None:
+            self.build(nodes)
+        else:
+            for node in nodes:
+                self.insert(node)
+
+    def build(self, nodes):
+        """
+        Build tree from a list of childless VPNodes, taking the first node
+        of each subtree as its vantage point and the lower median distance
+        from it as its radius.
+        """
+        distance = get_metric(self.metric).kernel
+        pending = [(None, None, nodes)]
+        while pending:
+            parent, side, subtree = pending.pop()
+            if not subtree:
+                continue
+            node = subtree[0]
+            if parent is None:
+                self.root = node
+            else:
+                setattr(parent, side, node)
+            rest = subtree[1:]
+            if not rest:
+                continue
+            distances = [distance(node.profile, other.profile)
+                         for other in rest]
+            node.radius = sorted(distances)[(len(rest) - 1) // 2]
+            pending.append((node, 'outside',
+                            [other for other, other_distance
+                             in zip(rest, distances)
+                             if other_distance > node.radius]))
+            pending.append((node, 'inside',
+                            [other for other, other_distance
+                             in zip(rest, distances)
+                             if other_distance <= node.radius]))
+
+    def insert(self, new_node):
+        """
+        Add childless VPNode below the first node with a free position on
+        the side its distance selects.  A node without children takes the
+        distance to its first child as its radius.
+        """
+        distance = get_metric(self.metric).kernel
+        node = self.root
+        while True:
+            node_distance = distance(node.profile, new_node.profile)
+            if node.radius is None:
+                node.radius = node_distance
+            side = 'inside' if node_distance <= node.radius else 'outside'
+            child = getattr(node, side)
+            if child is None:
+                setattr(node, side, new_node)
+                return
+            node = child
+
+    def search(self, search_string, threshold=0):
+        """
+        Get list of strings within threshold value from search string.
+        """
+        return [string for string, string_distance in self.iter_search(
+            search_string, threshold)]
+
+    def iter_search(self, search_string, threshold=0):
+        """
+        Generate (string, distance) tuples for the strings within threshold
+        value from search string.  The tree is traversed only as far as the
+        matches are consumed.
+
+        Distances beyond threshold plus the radius of a node are not
+        computed exactly where the metric has a bounded variant, since only
+        the outside subtree of such a node can be in range.
+        """
+        if self.root is None:
+            return
+        distance = get_metric(self.metric).query(search_string,
+                                                 self.q_value)
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            radius = node.radius
+            node_distance = distance(
+                node.profile, threshold + (radius or 0))
+            if node_distance <= threshold:
+                yield node.string, node_distance
+            if radius is None:
+                continue
+            if node.outside is not None and \
+                    node_distance + threshold > radius:
+                stack.append(node.outside)
+            if node.inside is not None and \
+                    node_distance - threshold <= radius:
+                stack.append(node.inside)
+
+    def nearest_neighbors(self, search_string):
+        """
+        Get lowest string distance from search string and list of strings
+        found at that distance.  The distance is None when the tree is
+        empty.
+        """
+        return _nearest(self.iter_closest(search_string, 1))
+
+    def k_nearest_neighbors(self, search_string, k):
+        """
+        Get list of (string, distance) tuples for the k strings closest to
+        search string, ordered by distance.
+        """
+        if k <= 0:
+            return []
+        return _k_nearest(self.iter_closest(search_string, k), k)
+
+    def iter_closest(self, search_string, k):
+        """
+        Generate (string, distance) tuples for candidates among the k
+        closest strings to search string, including every string tied with
+        the k-th closest.
+
+        Subtrees are visited best-first by the lower bound their side of the
+        radius puts on their distances, and a bounded max-heap of the k
+        closest distances found so far gives the pruning radius.
+        """
+        if self.root is None:
+            return
+        distance = get_metric(self.metric).query(search_string,
+                                                 self.q_value)
+        closest = []
+        queued = 0
+        queue = [(0, queued, self.root)]
+        while queue:
+            lower_bound, order, node = heappop(queue)
+            bound = -closest[0] if len(closest) == k else None
+            if bound is not None and lower_bound > bound:
+                break
+            radius = node.radius
+            node_distance = distance(
+                node.profile,
+                None if bound is None else bound + (radius or 0))
+            if bound is None or node_distance <= bound:
+                yield node.string, node_distance
+                heappush(closest, -node_distance)
+                if len(closest) > k:
+                    heappop(closest)
+                bound = -closest[0] if len(closest) == k else None
+            if radius is None:
+                continue
+            if node.inside is not None and (
+                    bound is None or node_distance - bound <= radius):
+                queued += 1
+                heappush(queue, (max(node_distance - radius, 0), queued,
+                                 node.inside))
+            if node.outside is not None and (
+                    bound is None or node_distance + bound > radius):
+                queued += 1
+                heappush(queue, (max(radius - node_distance, 0), queued,
+                                 node.outside))
+
+
+# --- Pivot Table Class
+
+class PivotTable:
+    """
+    Pivot table index class, after LAESA
+
+    An alternative engine to BKTree with the same search methods.  A few of
+    the strings are chosen as pivots, and the distance from every string to
+    every pivot is stored in a table.  A search computes the distances from
+    the search string to the pivots only, and by the triangle inequality
+    the largest difference between those and a string's row of the table
+    is a lower bound on the string's distance, so exact distances are only
+    computed for the strings whose bound is within range.  With NumPy
+    installed, the bounds for all strings are computed in one vectorized
+    operation.
+
+    Pivots are chosen farthest-first: the first string, then repeatedly the
+    string farthest from its closest pivot.  The table grows with update,
+    which selects more pivots while there are fewer than pivots strings.
+
+    The metric must satisfy the triangle inequality.
+    """
+    def __init__(self, strings=None, metric='levenshtein', q_value=2,
+                 pivots=8):
+        if not get_metric(metric).triangle_inequality:
+            raise ValueError('Metric %r does not satisfy the triangle '
+                             'inequality' % (metric,))
+        self.metric = metric
+        self.q_value = q_value
+        self.max_pivots = pivots
+        self.members = set()
+        self.strings = []
+        self.profiles = []
+        self.pivots = []
+        self.table = []
+        self.matrix = None
+        self.update(strings)
+
+    def __str__(self):
+        return str(self.strings[0]) if self.strings else ''
+
+    def count(self):
+        """
+        Get total number of strings in index.
+        """
+        return len(self.strings)
+
+    def update(self, strings=None):
+        """
+        Add strings to index, with their distances to the pivots.  Strings
+        already in the index are ignored.
+        """
+        if strings is None:
+            return
+        metric = get_metric(self.metric)
+        for string in strings:
+            if string in self.members:
+                continue
+            self.members.add(string)
+            profile = metric.profile(string, self.q_value)
+            self.strings.append(string)
+            self.profiles.append(profile)
+            self.table.append([metric.kernel(self.profiles[pivot], profile)
+                               for pivot in self.pivots])
+        self.select_pivots()
+        self.matrix = None
+
+    def select_pivots(self):
+        """
+        Add pivots farthest-first until there are max_pivots of them or no
+        string is left at a nonzero distance from every pivot.
+        """
+        distance = get_metric(self.metric).kernel
+        while len(self.pivots) < min(self.max_pivots, len(self.strings)):
+            if self.pivots:
+                farthest = max(range(len(self.strings)),
+                               key=lambda row: min(self.table[row]))
+                if not min(self.table[farthest]):
+                    return
+            else:
+                farthest = 0
+            pivot_profile = self.profiles[farthest]
+            for row, profile in enumerate(self.profiles):
+                self.table[row].append(
+                    0 if row == farthest else distance(pivot_profile,
+                                                       profile))
+            self.pivots.append(farthest)
+
+    def lower_bounds(self, pivot_distances):
+        """
+        Get the lower bound on the distance from the search string to each
+        string, given the distances from the search string to the pivots.
+        """
+        if not self.pivots:
+            return [0] * len(self.strings)
+        if numpy is not None:
+            if self.matrix is None:
+                self.matrix = numpy.array(self.table)
+            return numpy.abs(self.matrix - numpy.array(
+                pivot_distances)).max(axis=1).tolist()
+        return [max(abs(row_distance - pivot_distance)
+                    for row_distance, pivot_distance
+                    in zip(row, pivot_distances))
+                for row in self.table]
+
+    def query(self, search_string):
+        """
+        Get function computing the bounded distance from a string, given by
+        row number, to search string, and the lower bound on the distance of
+        every row.  The distances to pivots are computed once and reused.
+        """
+        distance = get_metric(self.metric).query(search_string,
+                                                 self.q_value)
+        pivot_distances = [distance(self.profiles[pivot], None)
+                           for pivot in self.pivots]
+        known = dict(zip(self.pivots, pivot_distances))
+
+        def row_distance(row, max_distance):
+            if row in known:
+                return known[row]
+            return distance(self.profiles[row], max_distance)
+
+        return row_distance, self.lower_bounds(pivot_distances)
+
+    def search(self, search_string, threshold=0):
+        """
+        Get list of strings within threshold value from search string.
+        """
+        return [string for string, string_distance in self.iter_search(
+            search_string, threshold)]
+
+    def iter_search(self, search_string, threshold=0):
+        """
+        Generate (string, distance) tuples for the strings within threshold
+        value from search string, in insertion order.  Candidates are
+        checked only as far as the matches are consumed.
+        """
+        if not self.strings:
+            return
+        row_distance, lower_bounds = self.query(search_string)
+        for row, lower_bound in enumerate(lower_bounds):
+            if lower_bound > threshold:
+                continue
+            string_distance = row_distance(row, threshold)
+            if string_distance <= threshold:
+                yield self.strings[row], string_distance
+
+    def nearest_neighbors(self, search_string):
+        """
+        Get lowest string distance from search string and list of strings
+        found at that distance.  The distance is None when the index is
+        empty.
+        """
+        return _nearest(self.iter_closest(search_string, 1))
+
+    def k_nearest_neighbors(self, search_string, k):
+        """
+        Get list of (string, distance) tuples for the k strings closest to
+        search string, ordered by distance.
+        """
+        if k <= 0:
+            return []
+        return _k_nearest(self.iter_closest(search_string, k), k)
+
+    def iter_closest(self, search_string, k):
+        """
+        Generate (string, distance) tuples for candidates among the k
+        closest strings to search string, including every string tied with
+        the k-th closest.  Rows are checked in order of increasing lower
+        bound, stopping at the first bound beyond the k-th closest
+        distance found so far.
+        """
+        if not self.strings:
+            return
+        row_distance, lower_bounds = self.query(search_string)
+        closest = []
+        for row in sorted(range(len(lower_bounds)),
+                          key=lower_bounds.__getitem__):
+            bound = -closest[0] if len(closest) == k else None
+            if bound is not None and lower_bounds[row] > bound:
+                break
+            string_distance = row_distance(row, bound)
+            if bound is None or string_distance <= bound:
+                yield self.strings[row], string_distance
+                heappush(closest, -string_distance)
+                if len(closest) > k:
+                    heappop(closest)
@@ -3,56 +3,426 @@ B-K Nearest Neighbor Search Algorithm
 """
 # --- Imports
 
+# Standard library
+from bisect import bisect_left
+from bisect import bisect_right
+from bisect import insort
+from array import array
+from collections import OrderedDict
+from heapq import heappop
+from heapq import heappush
+import mmap
+import struct
+import sys
+
 # String distance metrics
+from bkmetrics import get_metric
 from strdistlib import calculate_levenshtein_distance
 from strdistlib import calculate_lc_substring_length
 from strdistlib import calculate_hamming_distance
 from strdistlib import calculate_q_gram_distance
 from strdistlib import calculate_jaccard_distance
+from strdistlib import DistanceMemo
+
+
+# --- Index File Format
+
+# Header: magic, format version, edge array typecode, number of nodes in the
+# arrays, BKTree node count, string buffer length, q-gram window size and
+# metric name length.
+# The metric name follows the header, then the offsets, edges, first-child
+# and next-sibling arrays as little-endian 8-byte values, then the string
+# buffer.  Every section starts on an 8-byte boundary.
+INDEX_MAGIC = b'BKTREE\x00\x00'
+INDEX_VERSION = 2
+INDEX_HEADER = struct.Struct('<8sI1s3xqqqqq')
+
+
+def _align(position):
+    """
+    Round file position up to the next 8-byte boundary.
+    """
+    return (position + 7) & ~7
+
+
+# --- Query Result Cache
+
+def _copy_matches(matches, payloads=False):
+    """
+    Get list of matches, with copies of their payload lists if payloads is
+    set, so that callers cannot change the payloads held by a tree or its
+    cache.
+    """
+    if payloads:
+        return [match[:-1] + (list(match[-1]),) for match in matches]
+    return list(matches)
+
+
+class QueryCache:
+    """
+    Bounded least-recently-used cache of search results
+
+    Entries are keyed by (search string, threshold, metric, mode) and
+    tagged with the generation they were stored in.  Invalidating the cache
+    increments the generation, after which older entries are treated as
+    misses and are discarded when next looked up or evicted.
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        Get cached result for key, or None if it is missing or stale.
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != self.generation:
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, result):
+        """
+        Store result for key, evicting least recently used entries beyond
+        the maximum size.
+        """
+        self.entries[key] = (self.generation, result)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def invalidate(self):
+        """
+        Mark all cached results as stale.
+        """
+        self.generation += 1
+
+    def clear(self):
+        """
+        Remove all cached results and reset hit and miss counters.
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
 
 
 # --- B-K Tree Classes
 
+class LeafBucket:
+    """
+    Leaf bucket of a B-K Tree node
+
+    Records of the strings below a node are kept in insertion order, with
+    the distance of each from the string of the node, so that searches can
+    rule out entries by the triangle inequality before computing their
+    distances: an entry at distance e from the node can only be within
+    threshold t of a search string at distance d from the node if
+    |d - e| <= t.  reach is the largest of these distances.
+
+    The remaining candidates are scanned with the metric's scalar query
+    kernel, or with its batch kernel when there are at least batch_minimum
+    of them, since a vectorized call only pays off for large scans.  The
+    batch encoding of the bucket strings is made on the first batched scan
+    and kept until the bucket changes.
+    """
+    __slots__ = ('records', 'distances', 'reach', 'encoded')
+
+    batch_minimum = 512
+
+    def __init__(self):
+        self.records = []
+        self.distances = []
+        self.reach = 0
+        self.encoded = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def append(self, record, distance):
+        """
+        Add record at distance from the string of the bucket's node.
+        """
+        self.records.append(record)
+        self.distances.append(distance)
+        self.reach = max(self.reach, distance)
+        self.encoded = None
+
+    def remove(self, string):
+        """
+        Remove the record of string from bucket.  Returns whether string
+        was in the bucket.
+        """
+        for position, record in enumerate(self.records):
+            if record.string == string:
+                del self.records[position]
+                del self.distances[position]
+                self.reach = max(self.distances, default=0)
+                self.encoded = None
+                return True
+        return False
+
+    def scan(self, metric, search_string, distance, node_distance,
+             threshold, q_value=2):
+        """
+        Get list of (record, distance) tuples for the entries that may lie
+        within threshold value from search string, which is at node_distance
+        from the string of the bucket's node.  distance is the function
+        returned by metric.query for search string, and distances beyond
+        threshold may be any value greater than it.  A threshold of None
+        scans every entry.
+        """
+        records = self.records
+        if threshold is None:
+            positions = range(len(records))
+        else:
+            positions = [position for position, edge_weight
+                         in enumerate(self.distances)
+                         if abs(node_distance - edge_weight) <= threshold]
+        if len(positions) < self.batch_minimum or \
+                metric.batch_kernel is None:
+            return [(records[position],
+                     distance(records[position].profile, threshold,
+                              records[position].signatures))
+                    for position in positions]
+        encoded = None
+        if metric.batch_encoder is not None:
+            if self.encoded is None:
+                self.encoded = metric.batch_encoder(
+                    [record.string for record in records])
+            encoded = tuple(part[positions] for part in self.encoded)
+        return list(zip(
+            [records[position] for position in positions],
+            metric.batch(search_string, [records[position].string
+                                         for position in positions],
+                         q_value, threshold, encoded)))
+
+
 class BKNode:
     """
     B-K Tree node class
+
+    Children are stored in a dictionary keyed by integer edge weight, with
+    the edge weights also kept in a sorted list so that searches can select
+    the edges within range by bisection instead of testing every child.
+
+    Each node is a record of its string: count is the number of times the
+    string was inserted, and payloads is the list of payloads, such as
+    record IDs, inserted with it, or None if there are none.  A count of 0
+    marks a removed string.  Nodes use slots rather than an attribute
+    dictionary to keep large trees compact.
+
+    In trees with a leaf size, a node without children may instead hold a
+    leaf bucket: a LeafBucket of records for the strings below it, which
+    searches scan without descending into a subtree.  A bucket is split
+    into child nodes once it outgrows the leaf size.
+
+    In trees with prefiltering, each node also holds the signatures of its
+    string for the metric's lower bounds, which searches test before
+    computing the exact distance.
     """
+    __slots__ = ('string', 'profile', 'parent', 'children', 'edges',
+                 'bucket', 'signatures', 'count', 'payloads')
+
+    # String distance functions of the recursive search methods; the other
+    # searches look metrics up in the bkmetrics registry
     distance_metric = {'levenshtein': calculate_levenshtein_distance,
                        'lcs': calculate_lc_substring_length,
                        'hamming': calculate_hamming_distance,
                        'q_gram': calculate_q_gram_distance,
                        'jaccard': calculate_jaccard_distance}
 
-    def __init__(self, string, parent=None):
+    def __init__(self, string, parent=None, profile=None, bucket=None,
+                 signatures=None, count=1, payloads=None):
         self.string = string
+        self.profile = string if profile is None else profile
         self.parent = parent
         self.children = {}
+        self.edges = []
+        self.bucket = bucket
+        self.signatures = signatures
+        self.count = count
+        self.payloads = payloads
 
     def __str__(self):
         return str(self.string)
 
-    def add_child(self, string, metric='levenshtein'):
+    @property
+    def deleted(self):
+        """
+        Whether the string of this node was removed.
+        """
+        return not self.count
+
+    def add_child(self, string, metric='levenshtein', q_value=2,
+                  leaf_size=None, prefilter=False, payload=None):
         """
         Create BKNode from string and add to dictionary of children with key
         equal to string distance from current node.  If value for key exists,
-        attempt to add as child of corresponding node.
+        descend into the corresponding node and repeat until a free edge is
+        found.  Strings already in the tree have their count incremented and
+        removed strings are restored, while distinct strings at distance 0,
+        which profile metrics allow, are stored under edge 0.  An optional
+        payload is appended to the payloads of the string.
+
+        With a leaf_size, new nodes start with an empty leaf bucket, and a
+        string reaching a node with a bucket is appended to it along with
+        its distance from the string of the node.  A bucket
+        holding more than leaf_size strings is split by inserting its
+        records below the node in their original order, so the resulting
+        subtree is the same as if they had been inserted without a bucket.
+
+        With prefilter, new nodes store the signatures of their string for
+        the metric's lower bounds.
+
+        Return value
+        ------------
+        added : bool
+            whether string was not already in the tree
+
+        Exceptions
+        ----------
+        ValueError - metric returns an error message instead of a distance
         """
-        edge_weight = BKNode.distance_metric[metric](self.string, string)
-        if edge_weight == 0:
-            return
-        if str(edge_weight) in self.children:
-            self.children[str(edge_weight)].add_child(string, metric)
-        else:
-            self.children[str(edge_weight)] = BKNode(string,
-                                                     parent=self)
+        metric = get_metric(metric)
+        record = BKNode(string, profile=metric.profile(string, q_value),
+                        signatures=metric.signatures(string)
+                        if prefilter else None,
+                        payloads=None if payload is None else [payload])
+        return self.insert(record, metric, q_value, leaf_size)
+
+    def insert(self, record, metric='levenshtein', q_value=2,
+               leaf_size=None):
+        """
+        Add record, a childless BKNode, to the subtree rooted at this node
+        as add_child does, merging its count and payloads into the node of
+        an equal string if there is one.  Returns whether the string of
+        record was not already in the tree.
+        """
+        distance = get_metric(metric).kernel
+        node = self
+        while True:
+            edge_weight = distance(node.profile, record.profile)
+            if isinstance(edge_weight, str):
+                raise ValueError(edge_weight)
+            if edge_weight == 0 and node.string == record.string:
+                return node.merge(record)
+            if node.bucket is not None:
+                for entry in node.bucket:
+                    if entry.string == record.string:
+                        return entry.merge(record)
+                record.parent = node
+                node.bucket.append(record, edge_weight)
+                if len(node.bucket) > leaf_size:
+                    bucket = node.bucket
+                    node.bucket = None
+                    for entry in bucket:
+                        node.insert(entry, metric, q_value, leaf_size)
+                return True
+            child = node.children.get(edge_weight)
+            if child is None:
+                record.parent = node
+                record.bucket = None if leaf_size is None else LeafBucket()
+                node.children[edge_weight] = record
+                insort(node.edges, edge_weight)
+                return True
+            node = child
+
+    def merge(self, record):
+        """
+        Add the count and payloads of record, a BKNode of the same string,
+        to this node.  Returns whether the string was removed before.
+        """
+        restored = not self.count
+        self.count += record.count
+        if record.payloads:
+            if self.payloads is None:
+                self.payloads = []
+            self.payloads.extend(record.payloads)
+        return restored
+
+    def remove_child(self, string, metric='levenshtein', q_value=2):
+        """
+        Find string in the subtree rooted at this node, following the edges
+        add_child would take, and remove it with all of its payloads.  A
+        string in a leaf bucket is dropped from the bucket, while any other
+        node is marked as deleted, leaving a tombstone that searches still
+        traverse but never return.  Returns the node that held the string,
+        or None if the string was not found or was already removed.
+        """
+        metric = get_metric(metric)
+        distance = metric.kernel
+        profile = metric.profile(string, q_value)
+        node = self
+        while node is not None:
+            if node.bucket and node.bucket.remove(string):
+                return node
+            edge_weight = distance(node.profile, profile)
+            if edge_weight == 0 and node.string == string:
+                if node.deleted:
+                    return None
+                node.count = 0
+                node.payloads = None
+                return node
+            node = node.children.get(edge_weight)
+        return None
+
+    def expand_bucket(self, metric='levenshtein', q_value=2):
+        """
+        Get a copy of this node with its leaf bucket replaced by the subtree
+        the bucket strings form when inserted below it.
+        """
+        node = BKNode(self.string, parent=self.parent, profile=self.profile,
+                      signatures=self.signatures, count=self.count,
+                      payloads=self.payloads)
+        for entry in self.bucket or ():
+            node.add_child(entry.string, metric, q_value)
+        return node
+
+    def max_edge(self):
+        """
+        Get the largest child edge weight, or for a node with a leaf bucket
+        the largest distance to a bucket string, or 0 for a leaf.
+        """
+        if self.edges:
+            return self.edges[-1]
+        if self.bucket:
+            return self.bucket.reach
+        return 0
+
+    def edges_in_range(self, low, high):
+        """
+        Get the sorted list of child edge weights between low and high,
+        inclusive.
+        """
+        return self.edges[bisect_left(self.edges, low):
+                          bisect_right(self.edges, high)]
 
     def list_children(self):
         """
-        Recursively print string values for current node and all child nodes.
+        Print string values for current node and all child nodes.
         """
-        print(self.string)
-        for child in self.children:
-            self.children[child].list_children()
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if not node.deleted:
+                print(node.string)
+            for entry in node.bucket or ():
+                print(entry.string)
+            stack.extend(node.children[edge]
+                         for edge in reversed(node.edges))
 
     def recursive_search(self, search_string, threshold, matches, metric):
         """
@@ -61,14 +431,12 @@ class BKNode:
         """
         string_distance = BKNode.distance_metric[metric](self.string,
                                                          search_string)
-        if string_distance <= threshold:
+        if string_distance <= threshold and not self.deleted:
             matches.append(self.string)
-        for child in self.children:
-            if int(child) in range(string_distance - threshold,
-                                   string_distance + threshold + 1):
-                self.children[child].recursive_search(search_string,
-                                                      threshold, matches,
-                                                      metric)
+        for edge in self.edges_in_range(string_distance - threshold,
+                                        string_distance + threshold):
+            self.children[edge].recursive_search(search_string, threshold,
+                                                 matches, metric)
 
     def recursive_nn_search(self, search_string, threshold, matches, metric):
         """
@@ -77,11 +445,11 @@ class BKNode:
         """
         string_distance = BKNode.distance_metric[metric](self.string,
                                                          search_string)
-        if string_distance == 0:
+        if string_distance == 0 and not self.deleted:
             matches.clear()
             matches[0] = [self.string]
             return
-        if string_distance <= threshold:
+        if string_distance <= threshold and not self.deleted:
             threshold = string_distance
             if string_distance in matches:
                 matches[string_distance].append(self.string)
@@ -90,34 +458,294 @@ class BKNode:
             if len(matches) > 1:
                 for key in sorted(matches.keys())[1:]:
                     del matches[key]
-        for child in self.children:
-            if int(child) in range(string_distance - threshold,
-                                   string_distance + threshold + 1):
-                self.children[child].recursive_nn_search(
-                    search_string, threshold, matches, metric)
+        for edge in self.edges_in_range(string_distance - threshold,
+                                        string_distance + threshold):
+            self.children[edge].recursive_nn_search(search_string, threshold,
+                                                    matches, metric)
+
+    def iterative_search(self, search_string, threshold, matches, metric,
+                         q_value=2, memo=None, counts=None, payloads=False):
+        """
+        Search nodes for string distances less than or equal to threshold
+        value, using an explicit stack of nodes in place of recursion.
+        Matches are appended in the same order as recursive_search, as
+        (string, distance, payloads) tuples if payloads is set.
+        """
+        found = self.iter_search(search_string, threshold, metric, q_value,
+                                 memo, counts, payloads)
+        if payloads:
+            matches.extend(found)
+        else:
+            matches.extend(match[0] for match in found)
+
+    def iter_search(self, search_string, threshold, metric, q_value=2,
+                    memo=None, counts=None, payloads=False):
+        """
+        Generate (string, distance) tuples, or (string, distance, payloads)
+        tuples if payloads is set, for the strings within threshold value
+        from search string in the order iterative_search finds them.  The
+        traversal advances only as far as the matches are consumed.
+
+        Where the metric has a bounded variant, distances beyond threshold
+        plus the largest child edge are not computed exactly, since such a
+        node can neither match nor have children in range.  Nodes with
+        signatures are first tested against the metric's lower bounds, and
+        computations they rule out are counted in the optional counts
+        dictionary, keyed by lower bound name.
+        """
+        metric = get_metric(metric)
+        distance = metric.query(search_string, q_value, memo, counts)
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            string_distance = distance(node.profile,
+                                       threshold + node.max_edge(),
+                                       node.signatures)
+            if string_distance <= threshold and node.count:
+                if payloads:
+                    yield (node.string, string_distance,
+                           list(node.payloads or ()))
+                else:
+                    yield node.string, string_distance
+            if node.bucket:
+                for entry, bucket_distance in node.bucket.scan(
+                        metric, search_string, distance, string_distance,
+                        threshold, q_value):
+                    if bucket_distance > threshold:
+                        continue
+                    if payloads:
+                        yield (entry.string, bucket_distance,
+                               list(entry.payloads or ()))
+                    else:
+                        yield entry.string, bucket_distance
+            edges = node.edges_in_range(string_distance - threshold,
+                                        string_distance + threshold)
+            stack.extend(node.children[edge] for edge in reversed(edges))
+
+    def iterative_nn_search(self, search_string, threshold, matches,
+                            metric, q_value=2, memo=None, counts=None):
+        """
+        Search nodes for string distances less than or equal to lowest
+        observed string distance value, using an explicit stack of nodes in
+        place of recursion.  The lowest observed distance is shared by every
+        pending node, so branches are pruned as soon as a closer match is
+        found.  A threshold of None starts from the distance to this node.
+        """
+        metric = get_metric(metric)
+        distance = metric.query(search_string, q_value, memo, counts)
+        stack = [(self, 0)]
+        while stack:
+            node, lower_bound = stack.pop()
+            if threshold is None:
+                string_distance = distance(node.profile, None, node.signatures)
+            elif lower_bound > threshold:
+                continue
+            else:
+                string_distance = distance(node.profile,
+                                           threshold + node.max_edge(),
+                                           node.signatures)
+            found = [(node.string, string_distance)] if node.count else []
+            if node.bucket:
+                found.extend(
+                    (entry.string, bucket_distance)
+                    for entry, bucket_distance in node.bucket.scan(
+                        metric, search_string, distance, string_distance,
+                        threshold, q_value))
+            for string, found_distance in found:
+                if threshold is not None and found_distance > threshold:
+                    continue
+                if threshold is None or found_distance < threshold:
+                    matches.clear()
+                    threshold = found_distance
+                if found_distance in matches:
+                    matches[found_distance].append(string)
+                else:
+                    matches[found_distance] = [string]
+            if threshold is None:
+                edges = node.edges
+            else:
+                edges = node.edges_in_range(string_distance - threshold,
+                                            string_distance + threshold)
+            for edge in reversed(edges):
+                stack.append((node.children[edge],
+                              abs(string_distance - edge)))
+
+    def iterative_search_many(self, search_strings, threshold, matches,
+                              metric, q_value=2, memo=None, counts=None):
+        """
+        Search nodes for string distances less than or equal to threshold
+        value from each of several search strings in one traversal.  Each
+        node is visited once, carrying the search strings for which it is
+        still in range, and matches for search_strings[i] are appended to
+        matches[i] in the same order as iterative_search.
+        """
+        metric = get_metric(metric)
+        distances = [metric.query(search_string, q_value, memo, counts)
+                     for search_string in search_strings]
+        stack = [(self, list(range(len(search_strings))))]
+        while stack:
+            node, live = stack.pop()
+            cutoff = threshold + node.max_edge()
+            live_children = {}
+            for query in live:
+                string_distance = distances[query](node.profile, cutoff,
+                                                   node.signatures)
+                if string_distance <= threshold and node.count:
+                    matches[query].append(node.string)
+                if node.bucket:
+                    matches[query].extend(
+                        entry.string for entry, bucket_distance
+                        in node.bucket.scan(metric, search_strings[query],
+                                            distances[query],
+                                            string_distance, threshold,
+                                            q_value)
+                        if bucket_distance <= threshold)
+                for edge in node.edges_in_range(string_distance - threshold,
+                                                string_distance + threshold):
+                    live_children.setdefault(edge, []).append(query)
+            for edge in reversed(node.edges):
+                if edge in live_children:
+                    stack.append((node.children[edge], live_children[edge]))
+
+    def iterative_nn_search_many(self, search_strings, thresholds, matches,
+                                 metric, q_value=2, memo=None, counts=None):
+        """
+        Search nodes for string distances less than or equal to lowest
+        observed string distance value from each of several search strings
+        in one traversal.  thresholds and matches hold the threshold and
+        matches dictionary of each search string, as in iterative_nn_search.
+        """
+        metric = get_metric(metric)
+        distances = [metric.query(search_string, q_value, memo, counts)
+                     for search_string in search_strings]
+        stack = [(self, [(query, 0) for query in
+                         range(len(search_strings))])]
+        while stack:
+            node, live = stack.pop()
+            max_edge = node.max_edge()
+            live_children = {}
+            for query, lower_bound in live:
+                threshold = thresholds[query]
+                if threshold is None:
+                    string_distance = distances[query](node.profile, None,
+                                                       node.signatures)
+                elif lower_bound > threshold:
+                    continue
+                else:
+                    string_distance = distances[query](
+                        node.profile, threshold + max_edge, node.signatures)
+                found = []
+                if node.count:
+                    found.append((node.string, string_distance))
+                if node.bucket:
+                    found.extend(
+                        (entry.string, bucket_distance)
+                        for entry, bucket_distance in node.bucket.scan(
+                            metric, search_strings[query], distances[query],
+                            string_distance, threshold, q_value))
+                for string, found_distance in found:
+                    if threshold is not None and found_distance > threshold:
+                        continue
+                    if threshold is None or found_distance < threshold:
+                        matches[query].clear()
+                        threshold = thresholds[query] = found_distance
+                    if found_distance in matches[query]:
+                        matches[query][found_distance].append(string)
+                    else:
+                        matches[query][found_distance] = [string]
+                if threshold is None:
+                    edges = node.edges
+                else:
+                    edges = node.edges_in_range(string_distance - threshold,
+                                                string_distance + threshold)
+                for edge in edges:
+                    live_children.setdefault(edge, []).append(
+                        (query, abs(string_distance - edge)))
+            for edge in reversed(node.edges):
+                if edge in live_children:
+                    stack.append((node.children[edge], live_children[edge]))
 
 
 class BKTree:
     """
     B-K Tree class
+
+    The q_value parameter sets the q-gram window size used by the 'q_gram'
+    and 'jaccard' metrics.  Setting cache_size attaches a QueryCache of
+    that many search results, which update invalidates, and setting
+    distance_cache_size attaches a DistanceMemo of that many distances
+    between node strings and search strings.  Setting leaf_size stores
+    subtrees of up to that many strings below a node as leaf buckets, which
+    are scanned with the metric's batch kernel.
+
+    Each string is stored once, however many times it is inserted, so
+    count returns the number of distinct strings.  Payloads inserted along
+    with strings, such as the IDs of the records a string came from, are
+    kept in the node of the string and returned by searches on request,
+    which saves mapping matched strings back to records afterwards.
+
+    Removed strings are left in place as tombstones until compact rebuilds
+    the subtrees holding them; setting compact_threshold compacts the tree
+    automatically once tombstones make up more than that fraction of its
+    nodes.
+
+    Setting prefilter stores per-node signatures for the metric's lower
+    bounds, such as the length and symbol histogram bounds of levenshtein
+    distance, so that searches can rule nodes out before computing exact
+    distances.  filter_counts holds the number of exact computations each
+    lower bound avoided.  The bounds pay off for long strings; for short
+    strings the bit-parallel levenshtein kernel is cheaper than the
+    histogram bound.
     """
-    def __init__(self, strings=None, root=None, metric='levenshtein'):
+    def __init__(self, strings=None, root=None, metric='levenshtein',
+                 q_value=2, cache_size=None, distance_cache_size=None,
+                 leaf_size=None, prefilter=False, compact_threshold=None,
+                 payloads=None):
         self.nodes = 0
         self.metric = metric
+        self.q_value = q_value
+        self.leaf_size = leaf_size
+        self.prefilter = prefilter
+        self.compact_threshold = compact_threshold
+        self.filter_counts = {}
+        self.tombstones = set()
+        self.cache = None
+        self.distance_memo = None
         if strings is None:
             strings = ['']
+        # Without a root node, the root starts out as a removed placeholder
+        # for the first string, which its insertion then restores
         if root is None:
-            self.root = BKNode(strings[0])
+            self.root = self.create_node(strings[0])
+            self.root.count = 0
         else:
-            self.root = BKNode(root.string)
-            self.nodes += 1
-        for string in strings:
-            self.root.add_child(string)
+            self.root = self.create_node(root.string)
             self.nodes += 1
+        self.update(strings, payloads)
+        if cache_size:
+            self.cache = QueryCache(cache_size)
+        if distance_cache_size:
+            # Distances of asymmetric metrics are keyed by ordered pair
+            self.distance_memo = DistanceMemo(
+                maxsize=distance_cache_size,
+                symmetric=get_metric(metric).symmetric)
 
     def __str__(self):
         return str(self.root.string)
 
+    def create_node(self, string, parent=None):
+        """
+        Create BKNode for string with the profile, leaf bucket and
+        signatures the tree's settings call for.
+        """
+        metric = get_metric(self.metric)
+        return BKNode(string, parent=parent,
+                      profile=metric.profile(string, self.q_value),
+                      bucket=None if self.leaf_size is None
+                      else LeafBucket(),
+                      signatures=metric.signatures(string)
+                      if self.prefilter else None)
+
     def list_all(self):
         """
         Print all child node strings from tree root node.
@@ -126,19 +754,871 @@ class BKTree:
 
     def count(self):
         """
-        Get total number of nodes in tree.
+        Get total number of distinct strings in tree.
         """
         return self.nodes
 
-    def update(self, strings=None):
+    def update(self, strings=None, payloads=None):
         """
-        Add nodes to tree with string values from list.
+        Add nodes to tree with string values from list, along with the
+        corresponding payloads from an optional list of the same length.
         """
         if strings is None:
             return
-        for string in strings:
-            self.root.add_child(string, self.metric)
-            self.nodes += 1
+        if payloads is None:
+            records = ((string, None) for string in strings)
+        else:
+            strings = list(strings)
+            payloads = list(payloads)
+            if len(payloads) != len(strings):
+                raise ValueError('Expected %d payloads, got %d'
+                                 % (len(strings), len(payloads)))
+            records = zip(strings, payloads)
+        for string, payload in records:
+            self.tombstones.discard(string)
+            if self.root.add_child(string, self.metric, self.q_value,
+                                   self.leaf_size, self.prefilter, payload):
+                self.nodes += 1
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    def remove(self, string):
+        """
+        Remove string from tree with all of its payloads, leaving a
+        tombstone in its place unless it was held in a leaf bucket.  Returns
+        True if the string was in the tree.
+        """
+        node = self.root.remove_child(string, self.metric, self.q_value)
+        if node is None:
+            return False
+        self.nodes -= 1
+        if node.deleted and node.string == string:
+            self.tombstones.add(string)
+        if self.cache is not None:
+            self.cache.invalidate()
+        if self.compact_threshold is not None and \
+                len(self.tombstones) > self.compact_threshold * (
+                    self.nodes + len(self.tombstones)):
+            self.compact(self.compact_threshold)
+        return True
+
+    def compact(self, threshold=0.0):
+        """
+        Rebuild the subtrees in which tombstones make up more than threshold
+        of the nodes, leaving the rest of the tree in place, and return the
+        number of tombstones removed.  Only the largest such subtrees are
+        rebuilt, so a threshold of 0 removes every tombstone.
+        """
+        if not self.tombstones:
+            return 0
+        order = [self.root]
+        for node in order:
+            order.extend(node.children.values())
+        sizes = {}
+        for node in reversed(order):
+            size = 1 + len(node.bucket or ())
+            tombstones = 1 if node.deleted else 0
+            for child in node.children.values():
+                size += sizes[child][0]
+                tombstones += sizes[child][1]
+            sizes[node] = (size, tombstones)
+        removed = 0
+        stack = [(None, None, self.root)]
+        while stack:
+            parent, edge_weight, node = stack.pop()
+            size, tombstones = sizes[node]
+            if not tombstones:
+                continue
+            if tombstones > threshold * size:
+                removed += self.rebuild_subtree(parent, edge_weight, node)
+            else:
+                stack.extend((node, child_edge, child) for child_edge, child
+                             in node.children.items())
+        return removed
+
+    def rebuild_subtree(self, parent, edge_weight, node):
+        """
+        Replace the subtree rooted at node, reached from parent by
+        edge_weight, with a subtree built from its remaining strings in
+        their current order, keeping their counts and payloads.  Every
+        string in the subtree is at distance edge_weight from parent, so the
+        first becomes the new subtree root on the same edge.  Returns the
+        number of tombstones removed.
+        """
+        records = []
+        removed = 0
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.deleted:
+                self.tombstones.discard(current.string)
+                removed += 1
+            else:
+                records.append(current)
+            records.extend(current.bucket or ())
+            stack.extend(current.children[edge]
+                         for edge in reversed(current.edges))
+        if not records:
+            if parent is None:
+                # Keep the removed root as the only node of an empty tree
+                node.children = {}
+                node.edges = []
+                self.tombstones.add(node.string)
+                return removed - 1
+            del parent.children[edge_weight]
+            parent.edges.remove(edge_weight)
+            return removed
+        for record in records:
+            record.children = {}
+            record.edges = []
+            record.bucket = None
+        subtree = records[0]
+        subtree.parent = parent
+        subtree.bucket = None if self.leaf_size is None else LeafBucket()
+        for record in records[1:]:
+            subtree.insert(record, self.metric, self.q_value,
+                           self.leaf_size)
+        if parent is None:
+            self.root = subtree
+        else:
+            parent.children[edge_weight] = subtree
+        return removed
+
+    def copy_live_nodes(self):
+        """
+        Get the root of a copy of the tree without tombstones or leaf
+        buckets, built from the remaining strings in the order compact would
+        insert them, or None if every string was removed.  The tree itself
+        is left unchanged.
+        """
+        records = []
+        stack = [self.root]
+        while stack:
+            current = stack.pop()
+            if not current.deleted:
+                records.append(current)
+            records.extend(current.bucket or ())
+            stack.extend(current.children[edge]
+                         for edge in reversed(current.edges))
+        if not records:
+            return None
+        records = [BKNode(record.string, profile=record.profile,
+                          signatures=record.signatures, count=record.count,
+                          payloads=record.payloads) for record in records]
+        for record in records[1:]:
+            records[0].insert(record, self.metric, self.q_value)
+        return records[0]
+
+    def cached(self, mode, search_string, parameter):
+        """
+        Get cached result of search, or None if not cached.
+        """
+        if self.cache is None:
+            return None
+        return self.cache.get((search_string, parameter, self.metric, mode))
+
+    def store(self, mode, search_string, parameter, result):
+        """
+        Store result of search in cache, if tree has one.
+        """
+        if self.cache is not None:
+            self.cache.put((search_string, parameter, self.metric, mode),
+                           result)
+
+    def search(self, search_string, threshold=0, payloads=False):
+        """
+        Get list of strings within threshold value from search string, or
+        of (string, distance, payloads) tuples if payloads is set.
+        """
+        mode = 'search_payloads' if payloads else 'search'
+        matches = self.cached(mode, search_string, threshold)
+        if matches is not None:
+            return _copy_matches(matches, payloads)
+        matches = []
+        self.root.iterative_search(search_string, threshold, matches,
+                                   self.metric, self.q_value,
+                                   self.distance_memo, self.filter_counts,
+                                   payloads)
+        self.store(mode, search_string, threshold,
+                   tuple(_copy_matches(matches, payloads)))
+        return matches
+
+    def iter_search(self, search_string, threshold=0):
+        """
+        Generate (string, distance) tuples for the strings within threshold
+        value from search string, in the order search returns them.  The
+        tree is traversed only as far as the matches are consumed, and the
+        query cache is neither consulted nor filled.
+        """
+        return self.root.iter_search(search_string, threshold, self.metric,
+                                     self.q_value, self.distance_memo,
+                                     self.filter_counts)
+
+    def nearest_neighbors(self, search_string):
+        """
+        Get lowest string distance from search string and list of strings
+        found at that distance.
+        """
+        result = self.cached('nearest', search_string, None)
+        if result is not None:
+            return result[0], list(result[1])
+        matches = {}
+        self.root.iterative_nn_search(search_string, None, matches,
+                                      self.metric, self.q_value,
+                                      self.distance_memo, self.filter_counts)
+        if not matches:
+            return None, []
+        distance = min(matches)
+        self.store('nearest', search_string, None,
+                   (distance, tuple(matches[distance])))
+        return distance, matches[distance]
+
+    def search_many(self, search_strings, threshold=0):
+        """
+        Get list of strings within threshold value from each search string,
+        searching for all of them in one traversal.  Search strings with
+        cached results are left out of the traversal.
+        """
+        matches = [self.cached('search', search_string, threshold)
+                   for search_string in search_strings]
+        uncached = [query for query, query_matches in enumerate(matches)
+                    if query_matches is None]
+        for query in range(len(matches)):
+            if matches[query] is not None:
+                matches[query] = list(matches[query])
+            else:
+                matches[query] = []
+        self.root.iterative_search_many(
+            [search_strings[query] for query in uncached], threshold,
+            [matches[query] for query in uncached], self.metric,
+            self.q_value, self.distance_memo, self.filter_counts)
+        for query in uncached:
+            self.store('search', search_strings[query], threshold,
+                       tuple(matches[query]))
+        return matches
+
+    def nearest_neighbors_many(self, search_strings):
+        """
+        Get lowest string distance and list of strings found at that
+        distance for each search string, searching for all of them in one
+        traversal.  Search strings with cached results are left out of the
+        traversal.
+        """
+        results = [self.cached('nearest', search_string, None)
+                   for search_string in search_strings]
+        uncached = [query for query, result in enumerate(results)
+                    if result is None]
+        thresholds = [None] * len(uncached)
+        matches = [{} for query in uncached]
+        self.root.iterative_nn_search_many(
+            [search_strings[query] for query in uncached], thresholds,
+            matches, self.metric, self.q_value, self.distance_memo,
+            self.filter_counts)
+        for query, threshold, query_matches in zip(uncached, thresholds,
+                                                   matches):
+            results[query] = (threshold, query_matches.get(threshold, []))
+            self.store('nearest', search_strings[query], None,
+                       (threshold, tuple(results[query][1])))
+        return [(distance, list(strings)) for distance, strings in results]
+
+    def k_nearest_neighbors(self, search_string, k, payloads=False):
+        """
+        Get list of (string, distance) tuples for the k strings closest to
+        search string, ordered by distance, or of (string, distance,
+        payloads) tuples if payloads is set.
+
+        Subtrees are visited best-first by their lower bound |d - edge|,
+        while a bounded max-heap keeps the k closest strings found so far,
+        so the distance of the k-th closest string shrinks as a pruning
+        radius.  Strings tied with the k-th closest string are kept in the
+        order found.
+        """
+        if k <= 0:
+            return []
+        mode = 'knn_payloads' if payloads else 'knn'
+        result = self.cached(mode, search_string, k)
+        if result is not None:
+            return _copy_matches(result, payloads)
+        metric = get_metric(self.metric)
+        distance = metric.query(search_string, self.q_value,
+                                self.distance_memo, self.filter_counts)
+        closest = []
+        found = 0
+        queued = 0
+        queue = [(0, queued, self.root)]
+        while queue:
+            lower_bound, order, node = heappop(queue)
+            if len(closest) == k and lower_bound >= -closest[0][0]:
+                break
+            if len(closest) == k:
+                radius = -closest[0][0]
+                string_distance = distance(node.profile,
+                                           radius + node.max_edge(),
+                                           node.signatures)
+            else:
+                radius = None
+                string_distance = distance(node.profile, None, node.signatures)
+            candidates = []
+            if node.count:
+                candidates.append((node, string_distance))
+            if node.bucket:
+                candidates.extend(node.bucket.scan(
+                    metric, search_string, distance, string_distance, radius,
+                    self.q_value))
+            for record, candidate_distance in candidates:
+                if radius is None or candidate_distance < radius:
+                    found += 1
+                    heappush(closest, (-candidate_distance, -found, record))
+                    if len(closest) > k:
+                        heappop(closest)
+                    if len(closest) == k:
+                        radius = -closest[0][0]
+            if radius is None:
+                edges = node.edges
+            else:
+                edges = node.edges_in_range(string_distance - radius,
+                                            string_distance + radius)
+            for edge in edges:
+                queued += 1
+                heappush(queue, (abs(string_distance - edge), queued,
+                                 node.children[edge]))
+        closest.sort(reverse=True)
+        if payloads:
+            result = [(record.string, -negative_distance,
+                       list(record.payloads or ()))
+                      for negative_distance, order, record in closest]
+        else:
+            result = [(record.string, -negative_distance)
+                      for negative_distance, order, record in closest]
+        self.store(mode, search_string, k,
+                   tuple(_copy_matches(result, payloads)))
+        return result
+
+    def compile(self):
+        """
+        Convert tree into a FrozenBKTree stored in flat parallel arrays.
+
+        Nodes are numbered in breadth-first order, so the children of each
+        node are contiguous and ordered by ascending edge weight.  Leaf
+        buckets are expanded into the subtrees their strings form.  A tree
+        with tombstones is compiled from a copy rebuilt without them, which
+        leaves the tree itself unchanged, and a tree whose strings were all
+        removed compiles into a FrozenBKTree without nodes.
+        """
+        root = self.root
+        if self.tombstones:
+            root = self.copy_live_nodes()
+        if root is None:
+            return FrozenBKTree(b'', array('q', [0]), array('q'), array('q'),
+                                array('q'), metric=self.metric, nodes=0,
+                                q_value=self.q_value)
+        order = [root]
+        edge_weights = [0]
+        first_child = array('q')
+        next_sibling = array('q', [-1])
+        for node in order:
+            if node.bucket:
+                node = node.expand_bucket(self.metric, self.q_value)
+            if not node.edges:
+                first_child.append(-1)
+                continue
+            first_child.append(len(order))
+            for edge in node.edges:
+                order.append(node.children[edge])
+                edge_weights.append(edge)
+                next_sibling.append(len(order))
+            next_sibling[-1] = -1
+        if any(isinstance(edge, float) for edge in edge_weights):
+            edges = array('d', edge_weights)
+        else:
+            edges = array('q', edge_weights)
+        encoded = [node.string.encode('utf-8') for node in order]
+        offsets = array('q', [0])
+        position = 0
+        for string in encoded:
+            position += len(string)
+            offsets.append(position)
+
+        if get_metric(self.metric).preprocess is None:
+            profiles = None
+        else:
+            profiles = [node.profile for node in order]
+
+        return FrozenBKTree(b''.join(encoded), offsets, edges, first_child,
+                            next_sibling, metric=self.metric,
+                            nodes=self.nodes, q_value=self.q_value,
+                            profiles=profiles)
+
+    def save(self, path):
+        """
+        Compile tree and write it to an index file that can be opened with
+        FrozenBKTree.load.
+        """
+        self.compile().save(path)
+
+
+class FrozenBKTree:
+    """
+    Read-only B-K Tree compiled into flat parallel arrays
+
+    Node strings are stored UTF-8 encoded in one shared buffer and addressed
+    by offsets, and the tree structure is held as edge weights together with
+    first-child and next-sibling node indices, where -1 marks a missing
+    node.  Node 0 is the root, and a tree without nodes has empty arrays.
+    A DistanceMemo may be assigned to distance_memo to memoize distances
+    between node strings and search strings.
+
+    Nodes are numbered in breadth-first order, so the children of a node
+    are contiguous and sorted by edge weight, and searches select the
+    children in range by bisecting their edge weights.  The end of each
+    node's children is found once, on the first search.  For metrics with
+    profiles, such as q-gram metrics, the profile of each node is computed
+    on its first visit and kept in profiles, which compile fills from the
+    source tree.
+    """
+    def __init__(self, buffer, offsets, edges, first_child, next_sibling,
+                 metric='levenshtein', nodes=0, q_value=2, profiles=None):
+        self.buffer = buffer
+        self.offsets = offsets
+        self.edges = edges
+        self.first_child = first_child
+        self.next_sibling = next_sibling
+        self.metric = metric
+        self.nodes = nodes
+        self.q_value = q_value
+        self.profiles = profiles
+        self.child_ends = None
+        self.distance_memo = None
+        self.path = None
+        self.mapping = None
+        self.views = []
+
+    def __str__(self):
+        return self.string(0) if len(self.edges) else ''
+
+    def string(self, index):
+        """
+        Get string value of node at index.
+        """
+        return str(self.buffer[self.offsets[index]:self.offsets[index + 1]],
+                   'utf-8')
+
+    def count(self):
+        """
+        Get total number of nodes in tree.
+        """
+        return self.nodes
+
+    def save(self, path):
+        """
+        Write tree to a versioned binary index file.
+
+        Parameters
+        ----------
+        path : str
+            path of index file to write
+        """
+        metric = self.metric.encode('utf-8')
+        typecodes = []
+        arrays = []
+        for values in (self.offsets, self.edges, self.first_child,
+                       self.next_sibling):
+            # Trees opened with load hold memoryviews rather than arrays
+            if isinstance(values, memoryview):
+                values = array(values.format, values)
+            else:
+                values = array(values.typecode, values)
+            if sys.byteorder == 'big':
+                values.byteswap()
+            typecodes.append(values.typecode)
+            arrays.append(values.tobytes())
+        with open(path, 'wb') as index_file:
+            index_file.write(INDEX_HEADER.pack(
+                INDEX_MAGIC, INDEX_VERSION, typecodes[1].encode('ascii'),
+                len(self.edges), self.nodes, len(self.buffer), self.q_value,
+                len(metric)))
+            index_file.write(metric)
+            for section in arrays + [bytes(self.buffer)]:
+                index_file.write(b'\x00' * (_align(index_file.tell()) -
+                                            index_file.tell()))
+                index_file.write(section)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Open index file written by save, memory-mapping it so that searches
+        read nodes directly from the file without deserialising the tree.
+
+        Parameters
+        ----------
+        path : str
+            path of index file to open
+
+        Return value
+        ------------
+        tree : FrozenBKTree
+            tree backed by the mapped file
+
+        Exceptions
+        ----------
+        ValueError - file is not a B-K Tree index, has unsupported version
+        or is truncated
+        """
+        with open(path, 'rb') as index_file:
+            mapping = mmap.mmap(index_file.fileno(), 0,
+                                access=mmap.ACCESS_READ)
+        view = memoryview(mapping)
+        if len(view) < INDEX_HEADER.size:
+            raise ValueError('not a B-K Tree index file: %s' % path)
+        (magic, version, edge_type, length, nodes, buffer_length, q_value,
+         metric_length) = INDEX_HEADER.unpack_from(view)
+        if magic != INDEX_MAGIC:
+            raise ValueError('not a B-K Tree index file: %s' % path)
+        if version != INDEX_VERSION:
+            raise ValueError('unsupported B-K Tree index version %d: %s' %
+                             (version, path))
+        edge_type = edge_type.decode('ascii')
+        if min(length, buffer_length, metric_length) < 0 or \
+                edge_type not in ('q', 'd'):
+            raise ValueError('corrupt B-K Tree index header: %s' % path)
+        position = INDEX_HEADER.size + metric_length
+        for size in (length + 1, length, length, length):
+            position = _align(position) + 8 * size
+        if _align(position) + buffer_length > len(view):
+            raise ValueError('truncated B-K Tree index file: %s' % path)
+        position = INDEX_HEADER.size
+        metric = str(view[position:position + metric_length], 'utf-8')
+        position += metric_length
+        arrays = []
+        for typecode, size in (('q', length + 1), (edge_type, length),
+                               ('q', length), ('q', length)):
+            position = _align(position)
+            section = view[position:position + 8 * size]
+            if sys.byteorder == 'big':
+                section = array(typecode, section.tobytes())
+                section.byteswap()
+            else:
+                section = section.cast(typecode)
+            arrays.append(section)
+            position += 8 * size
+        position = _align(position)
+        buffer = view[position:position + buffer_length]
+        tree = cls(buffer, *arrays, metric=metric, nodes=nodes,
+                   q_value=q_value)
+        tree.path = path
+        tree.mapping = mapping
+        tree.views = [view, buffer] + arrays
+        return tree
+
+    def close(self):
+        """
+        Release memory-mapped index file, if tree was opened with load.
+        """
+        if self.mapping is None:
+            return
+        for view in reversed(self.views):
+            if isinstance(view, memoryview):
+                view.release()
+        self.mapping.close()
+        self.mapping = None
+        self.views = []
+
+    def profile(self, index):
+        """
+        Get profile of node at index for the tree's metric.  Profiles other
+        than the string itself are computed once and kept in profiles.
+        """
+        metric = get_metric(self.metric)
+        if metric.preprocess is None:
+            return self.string(index)
+        if self.profiles is None:
+            self.profiles = [None] * len(self.edges)
+        profile = self.profiles[index]
+        if profile is None:
+            profile = self.profiles[index] = metric.profile(
+                self.string(index), self.q_value)
+        return profile
+
+    def string_distance(self, index, search_string):
+        """
+        Compute string distance from search string to node at index.
+        """
+        metric = get_metric(self.metric)
+        distance = metric.query(search_string, self.q_value,
+                                self.distance_memo)
+        return distance(self.profile(index), None)
+
+    def find_child_ends(self):
+        """
+        Get array holding, for each node, the index following its last
+        child, or -1 for a leaf.  Since the children of consecutive nodes
+        are consecutive, each node's children end where those of the next
+        node with children begin.
+        """
+        if self.child_ends is None:
+            child_ends = array('q', [-1]) * len(self.first_child)
+            previous = None
+            for index, child in enumerate(self.first_child):
+                if child != -1:
+                    if previous is not None:
+                        child_ends[previous] = child
+                    previous = index
+            if previous is not None:
+                child_ends[previous] = len(self.edges)
+            self.child_ends = child_ends
+        return self.child_ends
+
+    def children_in_range(self, index, low, high):
+        """
+        Get range of indices of the children of node at index whose edge
+        weights lie between low and high, inclusive.
+        """
+        first = self.first_child[index]
+        if first == -1:
+            return range(0)
+        end = self.find_child_ends()[index]
+        return range(bisect_left(self.edges, low, first, end),
+                     bisect_right(self.edges, high, first, end))
+
+    def max_edge(self, index):
+        """
+        Get largest child edge weight of node at index, or 0 for a leaf.
+        """
+        if self.first_child[index] == -1:
+            return 0
+        return self.edges[self.find_child_ends()[index] - 1]
+
+    def search(self, search_string, threshold=0, start=0):
+        """
+        Get list of strings within threshold value from search string, in
+        the subtree rooted at node index start.
+        """
+        return [string for string, string_distance in self.iter_search(
+            search_string, threshold, start)]
+
+    def iter_search(self, search_string, threshold=0, start=0):
+        """
+        Generate (string, distance) tuples for the strings within threshold
+        value from search string, in the subtree rooted at node index start,
+        in the order search returns them.  The tree is traversed only as far
+        as the matches are consumed.
+        """
+        distance = get_metric(self.metric).query(
+            search_string, self.q_value, self.distance_memo)
+        edges = self.edges
+        first_child = self.first_child
+        child_ends = self.find_child_ends()
+        stack = [start] if len(edges) else []
+        while stack:
+            index = stack.pop()
+            first = first_child[index]
+            end = child_ends[index]
+            string_distance = distance(
+                self.profile(index),
+                threshold + (edges[end - 1] if first != -1 else 0))
+            if string_distance <= threshold:
+                yield self.string(index), string_distance
+            if first != -1:
+                stack.extend(reversed(range(
+                    bisect_left(edges, string_distance - threshold, first,
+                                end),
+                    bisect_right(edges, string_distance + threshold, first,
+                                 end))))
+
+    def nearest_neighbors(self, search_string, start=0, bound=None):
+        """
+        Get lowest string distance from search string and list of strings
+        found at that distance, in the subtree rooted at node index start.
+
+        The optional bound is a shared value, such as a
+        multiprocessing.Value, holding the lowest distance found so far by
+        concurrent searches of other subtrees.  It is read to prune this
+        search and lowered whenever a closer match is found.  When it
+        prunes the search, the returned distance may exceed bound.value and
+        the caller should discard the result.
+        """
+        distance = get_metric(self.metric).query(
+            search_string, self.q_value, self.distance_memo)
+        edges = self.edges
+        first_child = self.first_child
+        child_ends = self.find_child_ends()
+        threshold = None
+        matches = []
+        stack = [(start, 0)] if len(edges) else []
+        while stack:
+            index, lower_bound = stack.pop()
+            limit = threshold
+            if bound is not None and (limit is None or bound.value < limit):
+                limit = bound.value
+            if limit is not None and lower_bound > limit:
+                continue
+            first = first_child[index]
+            end = child_ends[index]
+            string = self.string(index)
+            if limit is None:
+                string_distance = distance(self.profile(index), None)
+            else:
+                string_distance = distance(
+                    self.profile(index),
+                    limit + (edges[end - 1] if first != -1 else 0))
+            if limit is None or string_distance <= limit:
+                if threshold is None or string_distance < threshold:
+                    threshold = limit = string_distance
+                    matches = [string]
+                    if bound is not None:
+                        with bound.get_lock():
+                            if threshold < bound.value:
+                                bound.value = threshold
+                elif string_distance == threshold:
+                    matches.append(string)
+            if first != -1:
+                stack.extend(
+                    (child, abs(string_distance - edges[child]))
+                    for child in reversed(range(
+                        bisect_left(edges, string_distance - limit, first,
+                                    end),
+                        bisect_right(edges, string_distance + limit, first,
+                                     end))))
+        return threshold, matches
+
+    def k_nearest_neighbors(self, search_string, k):
+        """
+        Get list of (string, distance) tuples for the k strings closest to
+        search string, ordered by distance, visiting subtrees best-first as
+        in BKTree.k_nearest_neighbors.
+        """
+        if k <= 0:
+            return []
+        distance = get_metric(self.metric).query(
+            search_string, self.q_value, self.distance_memo)
+        closest = []
+        found = 0
+        queue = [(0, 0)] if len(self.edges) else []
+        while queue:
+            lower_bound, index = heappop(queue)
+            if len(closest) == k and lower_bound >= -closest[0][0]:
+                break
+            string = self.string(index)
+            profile = self.profile(index)
+            if len(closest) == k:
+                radius = -closest[0][0]
+                string_distance = distance(profile,
+                                           radius + self.max_edge(index))
+            else:
+                radius = None
+                string_distance = distance(profile, None)
+            if radius is None or string_distance < radius:
+                found += 1
+                heappush(closest, (-string_distance, -found, string))
+                if len(closest) > k:
+                    heappop(closest)
+                if len(closest) == k:
+                    radius = -closest[0][0]
+            if radius is None:
+                children = self.children_in_range(index, float('-inf'),
+                                                  float('inf'))
+            else:
+                children = self.children_in_range(index,
+                                                  string_distance - radius,
+                                                  string_distance + radius)
+            for child in children:
+                heappush(queue, (abs(string_distance - self.edges[child]),
+                                 child))
+        return [(string, -negative_distance) for negative_distance, order,
+                string in sorted(closest, reverse=True)]
+
+    def search_many(self, search_strings, threshold=0):
+        """
+        Get list of strings within threshold value from each search string,
+        searching for all of them in one traversal.
+        """
+        metric = get_metric(self.metric)
+        distances = [metric.query(search_string, self.q_value,
+                                  self.distance_memo)
+                     for search_string in search_strings]
+        edges = self.edges
+        first_child = self.first_child
+        child_ends = self.find_child_ends()
+        matches = [[] for search_string in search_strings]
+        stack = [(0, list(range(len(search_strings))))]
+        if not len(edges):
+            stack = []
+        while stack:
+            index, live = stack.pop()
+            first = first_child[index]
+            end = child_ends[index]
+            string = self.string(index)
+            profile = self.profile(index)
+            cutoff = threshold + (edges[end - 1] if first != -1 else 0)
+            live_children = {}
+            for query in live:
+                string_distance = distances[query](profile, cutoff)
+                if string_distance <= threshold:
+                    matches[query].append(string)
+                if first == -1:
+                    continue
+                for child in range(
+                        bisect_left(edges, string_distance - threshold,
+                                    first, end),
+                        bisect_right(edges, string_distance + threshold,
+                                     first, end)):
+                    live_children.setdefault(child, []).append(query)
+            for child in sorted(live_children, reverse=True):
+                stack.append((child, live_children[child]))
+        return matches
+
+    def nearest_neighbors_many(self, search_strings):
+        """
+        Get lowest string distance and list of strings found at that
+        distance for each search string, searching for all of them in one
+        traversal.
+        """
+        metric = get_metric(self.metric)
+        distances = [metric.query(search_string, self.q_value,
+                                  self.distance_memo)
+                     for search_string in search_strings]
+        edges = self.edges
+        first_child = self.first_child
+        child_ends = self.find_child_ends()
+        thresholds = [None] * len(search_strings)
+        matches = [[] for search_string in search_strings]
+        stack = [(0, [(query, 0) for query in range(len(search_strings))])]
+        if not len(edges):
+            stack = []
+        while stack:
+            index, live = stack.pop()
+            first = first_child[index]
+            end = child_ends[index]
+            string = self.string(index)
+            profile = self.profile(index)
+            max_edge = edges[end - 1] if first != -1 else 0
+            live_children = {}
+            for query, lower_bound in live:
+                threshold = thresholds[query]
+                if threshold is None:
+                    string_distance = distances[query](profile, None)
+                elif lower_bound > threshold:
+                    continue
+                else:
+                    string_distance = distances[query](profile,
+                                                       threshold + max_edge)
+                if threshold is None or string_distance < threshold:
+                    threshold = thresholds[query] = string_distance
+                    matches[query] = [string]
+                elif string_distance == threshold:
+                    matches[query].append(string)
+                if first == -1:
+                    continue
+                for child in range(
+                        bisect_left(edges, string_distance - threshold,
+                                    first, end),
+                        bisect_right(edges, string_distance + threshold,
+                                     first, end)):
+                    live_children.setdefault(child, []).append(
+                        (query, abs(string_distance - edges[child])))
+            for child in sorted(live_children, reverse=True):
+                stack.append((child, live_children[child]))
+        return list(zip(thresholds, matches))
 
 
 def bk_search(search_string, tree, threshold=0):
@@ -150,7 +1630,7 @@ def bk_search(search_string, tree, threshold=0):
     ----------
     search_string : str
         search string
-    tree : BKTree
+    tree : BKTree or FrozenBKTree
         tree to search
     threshold : int
         maximum string distance for returned matches
@@ -162,12 +1642,44 @@ def bk_search(search_string, tree, threshold=0):
         threshold value
     """
     matches = [threshold]
-    tree.root.recursive_search(search_string, threshold, matches,
-                               tree.metric)
+    matches.extend(tree.search(search_string, threshold))
 
     return matches
 
 
+def bk_iter_search(search_string, tree, threshold=0, limit=None):
+    """
+    Search tree for strings within supplied threshold value from search
+    string, generating matches as they are found.  The search stops as soon
+    as limit matches have been generated or the caller stops iterating, so
+    the rest of the tree is never visited.
+
+    Parameters
+    ----------
+    search_string : str
+        search string
+    tree : BKTree, FrozenBKTree or other index with an iter_search method
+        tree to search
+    threshold : int
+        maximum string distance for generated matches
+    limit : int
+        maximum number of matches to generate, or None for all of them
+
+    Return values
+    -------------
+    matches : generator
+        generator of (string, distance) tuples, in the order bk_search
+        returns the strings
+    """
+    if limit is not None and limit <= 0:
+        return
+    for count, match in enumerate(tree.iter_search(search_string, threshold),
+                                  1):
+        yield match
+        if count == limit:
+            return
+
+
 def bk_nearest_neighbor_search(search_string, tree):
     """
     Search tree for nearest matches to supplied string.
@@ -176,7 +1688,7 @@ def bk_nearest_neighbor_search(search_string, tree):
     ----------
     search_string : str
         search string
-    tree : BKTree
+    tree : BKTree or FrozenBKTree
         tree to search
 
     Return values
@@ -185,14 +1697,94 @@ def bk_nearest_neighbor_search(search_string, tree):
         list of strings containing nearest matches from tree, where first item
         is distance from search_string to nearest matches
     """
-    threshold = tree.root.distance_metric[tree.metric](search_string,
-                                                       tree.root.string)
-    matches_dictionary = {}
-    matches_dictionary[threshold] = []
-    tree.root.recursive_nn_search(search_string, threshold,
-                                  matches_dictionary, tree.metric)
-    matches = [sorted(matches_dictionary.keys())[0]]
-    for value in matches_dictionary[matches[0]]:
-        matches.append(value)
+    distance, strings = tree.nearest_neighbors(search_string)
+    matches = [distance]
+    matches.extend(strings)
 
     return matches
+
+
+def bk_knn_search(search_string, tree, k=1):
+    """
+    Search tree for the k strings closest to supplied string.
+
+    Parameters
+    ----------
+    search_string : str
+        search string
+    tree : BKTree or FrozenBKTree
+        tree to search
+    k : int
+        number of strings to return
+
+    Return values
+    -------------
+    matches : list
+        list of up to k (string, distance) tuples, ordered by increasing
+        distance from search_string
+    """
+    return tree.k_nearest_neighbors(search_string, k)
+
+
+def bk_search_many(search_strings, tree, threshold=0):
+    """
+    Search tree for all strings within supplied threshold value from each of
+    several search strings.  The tree is traversed once, with each node
+    compared against every search string still in range of it.
+
+    Parameters
+    ----------
+    search_strings : list
+        list of search strings
+    tree : BKTree or FrozenBKTree
+        tree to search
+    threshold : int
+        maximum string distance for returned matches
+
+    Return values
+    -------------
+    matches : list
+        list with one entry per search string, each in the format returned
+        by bk_search
+    """
+    search_strings = list(search_strings)
+    unique_strings = list(dict.fromkeys(search_strings))
+    if hasattr(tree, 'search_many'):
+        strings = tree.search_many(unique_strings, threshold)
+    else:
+        strings = [tree.search(search_string, threshold)
+                   for search_string in unique_strings]
+    strings = dict(zip(unique_strings, strings))
+    return [[threshold] + strings[search_string]
+            for search_string in search_strings]
+
+
+def bk_nearest_neighbor_search_many(search_strings, tree):
+    """
+    Search tree for nearest matches to each of several search strings.  The
+    tree is traversed once, with each node compared against every search
+    string still in range of it.
+
+    Parameters
+    ----------
+    search_strings : list
+        list of search strings
+    tree : BKTree or FrozenBKTree
+        tree to search
+
+    Return values
+    -------------
+    matches : list
+        list with one entry per search string, each in the format returned
+        by bk_nearest_neighbor_search
+    """
+    search_strings = list(search_strings)
+    unique_strings = list(dict.fromkeys(search_strings))
+    if hasattr(tree, 'nearest_neighbors_many'):
+        results = tree.nearest_neighbors_many(unique_strings)
+    else:
+        results = [tree.nearest_neighbors(search_string)
+                   for search_string in unique_strings]
+    results = dict(zip(unique_strings, results))
+    return [[results[search_string][0]] + results[search_string][1]
+            for search_string in search_strings]
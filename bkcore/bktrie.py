@@ -0,0 +1,158 @@
+"""
+Prefix trie levenshtein search engine
+"""
+# --- Imports
+
+# String distance metrics
+from bkmetrics import get_metric
+
+
+# --- Trie Classes
+
+class TrieNode:
+    """
+    Prefix trie node class
+
+    Children are stored in a dictionary keyed by symbol.  A node that ends
+    a string of the trie holds that string, and other nodes hold None.
+    """
+    __slots__ = ('children', 'string')
+
+    def __init__(self):
+        self.children = {}
+        self.string = None
+
+
+class TrieIndex:
+    """
+    Prefix trie index class for levenshtein distance
+
+    An alternative engine to BKTree with the same search methods, for
+    levenshtein distance only.  A search walks the trie depth-first,
+    computing one row of the dynamic programming matrix between the search
+    string and each trie prefix from the row of its parent, so strings with
+    a common prefix share the computation of its rows.  A subtree is pruned
+    as soon as every entry of a row exceeds the threshold, and only the band
+    of entries within threshold of the diagonal is computed, so searches
+    with small thresholds visit few nodes below the first few levels.
+
+    Nearest-neighbor searches repeat the search with increasing thresholds
+    until strings are found, which is efficient when the closest strings
+    are close to the search string.
+    """
+    def __init__(self, strings=None, metric='levenshtein', q_value=2):
+        if get_metric(metric).name != 'levenshtein':
+            raise ValueError('TrieIndex supports levenshtein distance only, '
+                             'not %r' % (metric,))
+        self.metric = metric
+        self.q_value = q_value
+        self.root = TrieNode()
+        self.strings = 0
+        self.longest = 0
+        self.update(strings)
+
+    def __str__(self):
+        return 'TrieIndex of %d strings' % (self.strings,)
+
+    def count(self):
+        """
+        Get total number of strings in index.
+        """
+        return self.strings
+
+    def update(self, strings=None):
+        """
+        Add strings to index.  Strings already in the index are ignored.
+        """
+        if strings is None:
+            return
+        for string in strings:
+            node = self.root
+            for symbol in string:
+                child = node.children.get(symbol)
+                if child is None:
+                    child = node.children[symbol] = TrieNode()
+                node = child
+            if node.string is None:
+                node.string = string
+                self.strings += 1
+                self.longest = max(self.longest, len(string))
+
+    def search(self, search_string, threshold=0):
+        """
+        Get list of strings within threshold value from search string.
+        """
+        return [string for string, string_distance in self.iter_search(
+            search_string, threshold)]
+
+    def iter_search(self, search_string, threshold=0):
+        """
+        Generate (string, distance) tuples for the strings within threshold
+        value from search string, in depth-first trie order.  The trie is
+        walked only as far as the matches are consumed.
+
+        Row entries are capped at threshold + 1, and entries outside the
+        band of the diagonal are left at the cap, since no alignment through
+        them can be within threshold.
+        """
+        length = len(search_string)
+        cap = threshold + 1
+        first_row = [min(position, cap) for position in range(length + 1)]
+        if self.root.string is not None and first_row[length] <= threshold:
+            yield self.root.string, first_row[length]
+        stack = [(child, symbol, first_row, 1) for symbol, child
+                 in reversed(self.root.children.items())]
+        while stack:
+            node, symbol, previous_row, depth = stack.pop()
+            row = [cap] * (length + 1)
+            best = left = row[0] = min(depth, cap)
+            start = max(1, depth - threshold)
+            diagonal = previous_row[start - 1]
+            for position in range(start, min(length, depth + threshold) + 1):
+                above = previous_row[position]
+                if search_string[position - 1] != symbol:
+                    diagonal += 1
+                if left < diagonal:
+                    diagonal = left + 1
+                if above < diagonal:
+                    diagonal = above + 1
+                if diagonal > cap:
+                    diagonal = cap
+                row[position] = left = diagonal
+                if left < best:
+                    best = left
+                diagonal = above
+            if node.string is not None and row[length] <= threshold:
+                yield node.string, row[length]
+            if best <= threshold:
+                stack.extend((child, child_symbol, row, depth + 1)
+                             for child_symbol, child
+                             in reversed(node.children.items()))
+
+    def nearest_neighbors(self, search_string):
+        """
+        Get lowest string distance from search string and list of strings
+        found at that distance.  The distance is None when the index is
+        empty.
+        """
+        if not self.strings:
+            return None, []
+        for threshold in range(max(len(search_string), self.longest) + 1):
+            matches = self.search(search_string, threshold)
+            if matches:
+                return threshold, matches
+        return None, []
+
+    def k_nearest_neighbors(self, search_string, k):
+        """
+        Get list of (string, distance) tuples for the k strings closest to
+        search string, ordered by distance.
+        """
+        if k <= 0 or not self.strings:
+            return []
+        for threshold in range(max(len(search_string), self.longest) + 1):
+            matches = list(self.iter_search(search_string, threshold))
+            if len(matches) >= k:
+                break
+        matches.sort(key=lambda match: match[1])
+        return matches[:k]
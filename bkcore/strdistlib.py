@@ -3,6 +3,16 @@ String distance algorithm implementations
 """
 # --- Imports
 
+# Standard library
+from collections import Counter
+from collections import OrderedDict
+
+# Optional packages
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 # --- String Distance Algorithms
 
@@ -42,6 +52,203 @@ def calculate_levenshtein_distance(string1, string2):
     return prev[-1]
 
 
+def calculate_bounded_levenshtein_distance(string1, string2, max_distance):
+    """
+    Compute the levenshtein distance between string1 and string2 if it does
+    not exceed max_distance.  Only the diagonal band of cells within
+    max_distance of the main diagonal is filled, and the calculation stops
+    as soon as every cell in a row exceeds max_distance.
+
+    Parameters
+    ----------
+    string1 : str
+        string to calculate distance from
+    string2 : str
+        string to calculate distance to
+    max_distance : int
+        largest distance of interest
+
+    Return value
+    ------------
+    distance : int
+        levenshtein distance, or max_distance + 1 if the distance is greater
+        than max_distance
+    """
+    if len(string1) < len(string2):
+        string1, string2 = string2, string1
+    exceeded = max_distance + 1
+    if len(string1) - len(string2) > max_distance:
+        return exceeded
+
+    if not string2:
+        return len(string1)
+
+    columns = len(string2)
+    prev = [min(j, exceeded) for j in range(columns + 1)]
+    for i, curr1 in enumerate(string1, 1):
+        curr = [exceeded] * (columns + 1)
+        curr[0] = min(i, exceeded)
+        row_minimum = curr[0]
+        for j in range(max(1, i - max_distance),
+                       min(columns, i + max_distance) + 1):
+            distance = min(prev[j] + 1, curr[j - 1] + 1,
+                           prev[j - 1] + (curr1 != string2[j - 1]),
+                           exceeded)
+            curr[j] = distance
+            if distance < row_minimum:
+                row_minimum = distance
+        if row_minimum > max_distance:
+            return exceeded
+        prev = curr
+
+    return prev[-1]
+
+
+class LevenshteinPattern:
+    """
+    Search string preprocessed for Myers' bit-parallel levenshtein distance
+    algorithm, in the formulation of Hyyrö.
+
+    A bit mask of the positions of every symbol in the pattern is built
+    once, after which the distance to any text is computed in a single pass
+    over the text using integer bitwise operations, with one bit per pattern
+    position.  Python integers have arbitrary precision, so patterns of any
+    length are supported.
+    """
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.length = len(pattern)
+        self.masks = {}
+        for position, symbol in enumerate(pattern):
+            self.masks[symbol] = self.masks.get(symbol, 0) | (1 << position)
+        self.all_bits = (1 << self.length) - 1
+        self.last_bit = 1 << (self.length - 1) if self.length else 0
+
+    def distance(self, text, max_distance=None):
+        """
+        Compute the levenshtein distance from the pattern to text.
+
+        Parameters
+        ----------
+        text : str
+            string to calculate distance to
+        max_distance : int
+            optional largest distance of interest
+
+        Return value
+        ------------
+        score : int
+            levenshtein distance, or max_distance + 1 if max_distance is
+            given and the distance is greater than max_distance
+        """
+        remaining = len(text)
+        if max_distance is not None and \
+                abs(self.length - remaining) > max_distance:
+            return max_distance + 1
+        if not self.length:
+            return remaining
+
+        masks = self.masks
+        all_bits = self.all_bits
+        last_bit = self.last_bit
+        positive = all_bits
+        negative = 0
+        score = self.length
+        for symbol in text:
+            remaining -= 1
+            matches = masks.get(symbol, 0)
+            vertical = matches | negative
+            horizontal = ((((matches & positive) + positive) & all_bits) ^
+                          positive) | matches
+            horizontal_positive = negative | (~(horizontal | positive) &
+                                              all_bits)
+            horizontal_negative = positive & horizontal
+            if horizontal_positive & last_bit:
+                score += 1
+            elif horizontal_negative & last_bit:
+                score -= 1
+            # Each remaining text symbol lowers the score by at most one
+            if max_distance is not None and \
+                    score - remaining > max_distance:
+                return max_distance + 1
+            horizontal_positive = ((horizontal_positive << 1) | 1) & all_bits
+            horizontal_negative = (horizontal_negative << 1) & all_bits
+            positive = horizontal_negative | (~(vertical |
+                                                horizontal_positive) &
+                                              all_bits)
+            negative = horizontal_positive & vertical
+
+        return score
+
+
+def calculate_bit_parallel_levenshtein_distance(string1, string2):
+    """
+    Compute the levenshtein distance between string1 and string2 with
+    Myers' bit-parallel algorithm.
+
+    Parameters
+    ----------
+    string1 : str
+        string to calculate distance from
+    string2 : str
+        string to calculate distance to
+
+    Return value
+    ------------
+    distance : int
+        levenshtein distance
+    """
+    return LevenshteinPattern(string1).distance(string2)
+
+
+def generate_symbol_histogram(string):
+    """
+    Count the occurences of each symbol in a string.
+
+    Parameters
+    ----------
+    string : str
+        string to count symbols of
+
+    Return value
+    ------------
+    histogram : Counter
+        number of occurences of each symbol in string
+    """
+    return Counter(string)
+
+
+def calculate_histogram_lower_bound(histogram1, histogram2):
+    """
+    Compute a lower bound on the levenshtein distance between two strings
+    from their symbol histograms.  Every edit raises at most one symbol
+    count and lowers at most one, so the distance is at least the total
+    excess of either string's counts over the other's.
+
+    Parameters
+    ----------
+    histogram1 : Counter
+        symbol histogram of first string
+    histogram2 : Counter
+        symbol histogram of second string
+
+    Return value
+    ------------
+    lower_bound : int
+        lower bound on levenshtein distance
+    """
+    if len(histogram1) > len(histogram2):
+        histogram1, histogram2 = histogram2, histogram1
+    excess = 0
+    for symbol, count in histogram1.items():
+        difference = count - histogram2.get(symbol, 0)
+        if difference > 0:
+            excess += difference
+    # The other string's excess follows from the difference in length
+    return max(excess, excess + sum(histogram2.values()) -
+               sum(histogram1.values()))
+
+
 def calculate_lc_substring_length(string1, string2):
     """
     Calculate the number of maximum consecutive symbols shared between two
@@ -105,6 +312,34 @@ def calculate_hamming_distance(string1, string2):
     return hamming
 
 
+def count_hamming_mismatches(string1, string2):
+    """
+    Count the positions at which two strings of equal length differ, which
+    is the minimum number of substitutions required to change string1 into
+    string2.
+
+    Parameters
+    ----------
+    string1 : str
+        string to calculate distance from
+    string2 : str
+        string to calculate distance to
+
+    Return value
+    ------------
+    mismatches : int
+        hamming distance
+
+    Exceptions
+    ----------
+    ValueError - length of string1 and string2 differ
+    """
+    if len(string1) != len(string2):
+        raise ValueError('Hamming distance requires strings of equal length')
+    return sum(symbol1 != symbol2
+               for symbol1, symbol2 in zip(string1, string2))
+
+
 def generate_q_gram_matrix(string1, string2, q_value):
     """
     Generate a vector of q-gram occurences in two strings given a
@@ -145,7 +380,103 @@ def generate_q_gram_matrix(string1, string2, q_value):
     return q_gram_matrix1, q_gram_matrix2
 
 
-def calculate_q_gram_distance(string1, string2, q_value):
+def generate_q_gram_profile(string, q_value):
+    """
+    Generate the multiset of q-grams occuring in a string given a window
+    size of q.
+
+    Parameters
+    ----------
+    string : str
+        string to generate q-grams from
+    q_value : int
+        size of q-gram window
+
+    Return value
+    ------------
+    profile : Counter
+        number of occurences of each q-gram in string
+    """
+    return Counter(string[i:i + q_value]
+                   for i in range(len(string) - q_value + 1))
+
+
+def count_shared_q_grams(profile1, profile2):
+    """
+    Count the q-grams shared between two q-gram profiles, as the size of
+    their multiset intersection.
+
+    Parameters
+    ----------
+    profile1 : Counter
+        q-gram profile of first string
+    profile2 : Counter
+        q-gram profile of second string
+
+    Return value
+    ------------
+    q_gram_count : int
+        number of shared q-grams
+    """
+    if len(profile1) > len(profile2):
+        profile1, profile2 = profile2, profile1
+    q_gram_count = 0
+    for q_gram, count in profile1.items():
+        other_count = profile2.get(q_gram)
+        if other_count:
+            q_gram_count += min(count, other_count)
+    return q_gram_count
+
+
+def calculate_q_gram_profile_distance(profile1, profile2):
+    """
+    Calculate the sum of the absolute differences between two q-gram
+    profiles.
+
+    Parameters
+    ----------
+    profile1 : Counter
+        q-gram profile of string to calculate distance from
+    profile2 : Counter
+        q-gram profile of string to calculate distance to
+
+    Return value
+    ------------
+    q_gram_distance : int
+        q-gram distance
+    """
+    q_gram_count = count_shared_q_grams(profile1, profile2)
+    return (sum(profile1.values()) + sum(profile2.values()) -
+            (2 * q_gram_count))
+
+
+def calculate_jaccard_profile_distance(profile1, profile2):
+    """
+    Calculate Jaccard distance between two q-gram profiles, where distance
+    is one minus the quotient of the number of shared q-grams to the total
+    number of observed q-grams.
+
+    Parameters
+    ----------
+    profile1 : Counter
+        q-gram profile of string to calculate distance from
+    profile2 : Counter
+        q-gram profile of string to calculate distance to
+
+    Return value
+    ------------
+    jaccard_distance : float
+        jaccard distance
+    """
+    q_gram_count = count_shared_q_grams(profile1, profile2)
+    observed_q_gram = (sum(profile1.values()) + sum(profile2.values()) -
+                       q_gram_count)
+    if not observed_q_gram:
+        return 0.0
+    return 1 - (float(q_gram_count) / observed_q_gram)
+
+
+def calculate_q_gram_distance(string1, string2, q_value=2):
     """
     Calculate the sum of the absolute differences between two q-gram matricies
     from strings.
@@ -164,22 +495,12 @@ def calculate_q_gram_distance(string1, string2, q_value):
     q_gram_distance : int
         q-gram distance
     """
-    s1len = len(string1)
-    s2len = len(string2)
-    q_gram_count = 0
-    q_gram_matricies = generate_q_gram_matrix(string1, string2, q_value)
-    q_gram_matrix1 = q_gram_matricies[0]
-    q_gram_matrix2 = q_gram_matricies[1]
-    for qgram1, qgram1 in enumerate(q_gram_matrix1):
-        for qgram2, qgram2 in enumerate(q_gram_matrix2):
-            if qgram1 == qgram2:
-                q_gram_count = q_gram_count + 1
-    q_gram_distance = ((s1len - q_value + 1) +
-                       (s2len - q_value + 1)) - (2 * q_gram_count)
-    return q_gram_distance
+    return calculate_q_gram_profile_distance(
+        generate_q_gram_profile(string1, q_value),
+        generate_q_gram_profile(string2, q_value))
 
 
-def calculate_jaccard_distance(string1, string2, q_value):
+def calculate_jaccard_distance(string1, string2, q_value=2):
     """
     Calculate Jaccard distance, where distance is one minues the quotient of
     the number of shared q-grams to the total number of unique q-grams between
@@ -199,17 +520,314 @@ def calculate_jaccard_distance(string1, string2, q_value):
     jaccard_distace : float
         jaccard distance
     """
-    s1len = len(string1)
-    s2len = len(string2)
-    q_gram_count = 0
-    q_gram_matricies = generate_q_gram_matrix(string1, string2, q_value)
-    q_gram_matrix1 = q_gram_matricies[0]
-    q_gram_matrix2 = q_gram_matricies[1]
-    for qgram1, qgram1 in enumerate(q_gram_matrix1):
-        for qgram2, qgram2 in enumerate(q_gram_matrix2):
-            if qgram1 == qgram2:
-                q_gram_count = q_gram_count + 1
-    observed_q_gram = ((s1len - q_value + 1) +
-                       (s2len - q_value + 1)) - (q_gram_count)
-    jaccard_distance = (1 - (float(q_gram_count)) / observed_q_gram)
-    return jaccard_distance
+    return calculate_jaccard_profile_distance(
+        generate_q_gram_profile(string1, q_value),
+        generate_q_gram_profile(string2, q_value))
+
+
+# --- Vectorized One-to-Many Distances
+
+def encode_strings(strings):
+    """
+    Encode strings as a matrix of Unicode code points, one string per row,
+    padded with zeros to the length of the longest string.  Requires NumPy.
+
+    Parameters
+    ----------
+    strings : list
+        strings to encode
+
+    Return values
+    -------------
+    matrix, lengths : numpy.ndarray
+        uint32 code point matrix and int64 string lengths
+    """
+    lengths = numpy.fromiter((len(string) for string in strings),
+                             dtype=numpy.int64, count=len(strings))
+    width = int(lengths.max()) if len(strings) else 0
+    matrix = numpy.zeros((len(strings), width), dtype=numpy.uint32)
+    codes = numpy.frombuffer(''.join(strings).encode('utf-32-le'),
+                             dtype='<u4')
+    matrix[numpy.arange(width) < lengths[:, None]] = codes
+    return matrix, lengths
+
+
+def calculate_levenshtein_distances(search_string, strings,
+                                    max_distance=None, encoded=None):
+    """
+    Compute the levenshtein distance from search_string to each of strings
+    in one vectorized pass.  Myers' bit-parallel algorithm is run on every
+    string at once, one column of the code point matrix per step, with the
+    pattern bit vectors held in 64-bit words.  Search strings longer than 64
+    symbols fall back to LevenshteinPattern.  Requires NumPy.
+
+    With max_distance, strings whose length differs from that of
+    search_string by more than max_distance are left out of the pass, and
+    the columns beyond the longest remaining string are skipped.
+
+    Parameters
+    ----------
+    search_string : str
+        string to calculate distances from
+    strings : list
+        strings to calculate distances to
+    max_distance : int
+        optional largest distance of interest
+    encoded : tuple
+        optional (matrix, lengths) returned by encode_strings(strings), to
+        save encoding strings again
+
+    Return value
+    ------------
+    score : numpy.ndarray
+        levenshtein distances, with max_distance + 1 in place of distances
+        greater than max_distance if it is given
+    """
+    if len(search_string) > 64:
+        pattern = LevenshteinPattern(search_string)
+        return numpy.array([pattern.distance(string, max_distance)
+                            for string in strings], dtype=numpy.int64)
+    matrix, lengths = encoded if encoded is not None else \
+        encode_strings(strings)
+    if max_distance is not None:
+        near = numpy.abs(lengths - len(search_string)) <= max_distance
+        score = numpy.full(len(lengths), max_distance + 1,
+                           dtype=numpy.int64)
+        if near.any():
+            lengths = lengths[near]
+            matrix = matrix[near, :int(lengths.max())]
+            score[near] = numpy.minimum(calculate_levenshtein_distances(
+                search_string, None, encoded=(matrix, lengths)),
+                max_distance + 1)
+        return score
+    if not search_string:
+        return lengths
+
+    # Pattern symbols in code point order, with the bit mask of each
+    symbols = sorted(set(search_string))
+    codes = numpy.array([ord(symbol) for symbol in symbols],
+                        dtype=numpy.uint32)
+    masks = numpy.zeros(len(symbols), dtype=numpy.uint64)
+    for position, symbol in enumerate(search_string):
+        masks[symbols.index(symbol)] |= numpy.uint64(1 << position)
+
+    one = numpy.uint64(1)
+    all_bits = numpy.uint64((1 << len(search_string)) - 1)
+    last_bit = numpy.uint64(1 << (len(search_string) - 1))
+    positive = numpy.full(len(lengths), all_bits, dtype=numpy.uint64)
+    negative = numpy.zeros(len(lengths), dtype=numpy.uint64)
+    score = numpy.full(len(lengths), len(search_string), dtype=numpy.int64)
+    for column in range(matrix.shape[1]):
+        symbol = matrix[:, column]
+        index = numpy.minimum(numpy.searchsorted(codes, symbol),
+                              len(codes) - 1)
+        matches = numpy.where(codes[index] == symbol, masks[index],
+                              numpy.uint64(0))
+        vertical = matches | negative
+        horizontal = ((((matches & positive) + positive) & all_bits) ^
+                      positive) | matches
+        horizontal_positive = negative | (~(horizontal | positive) &
+                                          all_bits)
+        horizontal_negative = positive & horizontal
+        # Columns past the end of a string leave its score unchanged
+        active = column < lengths
+        score += active & ((horizontal_positive & last_bit) != 0)
+        score -= active & ((horizontal_negative & last_bit) != 0)
+        horizontal_positive = ((horizontal_positive << one) | one) & all_bits
+        horizontal_negative = (horizontal_negative << one) & all_bits
+        positive = horizontal_negative | (~(vertical | horizontal_positive) &
+                                          all_bits)
+        negative = horizontal_positive & vertical
+
+    return score
+
+
+def calculate_hamming_distances(search_string, strings):
+    """
+    Count the positions at which search_string and each of strings differ.
+    Positions past the end of the shorter string count as differing, so
+    strings of other lengths are at least their length difference away.
+    Requires NumPy.
+
+    Parameters
+    ----------
+    search_string : str
+        string to calculate distances from
+    strings : list
+        strings to calculate distances to
+
+    Return value
+    ------------
+    hamming : numpy.ndarray
+        number of differing positions
+    """
+    matrix, lengths = encode_strings(strings)
+    query, query_length = encode_strings([search_string])
+    width = min(matrix.shape[1], query.shape[1])
+    shorter = numpy.minimum(lengths, query_length)
+    common = numpy.arange(width) < shorter[:, None]
+    mismatches = (matrix[:, :width] != query[:, :width]) & common
+    return mismatches.sum(axis=1) + numpy.abs(lengths - query_length)
+
+
+def _count_shared_q_grams_many(search_string, strings, q_value):
+    """
+    Count the q-grams of search_string, the q-grams of each of strings and
+    the q-grams each of them shares with search_string, with every q-gram
+    identified by its q code points.
+    """
+    matrix, lengths = encode_strings(list(strings) + [search_string])
+    totals = numpy.maximum(lengths - q_value + 1, 0)
+    windows = max(matrix.shape[1] - q_value + 1, 0)
+    rows, starts = numpy.nonzero(numpy.arange(windows) < totals[:, None])
+    q_grams = matrix[rows[:, None], starts[:, None] + numpy.arange(q_value)]
+    if q_value <= 3:
+        # Code points have at most 21 bits, so up to three fit in one int64
+        packed = numpy.zeros(len(q_grams), dtype=numpy.int64)
+        for position in range(q_value):
+            packed = (packed << 21) | q_grams[:, position]
+        q_gram_ids = numpy.unique(packed, return_inverse=True)[1]
+    else:
+        q_gram_ids = numpy.unique(q_grams, axis=0, return_inverse=True)[1]
+    q_gram_ids = q_gram_ids.reshape(-1)
+
+    # Search string q-grams are the last rows; number the distinct ones
+    is_query = rows == len(strings)
+    query_ids, query_counts = numpy.unique(q_gram_ids[is_query],
+                                           return_counts=True)
+    local_ids = numpy.full(len(q_grams), -1, dtype=numpy.int64)
+    local_ids[query_ids] = numpy.arange(len(query_ids))
+    candidate_ids = local_ids[q_gram_ids[~is_query]]
+    candidate_rows = rows[~is_query]
+    shared = candidate_ids >= 0
+    counts = numpy.bincount(
+        candidate_rows[shared] * len(query_ids) + candidate_ids[shared],
+        minlength=len(strings) * len(query_ids))
+    counts = counts.reshape(len(strings), len(query_ids))
+    q_gram_counts = numpy.minimum(counts, query_counts).sum(axis=1)
+    return totals[-1], totals[:-1], q_gram_counts
+
+
+def calculate_q_gram_distances(search_string, strings, q_value=2):
+    """
+    Calculate the q-gram distance from search_string to each of strings in
+    one vectorized pass.  Requires NumPy.
+
+    Parameters
+    ----------
+    search_string : str
+        string to calculate distances from
+    strings : list
+        strings to calculate distances to
+    q_value : int
+        size of q-gram window
+
+    Return value
+    ------------
+    q_gram_distance : numpy.ndarray
+        q-gram distances
+    """
+    query_total, totals, q_gram_counts = _count_shared_q_grams_many(
+        search_string, strings, q_value)
+    return query_total + totals - 2 * q_gram_counts
+
+
+def calculate_jaccard_distances(search_string, strings, q_value=2):
+    """
+    Calculate the Jaccard distance from search_string to each of strings in
+    one vectorized pass.  Requires NumPy.
+
+    Parameters
+    ----------
+    search_string : str
+        string to calculate distances from
+    strings : list
+        strings to calculate distances to
+    q_value : int
+        size of q-gram window
+
+    Return value
+    ------------
+    jaccard_distance : numpy.ndarray
+        jaccard distances
+    """
+    query_total, totals, q_gram_counts = _count_shared_q_grams_many(
+        search_string, strings, q_value)
+    observed_q_gram = query_total + totals - q_gram_counts
+    return numpy.where(observed_q_gram > 0,
+                       1 - q_gram_counts / numpy.maximum(observed_q_gram, 1),
+                       0.0)
+
+
+# --- Distance Memoization
+
+class DistanceMemo:
+    """
+    Memoizing wrapper around a string distance function
+
+    Calling the memo computes function(string1, string2, *args) once per
+    distinct set of arguments and returns the stored value afterwards.  For
+    symmetric metrics the order of the two strings is ignored.  When maxsize
+    is set, only that many distances are kept, evicting the least recently
+    used; otherwise the memo grows without bound, which suits a scratch memo
+    discarded after one query.  hits counts the distance calls saved.
+    """
+    def __init__(self, function=None, maxsize=None, symmetric=True):
+        self.function = function
+        self.maxsize = maxsize
+        self.symmetric = symmetric
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __call__(self, string1, string2, *args):
+        distance = self.get(string1, string2, *args)
+        if distance is None:
+            distance = self.function(string1, string2, *args)
+            self.put(string1, string2, distance, *args)
+        return distance
+
+    def key(self, string1, string2, *args):
+        """
+        Get memo key for distance between string1 and string2.
+        """
+        if self.symmetric and string2 < string1:
+            string1, string2 = string2, string1
+        return (string1, string2) + args
+
+    def get(self, string1, string2, *args):
+        """
+        Get memoized distance between string1 and string2, or None if it
+        has not been stored.
+        """
+        key = self.key(string1, string2, *args)
+        distance = self.entries.get(key)
+        if distance is None:
+            self.misses += 1
+            return None
+        if self.maxsize is not None:
+            self.entries.move_to_end(key)
+        self.hits += 1
+        return distance
+
+    def put(self, string1, string2, distance, *args):
+        """
+        Store distance between string1 and string2.
+        """
+        key = self.key(string1, string2, *args)
+        self.entries[key] = distance
+        if self.maxsize is not None:
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all memoized distances and reset hit and miss counters.
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,78 @@
+"""
+Unit tests for 'bkasync.AsyncBKIndex'
+"""
+# --- Imports
+
+# Standard library
+import asyncio
+
+# BKTree
+from bkasync import AsyncBKIndex
+from bktree import BKTree
+from bktrie import TrieIndex
+
+
+# --- Test Suites
+
+def test_coalesced_search():
+    """
+    Test that concurrent searches are coalesced and batched.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+    search_strings = ['tne'] * 5 + ['eight', 'ffff', 'ter']
+    tree = BKTree(string_list)
+    expected_searches = [tree.search(search_string, 2)
+                         for search_string in search_strings]
+    expected_nearest = [tree.nearest_neighbors(search_string)
+                        for search_string in search_strings]
+
+    async def run():
+        async with AsyncBKIndex(tree) as index:
+            searches = await asyncio.gather(*[
+                index.search(search_string, 2)
+                for search_string in search_strings])
+            nearest = await asyncio.gather(*[
+                index.nearest_neighbors(search_string)
+                for search_string in search_strings])
+            await index.update(['tnee'])
+            updated = await index.search('tne', 1)
+            return index, searches, nearest, updated
+
+    # --- Exercise functionality
+    index, searches, nearest, updated = asyncio.run(run())
+
+    # --- Check results
+    assert searches == expected_searches
+    assert nearest == expected_nearest
+    assert searches[0] is not searches[1]
+    assert index.coalesced == 8
+    assert index.batches == 3
+    assert updated == ['one', 'tnee']
+    assert index.count() == len(string_list) + 1
+
+
+def test_backpressure():
+    """
+    Test waiting for and shedding searches beyond the pending limit.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five']
+    tree = TrieIndex(string_list)
+
+    async def run(max_waiting):
+        async with AsyncBKIndex(tree, max_pending=1, batch_size=1,
+                                max_waiting=max_waiting) as index:
+            return await asyncio.gather(
+                index.search('one', 1), index.search('twa', 1),
+                index.search('three', 0), return_exceptions=True)
+
+    # --- Exercise functionality
+    waited = asyncio.run(run(None))
+    shed = asyncio.run(run(1))
+
+    # --- Check results
+    assert waited == [['one'], ['two'], ['three']]
+    assert shed[:2] == [['one'], ['two']]
+    assert isinstance(shed[2], asyncio.QueueFull)
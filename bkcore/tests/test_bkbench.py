@@ -0,0 +1,115 @@
+"""
+Unit tests for 'bkbench'
+"""
+# --- Imports
+
+# Standard library
+import json
+
+# External packages
+import pytest
+
+# BKTree
+from bkbench import KERNELS
+from bkbench import generate_corpus
+from bkbench import generate_queries
+from bkbench import kernel_calls
+from bkbench import main
+from bkbench import summarize
+from strdistlib import DistanceMemo
+
+
+# --- Test Suites
+
+def test_generate_corpus():
+    """
+    Test that synthetic corpora are reproducible and follow their
+    distributions.
+    """
+    # --- Exercise functionality
+    corpus1 = generate_corpus(500, min_length=3, max_length=9,
+                              alphabet='abcd', seed=1)
+    corpus2 = generate_corpus(500, min_length=3, max_length=9,
+                              alphabet='abcd', seed=1)
+    zipf_corpus = generate_corpus(500, alphabet='abcd',
+                                  length_distribution='normal',
+                                  symbol_distribution='zipf', seed=1)
+    queries = generate_queries(corpus1, 20, max_edits=2, seed=1)
+
+    # --- Check results
+    assert corpus1 == corpus2
+    assert len(corpus1) == 500
+    assert all(3 <= len(string) <= 9 for string in corpus1)
+    assert set(''.join(corpus1)) == set('abcd')
+    symbols = ''.join(zipf_corpus)
+    assert symbols.count('a') > 2 * symbols.count('d')
+    assert len(queries) == 20
+    assert queries == generate_queries(corpus1, 20, max_edits=2, seed=1)
+    with pytest.raises(ValueError):
+        generate_corpus(10, length_distribution='bimodal')
+
+
+def test_summarize():
+    """
+    Test nearest-rank percentiles of latencies.
+    """
+    # --- Exercise functionality
+    summary = summarize([float(value) for value in range(100, 0, -1)])
+
+    # --- Check results
+    assert summary['count'] == 100
+    assert summary['p50'] == 50.0
+    assert summary['p90'] == 90.0
+    assert summary['p99'] == 99.0
+    assert summary['max'] == 100.0
+    assert summary['mean'] == 50.5
+
+
+def test_kernel_calls_memo():
+    """
+    Test that every run of the DistanceMemo kernel starts with an empty
+    memo.
+    """
+    # --- Preparations
+    memos = []
+
+    def create_memo(function):
+        memo = DistanceMemo(function)
+        memos.append(memo)
+        return memo
+
+    # --- Exercise functionality
+    calls, pairs = kernel_calls('memo', create_memo,
+                                ['one', 'two', 'three', 'four'])
+    calls()
+    calls()
+
+    # --- Check results
+    assert pairs == 4
+    assert len(memos) == 2
+    assert [len(memo) for memo in memos] == [4, 4]
+
+
+def test_main(tmpdir):
+    """
+    Test command line benchmark run with JSON output.
+    """
+    # --- Preparations
+    path = str(tmpdir.join('results.json'))
+
+    # --- Exercise functionality
+    main(['--sizes', '200', '300', '--queries', '5', '--thresholds', '1',
+          '--kernel-strings', '50', '--output', path])
+    with open(path) as results_file:
+        results = json.load(results_file)
+
+    # --- Check results
+    assert [corpus['size'] for corpus in results['corpora']] == [200, 300]
+    for corpus in results['corpora']:
+        assert corpus['build']['nodes'] <= corpus['size']
+        assert corpus['build']['bytes_per_node'] > 0
+        assert sorted(corpus['search']) == ['bk_nearest_neighbor_search',
+                                            'bk_search_1']
+        assert corpus['search']['bk_search_1']['count'] == 5
+    assert sorted(results['kernels']) == sorted(KERNELS)
+    assert results['parameters']['seed'] == 0
@@ -0,0 +1,75 @@
+"""
+Unit tests for 'bkdeletion'
+"""
+# --- Imports
+
+# External packages
+import pytest
+
+# BKTree
+from bkdeletion import DeletionIndex
+from bkdeletion import generate_deletions
+from bktree import BKTree
+from bktree import bk_iter_search
+from bktree import bk_search
+
+
+# --- Test Suites
+
+def test_generate_deletions():
+    """
+    Test deletion neighborhoods of strings.
+    """
+    # --- Exercise functionality and check results
+    assert generate_deletions('abc', 0) == {'abc'}
+    assert generate_deletions('abc', 1) == {'abc', 'bc', 'ac', 'ab'}
+    assert generate_deletions('aab', 2) == {'aab', 'ab', 'aa', 'a', 'b'}
+    assert generate_deletions('', 2) == {''}
+
+
+def test_deletion_search():
+    """
+    Test deletion index searches against tree searches.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten', 'seventeen', 'seventy', 'one', '']
+    search_strings = ['eight', 'ter', 'sevnteen', 'ffff', '', 'onee',
+                      'seventeenth']
+    tree = BKTree(string_list)
+
+    for prefix_length in [None, 3, 7]:
+        # --- Exercise functionality
+        index = DeletionIndex(string_list[:5], max_distance=2,
+                              prefix_length=prefix_length)
+        index.update(string_list[5:])
+
+        # --- Check results
+        assert index.count() == len(set(string_list))
+        for search_string in search_strings:
+            for threshold in range(3):
+                assert sorted(bk_search(search_string, index,
+                                        threshold)[1:]) == \
+                    sorted(bk_search(search_string, tree, threshold)[1:])
+        assert list(bk_iter_search('sevnteen', index, 2)) == \
+            [('seventeen', 1)]
+        assert index.nearest_neighbors('onee') == (1, ['one'])
+        assert index.nearest_neighbors('zzzzzz') == (None, [])
+        assert index.k_nearest_neighbors('tan', 2) == [('ten', 1),
+                                                       ('two', 2)]
+
+
+def test_deletion_limits():
+    """
+    Test that deletion indexes reject thresholds beyond their maximum
+    distance and metrics other than levenshtein distance.
+    """
+    # --- Preparations
+    index = DeletionIndex(['one', 'two'], max_distance=1)
+
+    # --- Exercise functionality and check results
+    assert index.search('on', 1) == ['one']
+    with pytest.raises(ValueError):
+        index.search('on', 2)
+    with pytest.raises(ValueError):
+        DeletionIndex(['abc'], metric='jaccard')
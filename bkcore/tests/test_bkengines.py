@@ -0,0 +1,98 @@
+"""
+Unit tests for 'bkengines'
+"""
+# --- Imports
+
+# Standard library
+import random
+
+# External packages
+import pytest
+
+# BKTree
+from bkengines import ENGINES
+from bkengines import METRIC_ENGINES
+from bkengines import count_distance_calls
+from bkengines import create_index
+from bkmetrics import METRICS
+from bkpivot import PivotTable
+from bktree import BKTree
+from bktree import bk_iter_search
+from bktree import bk_nearest_neighbor_search
+from bktree import bk_search
+from strdistlib import calculate_levenshtein_distance
+
+
+# --- Test Suites
+
+def test_engines():
+    """
+    Test that every engine returns the same matches as a brute-force
+    search.
+    """
+    # --- Preparations
+    generator = random.Random(7)
+    string_list = [''.join(generator.choice('abcd')
+                           for position in range(generator.randint(1, 6)))
+                   for string in range(200)]
+    search_strings = string_list[:10] + ['', 'zzzz']
+
+    for engine in ENGINES:
+        # --- Exercise functionality
+        options = {'max_distance': 6} if engine == 'deletion' else {}
+        index = create_index(string_list[:100], engine, **options)
+        index.update(string_list[100:])
+
+        # --- Check results
+        assert index.count() == len(set(string_list))
+        for search_string in search_strings:
+            distances = {string: calculate_levenshtein_distance(
+                string, search_string) for string in string_list}
+            for threshold in range(4):
+                assert sorted(bk_search(search_string, index,
+                                        threshold)[1:]) == \
+                    sorted(string for string, distance in distances.items()
+                           if distance <= threshold)
+            nearest = bk_nearest_neighbor_search(search_string, index)
+            assert nearest[0] == min(distances.values())
+            assert sorted(nearest[1:]) == sorted(
+                string for string, distance in distances.items()
+                if distance == nearest[0])
+            assert [distance for string, distance in
+                    index.k_nearest_neighbors(search_string, 5)] == \
+                sorted(distances.values())[:5]
+            assert list(bk_iter_search(search_string, index, 2, limit=3)) \
+                == list(bk_iter_search(search_string, index, 2))[:3]
+
+
+def test_unknown_engine():
+    """
+    Test engine name validation and the default engine.
+    """
+    # --- Exercise functionality and check results
+    with pytest.raises(ValueError):
+        create_index(['abc'], 'no_such_engine')
+    assert isinstance(create_index(['abc']), BKTree)
+
+
+def test_count_distance_calls():
+    """
+    Test distance call counts of the engines.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+    pivot_table = PivotTable(string_list)
+    metrics = dict(METRICS)
+
+    # --- Exercise functionality
+    calls = count_distance_calls(string_list, ['tne', 'four'], 1)
+
+    # --- Check results
+    assert sorted(calls) == sorted(METRIC_ENGINES)
+    assert calls['pivot_table'][0] == len(pivot_table.pivots) * len(
+        string_list) - len(pivot_table.pivots)
+    for build_calls, search_calls, matches in calls.values():
+        assert 0 < search_calls <= 2 * len(string_list)
+        assert matches == 2
+    assert METRICS == metrics
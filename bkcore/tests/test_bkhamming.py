@@ -0,0 +1,78 @@
+"""
+Unit tests for 'bkhamming.HammingIndex'
+"""
+# --- Imports
+
+# Standard library
+import random
+
+# BKTree
+from bkhamming import HammingIndex
+from bktree import bk_search
+from bktree import bk_iter_search
+from bktree import bk_nearest_neighbor_search
+from strdistlib import count_hamming_mismatches
+
+
+# --- Test Suites
+
+def test_length_partitions():
+    """
+    Test that strings of each length are searched separately.
+    """
+    # --- Preparations
+    string_list = ['karolin', 'kathrin', 'kerstin', '1011101', '1001001',
+                   'abc', 'abd', 'xyz', 'karolin', '']
+
+    # --- Exercise functionality
+    index = HammingIndex(string_list)
+    result1 = bk_search('karolin', index, 3)
+    result2 = bk_search('abc', index, 1)
+    result3 = bk_search('toolongstring', index, 20)
+    result4 = bk_nearest_neighbor_search('aaa', index)
+    result5 = index.nearest_neighbors('four')
+    result6 = index.k_nearest_neighbors('1011100', 2)
+
+    # --- Check results
+    assert index.count() == 9
+    assert sorted(index.partitions) == [0, 3, 7]
+    assert sorted(result1[1:]) == ['karolin', 'kathrin', 'kerstin']
+    assert sorted(result2[1:]) == ['abc', 'abd']
+    assert result3 == [20]
+    assert result4[0] == 2
+    assert sorted(result4[1:]) == ['abc', 'abd']
+    assert result5 == (None, [])
+    assert result6 == [('1011101', 1), ('1001001', 3)]
+
+
+def test_multi_index():
+    """
+    Test pigeonhole multi-index search of fixed-length codes.
+    """
+    # --- Preparations
+    generator = random.Random(4)
+    codes = [''.join(generator.choice('ACGT') for position in range(12))
+             for code in range(500)]
+    search_strings = codes[:20] + ['ACGTACGTACGT']
+
+    # --- Exercise functionality
+    index = HammingIndex(codes, segments=4)
+    plain_index = HammingIndex(codes)
+
+    # --- Check results
+    assert index.segment_bounds(12) == [(0, 3), (3, 6), (6, 9), (9, 12)]
+    for search_string in search_strings:
+        for threshold in range(6):
+            expected = sorted(set(
+                code for code in codes
+                if count_hamming_mismatches(code,
+                                            search_string) <= threshold))
+            assert sorted(index.search(search_string, threshold)) == \
+                expected
+            assert sorted(plain_index.search(search_string,
+                                             threshold)) == expected
+            assert [(string, count_hamming_mismatches(string,
+                                                      search_string))
+                    for string in index.search(search_string,
+                                               threshold)] == \
+                list(bk_iter_search(search_string, index, threshold))
@@ -0,0 +1,91 @@
+"""
+Unit tests for 'bkmetrics'
+"""
+# --- Imports
+
+# External packages
+import pytest
+
+# BKTree
+from bkmetrics import METRICS
+from bkmetrics import get_metric
+from bkmetrics import register_metric
+from bktree import BKTree
+from strdistlib import calculate_levenshtein_distance
+from strdistlib import calculate_q_gram_distance
+
+
+# --- Test Suites
+
+def test_builtin_metrics():
+    """
+    Test capabilities and kernels of the built-in metrics.
+    """
+    # --- Preparations
+    levenshtein = get_metric('levenshtein')
+    q_gram = get_metric('q_gram')
+
+    # --- Exercise functionality
+    query = levenshtein.query('kitten')
+    q_gram_query = q_gram.query('abcde', q_value=3)
+
+    # --- Check results
+    assert levenshtein.triangle_inequality
+    assert not get_metric('lcs').triangle_inequality
+    assert not get_metric('hamming').triangle_inequality
+    assert levenshtein.distance('kitten', 'sitting') == 3
+    assert query('sitting', None) == 3
+    assert query('sitting', 1) == 2
+    assert q_gram.parameters == ('q_value',)
+    assert q_gram_query(q_gram.profile('abdcde', 3), None) == \
+        calculate_q_gram_distance('abcde', 'abdcde', 3)
+    assert levenshtein.batch('kitten', ['sitting', 'kitten', '']) == \
+        [3, 0, 6]
+    with pytest.raises(ValueError):
+        get_metric('no_such_metric')
+
+
+def test_register_metric():
+    """
+    Test that trees use the fastest kernels of a registered metric.
+    """
+    # --- Preparations
+    calls = {'kernel': 0, 'bounded': 0, 'batch': 0}
+
+    def kernel(string1, string2):
+        calls['kernel'] += 1
+        return calculate_levenshtein_distance(string1, string2)
+
+    def bounded_kernel(string1, string2, max_distance):
+        calls['bounded'] += 1
+        return min(calculate_levenshtein_distance(string1, string2),
+                   max_distance + 1)
+
+    def batch_kernel(search_string, strings, max_distance):
+        calls['batch'] += 1
+        return [calculate_levenshtein_distance(search_string, string)
+                for string in strings]
+
+    string_list = ['book', 'books', 'cake', 'boo', 'boon', 'cook', 'cape',
+                   'cart']
+
+    # --- Exercise functionality
+    metric = register_metric('counted', kernel,
+                             bounded_kernel=bounded_kernel,
+                             batch_kernel=batch_kernel)
+    try:
+        tree = BKTree(string_list, metric='counted')
+        reference = BKTree(string_list)
+        insertion_calls = calls['kernel']
+        result = tree.search('bok', 1)
+        distances = metric.batch('bok', string_list)
+    finally:
+        del METRICS['counted']
+
+    # --- Check results
+    assert insertion_calls > 0
+    assert calls['bounded'] > 0
+    assert calls['batch'] == 1
+    assert result == reference.search('bok', 1)
+    assert distances == [calculate_levenshtein_distance('bok', string)
+                         for string in string_list]
@@ -27,6 +27,7 @@ def test_node_creation():
     # --- Check results
     assert node1.string == string
     assert node1.children == {}
+    assert node1.edges == []
     assert node1.parent is None
 
     assert node2.string == string2
@@ -59,9 +60,9 @@ def test_add_child():
     string2 = 'test_string2'
     string3 = 'test_string3'
     string4 = 'test_string_4'
-    stringdist1 = str(calculate_levenshtein_distance(string, string2))
-    stringdist2 = str(calculate_levenshtein_distance(string2, string3))
-    stringdist3 = str(calculate_levenshtein_distance(string, string4))
+    stringdist1 = calculate_levenshtein_distance(string, string2)
+    stringdist2 = calculate_levenshtein_distance(string2, string3)
+    stringdist3 = calculate_levenshtein_distance(string, string4)
     node1 = BKNode(string)
 
     # --- Exercise functionality
@@ -82,6 +83,29 @@ def test_add_child():
     assert stringdist3 in node1.children
     assert isinstance(node1.children[stringdist3], BKNode)
     assert node1.children[stringdist3].string == string4
+    assert node1.edges == sorted([stringdist1, stringdist3])
+    assert node1.children[stringdist1].edges == [stringdist2]
+
+
+def test_edges_in_range():
+    """
+    Test BKNode edges_in_range method.
+    """
+    # --- Preparations
+    root_node = BKNode('')
+    for string in ['aaaa', 'a', 'aaaaaaa', 'aa', 'aaaaa']:
+        root_node.add_child(string)
+
+    # --- Exercise functionality
+    result1 = root_node.edges_in_range(2, 5)
+    result2 = root_node.edges_in_range(-3, 0)
+    result3 = root_node.edges_in_range(0, 100)
+
+    # --- Check results
+    assert root_node.edges == [1, 2, 4, 5, 7]
+    assert result1 == [2, 4, 5]
+    assert result2 == []
+    assert result3 == [1, 2, 4, 5, 7]
 
 
 def test_list_children():
@@ -173,3 +197,62 @@ def test_recursive_nn_search():
     assert len(search3) == 1
     for string in search3[10][1:]:
         assert string in string_list
+
+
+def test_iterative_search():
+    """
+    Test BKNode iterative_search method.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+    root_node = BKNode('start')
+    for string in string_list:
+        root_node.add_child(string)
+    search_strings = ['ont', 'ten', 'nomatchstring', 'ffff']
+
+    # --- Exercise functionality and check results
+    for search_string in search_strings:
+        for threshold in [0, 1, 3, 10]:
+            recursive = []
+            iterative = []
+            root_node.recursive_search(search_string, threshold, recursive,
+                                       'levenshtein')
+            root_node.iterative_search(search_string, threshold, iterative,
+                                       'levenshtein')
+            assert iterative == recursive
+
+
+def test_iterative_nn_search():
+    """
+    Test BKNode iterative_nn_search method.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+    root_node = BKNode('start')
+    for string in string_list:
+        root_node.add_child(string)
+    search_string1 = 'tenr'
+    search_string2 = 'ten'
+    search_string3 = 'ffff'
+    threshold1 = calculate_levenshtein_distance(search_string1, 'start')
+    threshold2 = calculate_levenshtein_distance(search_string2, 'start')
+    threshold3 = calculate_levenshtein_distance(search_string3, 'start')
+    search1 = {}
+    search2 = {}
+    search3 = {}
+
+    # --- Exercise functionality
+    root_node.iterative_nn_search(search_string1, threshold1,
+                                  search1, 'levenshtein')
+    root_node.iterative_nn_search(search_string2, threshold2,
+                                  search2, 'levenshtein')
+    root_node.iterative_nn_search(search_string3, threshold3,
+                                  search3, 'levenshtein')
+
+    # --- Check results
+    assert search1 == {1: ['ten']}
+    assert search2 == {0: ['ten']}
+    assert len(search3) == 1
+    assert sorted(search3[3]) == ['five', 'four']
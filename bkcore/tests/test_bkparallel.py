@@ -0,0 +1,109 @@
+"""
+Unit tests for 'bkparallel.BKSearchPool' and 'bkparallel.build_tree'
+"""
+# --- Imports
+
+# External packages
+import pytest
+
+# BKTree
+from bktree import BKTree
+from bktree import FrozenBKTree
+from bktree import bk_search
+from bktree import bk_nearest_neighbor_search
+
+# Parallel search
+from bkparallel import BKSearchPool
+from bkparallel import build_tree
+
+
+# --- Test Suites
+
+def test_parallel_search():
+    """
+    Test BKSearchPool searches against sequential searches.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten', 'eleven', 'twelve', 'thirteen',
+                   'fourteen', 'fifteen', 'sixteen', 'seventeen']
+    search_strings = ['eight', 'ter', '123456789', 'ffff', 'sixten']
+    tree = BKTree(string_list)
+    frozen = tree.compile()
+
+    # --- Exercise functionality and check results
+    with BKSearchPool(tree, processes=2) as pool:
+        assert str(pool) == str(tree)
+        assert pool.count() == tree.count()
+        for search_string in search_strings:
+            for threshold in [0, 1, 3, 10]:
+                assert bk_search(search_string, pool, threshold) == \
+                    bk_search(search_string, frozen, threshold)
+            result = bk_nearest_neighbor_search(search_string, pool)
+            expected = bk_nearest_neighbor_search(search_string, frozen)
+            assert result[0] == expected[0]
+            assert sorted(result[1:]) == sorted(expected[1:])
+
+
+def test_parallel_search_mapped(tmpdir):
+    """
+    Test BKSearchPool on a memory-mapped index file.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+    tree = BKTree(string_list)
+    path = str(tmpdir.join('tree.bk'))
+    tree.save(path)
+    loaded = FrozenBKTree.load(path)
+
+    # --- Exercise functionality
+    with BKSearchPool(loaded, processes=2) as pool:
+        search1 = bk_search('ffff', pool, 3)
+        search2 = bk_nearest_neighbor_search('ter', pool)
+
+    # --- Check results
+    assert search1 == bk_search('ffff', tree, 3)
+    assert search2 == [1, 'ten']
+    loaded.close()
+
+
+def test_build_tree(tmpdir):
+    """
+    Test parallel tree construction against sequential insertion.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten', 'one', 'eleven', 'twelve',
+                   'thirteen', 'fourteen', 'fifteen', 'sixteen']
+    path = tmpdir.join('strings.txt')
+    path.write('\n'.join(string_list) + '\n')
+
+    for metric in ['levenshtein', 'q_gram']:
+        expected = BKTree(string_list, metric=metric)
+
+        # --- Exercise functionality
+        tree1 = build_tree(string_list, metric=metric, processes=2,
+                           chunk_size=3)
+        with open(str(path)) as string_file:
+            tree2 = build_tree(string_file, metric=metric, processes=2)
+
+        # --- Check results
+        for tree in [tree1, tree2]:
+            assert tree.count() == expected.count()
+            assert tree.count() == len(set(string_list))
+            assert tree.metric == metric
+            assert tree.compile().edges == expected.compile().edges
+            assert tree.compile().buffer == expected.compile().buffer
+            assert bk_search('ffff', tree, 3) == \
+                bk_search('ffff', expected, 3)
+
+    # --- Exercise functionality
+    tree3 = build_tree([], processes=1)
+
+    # --- Check results
+    assert str(tree3) == ''
+
+    # --- Exercise functionality and check results
+    with pytest.raises(ValueError):
+        build_tree(['one', 'three', 'seven'], metric='hamming', processes=1)
@@ -0,0 +1,51 @@
+"""
+Unit tests for 'bkpivot'
+"""
+# --- Imports
+
+# External packages
+import pytest
+
+# BKTree
+from bkpivot import PivotTable
+from bkpivot import VPTree
+from strdistlib import calculate_levenshtein_distance
+
+
+# --- Test Suites
+
+def test_search():
+    """
+    Test that vantage-point trees and pivot tables return the same matches
+    as a brute-force search.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+
+    for index in [VPTree(string_list), PivotTable(string_list, pivots=3)]:
+        for search_string in ['tne', 'four', 'zzzzzz']:
+            # --- Exercise functionality
+            matches = index.search(search_string, 2)
+
+            # --- Check results
+            assert sorted(matches) == sorted(
+                string for string in string_list
+                if calculate_levenshtein_distance(string,
+                                                  search_string) <= 2)
+
+
+def test_empty_engines():
+    """
+    Test searches of engines without strings and metric validation.
+    """
+    # --- Exercise functionality and check results
+    for engine_class in [VPTree, PivotTable]:
+        index = engine_class()
+        assert index.count() == 0
+        assert str(index) == ''
+        assert index.search('abc', 3) == []
+        assert index.nearest_neighbors('abc') == (None, [])
+        assert index.k_nearest_neighbors('abc', 2) == []
+        with pytest.raises(ValueError):
+            engine_class(['abc'], metric='lcs')
@@ -3,10 +3,19 @@ Unit tests for 'bktree.BK_Search' and 'bktree.BK_Nearest_Neighbor_Search'
 """
 # --- Imports
 
+# Standard library
+import sys
+
 # BKTree
+from bkmetrics import METRICS
+from bkmetrics import register_metric
 from bktree import BKTree
 from bktree import bk_search
+from bktree import bk_iter_search
 from bktree import bk_nearest_neighbor_search
+from bktree import bk_knn_search
+from bktree import bk_search_many
+from bktree import bk_nearest_neighbor_search_many
 
 
 # --- Test Suites
@@ -81,3 +90,151 @@ def test_bk_nearest_neighbor_search():
     assert search4[0] == 3
     for value in search4[1:]:
         assert value in ['five', 'four']
+
+
+def test_deep_tree_search():
+    """
+    Test searches on a tree deeper than the interpreter recursion limit.
+    """
+    # --- Preparations
+    # Single distinct characters are all at distance 1 from each other, so
+    # every insertion descends one level further than the previous one.
+    depth = sys.getrecursionlimit() + 100
+    string_list = [chr(0x4e00 + i) for i in range(depth)]
+    tree = BKTree(string_list)
+
+    # --- Exercise functionality
+    search1 = bk_search(string_list[-1], tree, 0)
+    search2 = bk_search('', tree, 1)
+    search3 = bk_nearest_neighbor_search(string_list[-1] + 'x', tree)
+
+    # --- Check results
+    assert search1 == [0, string_list[-1]]
+    assert len(search2) == depth + 1
+    assert search3 == [1, string_list[-1]]
+
+
+def test_bk_search_many():
+    """
+    Test BK_Search_Many function against BK_Search.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+    search_strings = ['eight', '123456789', 'ffff', 'ont', 'ten', '',
+                      'eight']
+    tree = BKTree(string_list)
+    trees = [tree, tree.compile(), BKTree(string_list, metric='q_gram')]
+
+    # --- Exercise functionality and check results
+    for searched_tree in trees:
+        for threshold in [0, 1, 3, 10]:
+            results = bk_search_many(search_strings, searched_tree,
+                                     threshold)
+            assert len(results) == len(search_strings)
+            for search_string, result in zip(search_strings, results):
+                assert result == bk_search(search_string, searched_tree,
+                                           threshold)
+    assert bk_search_many([], tree, 1) == []
+
+
+def test_bk_nearest_neighbor_search_many():
+    """
+    Test BK_Nearest_Neighbor_Search_Many function against
+    BK_Nearest_Neighbor_Search.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+    search_strings = ['eight', 'ter', '123456789', 'ffff', '', 'ter']
+    tree = BKTree(string_list)
+    trees = [tree, tree.compile(), BKTree(string_list, metric='q_gram')]
+
+    # --- Exercise functionality and check results
+    for searched_tree in trees:
+        results = bk_nearest_neighbor_search_many(search_strings,
+                                                  searched_tree)
+        assert len(results) == len(search_strings)
+        for search_string, result in zip(search_strings, results):
+            expected = bk_nearest_neighbor_search(search_string,
+                                                  searched_tree)
+            assert result[0] == expected[0]
+            assert sorted(result[1:]) == sorted(expected[1:])
+
+
+def test_bk_knn_search():
+    """
+    Test BK_KNN_Search function.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+    tree = BKTree(string_list)
+    trees = [tree, tree.compile()]
+
+    for searched_tree in trees:
+        # --- Exercise functionality
+        search1 = bk_knn_search('eight', searched_tree, 1)
+        search2 = bk_knn_search('ter', searched_tree, 3)
+        search3 = bk_knn_search('ffff', searched_tree, 20)
+        search4 = bk_knn_search('ffff', searched_tree, 0)
+
+        # --- Check results
+        assert search1 == [('eight', 0)]
+        assert search2[:2] == [('ten', 1), ('two', 2)]
+        assert search2[2][1] == 3
+        assert len(search3) == len(string_list)
+        assert sorted(string for string, distance in search3) == \
+            sorted(string_list)
+        assert [distance for string, distance in search3] == \
+            sorted(distance for string, distance in search3)
+        assert sorted(string for string, distance in search3[:2]) == \
+            ['five', 'four']
+        assert search4 == []
+
+
+def test_bk_iter_search():
+    """
+    Test BK_Iter_Search function.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+    tree = BKTree(string_list)
+    trees = [tree, tree.compile(), BKTree(string_list, leaf_size=4)]
+    calls = [0]
+
+    def kernel(string1, string2):
+        calls[0] += 1
+        return abs(len(string1) - len(string2))
+
+    for searched_tree in trees:
+        # --- Exercise functionality
+        search1 = list(bk_iter_search('ter', searched_tree, 3))
+        search2 = list(bk_iter_search('ter', searched_tree, 3, limit=2))
+        search3 = list(bk_iter_search('ter', searched_tree, 3, limit=0))
+
+        # --- Check results
+        assert [string for string, distance in search1] == \
+            bk_search('ter', searched_tree, 3)[1:]
+        assert ('ten', 1) in search1
+        assert search2 == search1[:2]
+        assert search3 == []
+
+    # --- Exercise functionality
+    register_metric('counted_length', kernel)
+    try:
+        length_tree = BKTree([str(number) for number in range(1000)],
+                             metric='counted_length')
+        calls[0] = 0
+        first = list(bk_iter_search('000', length_tree, 0, limit=1))
+        limited_calls = calls[0]
+        calls[0] = 0
+        full = list(bk_iter_search('000', length_tree, 0))
+    finally:
+        del METRICS['counted_length']
+
+    # --- Check results
+    assert first == [('100', 0)]
+    assert len(full) == 900
+    assert limited_calls < calls[0]
@@ -3,9 +3,23 @@ Unit tests for 'bktree.BKTree'
 """
 # --- Imports
 
+# Standard library
+import random
+
+# External packages
+import pytest
+
 # BKTree
+from bkmetrics import Metric
 from bktree import BKNode
 from bktree import BKTree
+from bktree import FrozenBKTree
+from bktree import LeafBucket
+from bktree import QueryCache
+from bktree import bk_search
+from bktree import bk_nearest_neighbor_search
+from bktree import bk_knn_search
+from bktree import bk_search_many
 
 
 # --- Test Suites
@@ -109,3 +123,548 @@ def test_update():
     assert tree.count() == len(string_list) + len(update_string_list)
     assert tree_alt.count() == \
         len(string_list) + len(update_string_list) + 1
+
+
+def test_compile():
+    """
+    Test BKTree compile method.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten', 'élan']
+    tree = BKTree(string_list)
+
+    removed_tree = BKTree(['cb', 'x'])
+    removed_tree.remove('cb')
+    removed_tree.remove('x')
+
+    # --- Exercise functionality
+    frozen = tree.compile()
+    removed_frozen = removed_tree.compile()
+
+    # --- Check results
+    assert isinstance(frozen, FrozenBKTree)
+    assert str(frozen) == str(tree)
+    assert removed_frozen.count() == 0
+    assert bk_search('c', removed_frozen, 1) == [1]
+    assert removed_frozen.nearest_neighbors('c') == (None, [])
+    assert removed_frozen.k_nearest_neighbors('c', 2) == []
+    assert removed_frozen.search_many(['c'], 1) == [[]]
+    assert frozen.count() == tree.count()
+    assert len(frozen.edges) == len(string_list)
+    assert len(frozen.offsets) == len(string_list) + 1
+    assert sorted(frozen.string(index) for index in
+                  range(len(string_list))) == sorted(string_list)
+    assert frozen.edges[0] == 0
+    for index in range(len(string_list)):
+        child = frozen.first_child[index]
+        node_edges = []
+        while child != -1:
+            node_edges.append(frozen.edges[child])
+            child = frozen.next_sibling[child]
+        assert node_edges == sorted(node_edges)
+        assert frozen.max_edge(index) == max(node_edges, default=0)
+        assert [frozen.edges[child] for child in
+                frozen.children_in_range(index, 2, 4)] == \
+            [edge for edge in node_edges if 2 <= edge <= 4]
+    assert frozen.profiles is None
+    q_gram_tree = BKTree(string_list, metric='q_gram')
+    assert q_gram_tree.compile().profiles[0] == q_gram_tree.root.profile
+
+
+def test_compile_tombstones():
+    """
+    Test that compiling a BKTree with tombstones leaves them in the tree.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+    tree = BKTree(string_list)
+    compacted_tree = BKTree(string_list)
+    for string in ['one', 'three', 'five']:
+        tree.remove(string)
+        compacted_tree.remove(string)
+    compacted_tree.compact()
+
+    # --- Exercise functionality
+    frozen = tree.compile()
+    expected = compacted_tree.compile()
+
+    # --- Check results
+    assert tree.tombstones == {'one', 'three', 'five'}
+    assert tree.root.string == 'one'
+    assert tree.root.deleted
+    assert frozen.count() == 7
+    assert frozen.buffer == expected.buffer
+    assert frozen.edges == expected.edges
+    assert sorted(frozen.search('tne', 2)) == ['nine', 'ten', 'two']
+
+
+def test_compiled_search():
+    """
+    Test searches on a compiled tree against the source tree.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+    tree = BKTree(string_list)
+    frozen = tree.compile()
+    search_strings = ['eight', 'ter', '123456789', 'ffff', '']
+
+    # --- Exercise functionality and check results
+    for search_string in search_strings:
+        for threshold in [0, 1, 3, 10]:
+            assert bk_search(search_string, frozen, threshold) == \
+                bk_search(search_string, tree, threshold)
+        expected = bk_nearest_neighbor_search(search_string, tree)
+        result = bk_nearest_neighbor_search(search_string, frozen)
+        assert result[0] == expected[0]
+        assert sorted(result[1:]) == sorted(expected[1:])
+
+
+def test_leaf_buckets():
+    """
+    Test searches on a tree storing small subtrees as leaf buckets.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten', 'eleven', 'twelve']
+    tree = BKTree(string_list)
+    search_strings = ['eight', 'ter', '123456789', 'ffff', '']
+
+    # --- Exercise functionality
+    bucket_tree = BKTree(string_list[:3], leaf_size=3)
+    bucket_root = [record.string for record in bucket_tree.root.bucket]
+    bucket_distances = list(bucket_tree.root.bucket.distances)
+    bucket_tree.update(string_list[3:])
+    frozen = bucket_tree.compile()
+
+    # --- Check results
+    assert bucket_root == ['two', 'three']
+    assert bucket_distances == [3, 4]
+    assert bucket_tree.root.bucket is None
+    assert frozen.count() == tree.count()
+    for search_string in search_strings:
+        for threshold in [0, 1, 3, 10]:
+            expected = sorted(tree.search(search_string, threshold))
+            assert sorted(bucket_tree.search(search_string,
+                                             threshold)) == expected
+            assert sorted(frozen.search(search_string, threshold)) == \
+                expected
+        distance, matches = bucket_tree.nearest_neighbors(search_string)
+        expected = tree.nearest_neighbors(search_string)
+        assert distance == expected[0]
+        assert sorted(matches) == sorted(expected[1])
+        assert [string_distance for string, string_distance in
+                bucket_tree.k_nearest_neighbors(search_string, 4)] == \
+            [string_distance for string, string_distance in
+             tree.k_nearest_neighbors(search_string, 4)]
+
+
+def test_leaf_bucket_batch(monkeypatch):
+    """
+    Test that batched scans of leaf buckets match scalar scans.
+    """
+    # --- Preparations
+    pytest.importorskip('numpy')
+    generator = random.Random(5)
+    string_list = [''.join(generator.choice('abcd')
+                           for position in range(generator.randint(1, 8)))
+                   for string in range(300)]
+    search_strings = string_list[:5] + ['', 'abcdabcdabcd']
+
+    for metric in ['levenshtein', 'q_gram']:
+        tree = BKTree(string_list, metric=metric, leaf_size=1000)
+        expected = {}
+        for search_string in search_strings:
+            expected[search_string] = (
+                [sorted(tree.search(search_string, threshold))
+                 for threshold in range(4)],
+                tree.nearest_neighbors(search_string)[0],
+                [string_distance for string, string_distance in
+                 tree.k_nearest_neighbors(search_string, 5)])
+
+        # --- Exercise functionality
+        monkeypatch.setattr(LeafBucket, 'batch_minimum', 1)
+        results = {}
+        for search_string in search_strings:
+            results[search_string] = (
+                [sorted(tree.search(search_string, threshold))
+                 for threshold in range(4)],
+                tree.nearest_neighbors(search_string)[0],
+                [string_distance for string, string_distance in
+                 tree.k_nearest_neighbors(search_string, 5)])
+        monkeypatch.undo()
+
+        # --- Check results
+        assert len(tree.root.bucket) == len(set(string_list)) - 1
+        assert results == expected
+        if metric == 'levenshtein':
+            assert tree.root.bucket.encoded is not None
+        else:
+            assert tree.root.bucket.encoded is None
+
+
+def test_prefilter():
+    """
+    Test searches on a tree with lower bound prefilters.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten', 'twentyseven', 'seventeen']
+    tree = BKTree(string_list)
+    search_strings = ['eight', 'ter', '123456789', 'ffff', '']
+
+    # --- Exercise functionality
+    filtered_tree = BKTree(string_list, prefilter=True)
+
+    # --- Check results
+    assert filtered_tree.root.signatures == (3, {'o': 1, 'n': 1, 'e': 1})
+    assert tree.root.signatures is None
+    for search_string in search_strings:
+        for threshold in [0, 1, 3]:
+            assert filtered_tree.search(search_string, threshold) == \
+                tree.search(search_string, threshold)
+        assert filtered_tree.nearest_neighbors(search_string) == \
+            tree.nearest_neighbors(search_string)
+    assert filtered_tree.filter_counts['length'] > 0
+    assert filtered_tree.filter_counts['histogram'] > 0
+    assert tree.filter_counts == {}
+
+
+def test_metric_error():
+    """
+    Test that metric errors are not stored as edge weights.
+    """
+    # --- Preparations
+    string_list = ['karolin', 'kathrin', 'abc']
+
+    # --- Exercise functionality and check results
+    with pytest.raises(ValueError):
+        BKTree(string_list, metric='hamming')
+    with pytest.raises(ValueError):
+        BKTree(string_list, metric='hamming_mismatch')
+
+
+def test_remove():
+    """
+    Test BKTree remove method.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+    tree = BKTree(string_list, cache_size=10)
+
+    # --- Exercise functionality
+    before = tree.search('tne', 2)
+    removed1 = tree.remove('one')
+    removed2 = tree.remove('one')
+    removed3 = tree.remove('eleven')
+    tree.remove('nine')
+    after = tree.search('tne', 2)
+    nearest = tree.nearest_neighbors('one')
+
+    # --- Check results
+    assert sorted(before) == ['nine', 'one', 'ten', 'two']
+    assert removed1
+    assert not removed2
+    assert not removed3
+    assert sorted(after) == ['ten', 'two']
+    assert tree.root.string == 'one'
+    assert tree.root.deleted
+    assert tree.tombstones == {'one', 'nine'}
+    assert nearest[0] == 3
+    assert tree.k_nearest_neighbors('nine', 1) == [('five', 2)]
+    tree.update(['one'])
+    assert not tree.root.deleted
+    assert tree.tombstones == {'nine'}
+    assert sorted(tree.search('tne', 2)) == ['one', 'ten', 'two']
+
+
+def test_compact():
+    """
+    Test BKTree compact method and automatic compaction.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+    tree = BKTree(string_list)
+    auto_tree = BKTree(string_list, compact_threshold=0.25)
+    for string in ['one', 'three', 'five']:
+        tree.remove(string)
+        auto_tree.remove(string)
+
+    # --- Exercise functionality
+    removed = tree.compact()
+    auto_tombstones = set(auto_tree.tombstones)
+    auto_tree.remove('seven')
+    for string in string_list:
+        tree.remove(string)
+    empty_removed = tree.compact()
+    frozen = tree.compile()
+
+    # --- Check results
+    assert removed == 3
+    assert tree.root.string == 'nine'
+    assert tree.tombstones == {'nine'}
+    assert tree.search('one', 10) == []
+    assert tree.nearest_neighbors('one') == (None, [])
+    assert empty_removed == 6
+    assert frozen.count() == 0
+    assert frozen.search('nine', 10) == []
+    assert frozen.nearest_neighbors('nine') == (None, [])
+    assert auto_tombstones == set()
+    assert auto_tree.tombstones == {'seven'}
+    assert sorted(auto_tree.search('one', 10)) == [
+        'eight', 'four', 'nine', 'six', 'ten', 'two']
+
+
+def test_payloads():
+    """
+    Test duplicate counting and searches returning payloads.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'one', 'three', 'four', 'two', 'one']
+    record_ids = list(range(len(string_list)))
+
+    # --- Exercise functionality
+    tree = BKTree(string_list, payloads=record_ids)
+    bucket_tree = BKTree(string_list[:2], leaf_size=2,
+                         payloads=record_ids[:2])
+    bucket_tree.update(string_list[2:], record_ids[2:])
+    tree.update(['five'])
+    matches = tree.search('onr', 1, payloads=True)
+    bucket_matches = bucket_tree.search('onr', 1, payloads=True)
+    closest = tree.k_nearest_neighbors('twa', 2, payloads=True)
+    cached_tree = BKTree(string_list, payloads=record_ids, cache_size=10)
+    for search in range(2):
+        cached_tree.search('onr', 1, payloads=True)[0][2].append('junk')
+        cached_tree.k_nearest_neighbors('onr', 1,
+                                        payloads=True)[0][2].append('junk')
+    tree.remove('one')
+    tree.compact()
+
+    # --- Check results
+    assert bucket_tree.root.bucket is None
+    assert matches == [('one', 1, [0, 2, 6])]
+    assert bucket_matches == matches
+    assert closest == [('two', 1, [1, 5]), ('one', 3, [0, 2, 6])]
+    assert cached_tree.search('onr', 1, payloads=True) == matches
+    assert cached_tree.k_nearest_neighbors('onr', 1, payloads=True) == \
+        matches
+    assert cached_tree.cache.hits == 4
+    assert tree.count() == 4
+    assert tree.search('five', 0, payloads=True) == [('five', 0, [])]
+    assert tree.search('two', 0, payloads=True) == [('two', 0, [1, 5])]
+    assert tree.search('one', 0) == []
+    with pytest.raises(ValueError):
+        tree.update(['six'], [])
+
+
+def test_save_load(tmpdir):
+    """
+    Test BKTree save and FrozenBKTree load methods.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten', 'élan']
+    tree = BKTree(string_list)
+    path = str(tmpdir.join('tree.bk'))
+    search_strings = ['eight', 'ter', '123456789', 'ffff', 'elan']
+
+    # --- Exercise functionality
+    tree.save(path)
+    loaded = FrozenBKTree.load(path)
+
+    # --- Check results
+    assert loaded.metric == tree.metric
+    assert loaded.q_value == tree.q_value
+    assert loaded.count() == tree.count()
+    assert str(loaded) == str(tree)
+    for search_string in search_strings:
+        for threshold in [0, 1, 3]:
+            assert bk_search(search_string, loaded, threshold) == \
+                bk_search(search_string, tree, threshold)
+        assert bk_nearest_neighbor_search(search_string, loaded) == \
+            bk_nearest_neighbor_search(search_string, tree.compile())
+    resaved_path = str(tmpdir.join('resaved.bk'))
+    loaded.save(resaved_path)
+    resaved = FrozenBKTree.load(resaved_path)
+    assert resaved.search('ter', 3) == loaded.search('ter', 3)
+    resaved.close()
+    loaded.close()
+    assert loaded.mapping is None
+
+
+def test_load_invalid(tmpdir):
+    """
+    Test FrozenBKTree load method on files that are not index files.
+    """
+    # --- Preparations
+    path = tmpdir.join('invalid.bk')
+    path.write_binary(b'not an index file at all, but long enough')
+    truncated_path = tmpdir.join('truncated.bk')
+    BKTree(['one', 'two', 'three']).save(str(truncated_path))
+    truncated_path.write_binary(truncated_path.read_binary()[:-16])
+
+    # --- Exercise functionality and check results
+    with pytest.raises(ValueError):
+        FrozenBKTree.load(str(path))
+    with pytest.raises(ValueError):
+        FrozenBKTree.load(str(truncated_path))
+
+
+def test_q_gram_tree():
+    """
+    Test BKTree construction and searches with q-gram profile metrics.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten', 'abab', 'baba', 'a', 'b']
+    search_strings = ['eight', 'ter', 'aba', 'seventeen', '']
+
+    for metric, thresholds in [('q_gram', [0, 1, 2, 4]),
+                               ('jaccard', [0, 0.5, 0.9])]:
+        for q_value in [1, 2, 3]:
+            # --- Exercise functionality
+            tree = BKTree(string_list, metric=metric, q_value=q_value)
+            frozen = tree.compile()
+
+            # --- Check results
+            assert tree.q_value == frozen.q_value == q_value
+            for search_string in search_strings:
+                distances = dict(
+                    (string, BKNode.distance_metric[metric](
+                        string, search_string, q_value))
+                    for string in string_list)
+                for threshold in thresholds:
+                    expected = sorted(string for string in string_list
+                                      if distances[string] <= threshold)
+                    assert sorted(bk_search(search_string, tree,
+                                            threshold)[1:]) == expected
+                    assert sorted(bk_search(search_string, frozen,
+                                            threshold)[1:]) == expected
+                nearest = min(distances.values())
+                expected = sorted(string for string in string_list
+                                  if distances[string] == nearest)
+                for searched_tree in [tree, frozen]:
+                    result = bk_nearest_neighbor_search(search_string,
+                                                        searched_tree)
+                    assert result[0] == nearest
+                    assert sorted(result[1:]) == expected
+
+
+def test_query_cache():
+    """
+    Test QueryCache least-recently-used eviction and invalidation.
+    """
+    # --- Preparations
+    cache = QueryCache(2)
+
+    # --- Exercise functionality
+    cache.put('a', 1)
+    cache.put('b', 2)
+    result1 = cache.get('a')
+    cache.put('c', 3)
+    result2 = cache.get('b')
+    result3 = cache.get('c')
+    cache.invalidate()
+    result4 = cache.get('a')
+
+    # --- Check results
+    assert result1 == 1
+    assert result2 is None
+    assert result3 == 3
+    assert result4 is None
+    assert len(cache) == 1
+    assert cache.hits == 2
+    assert cache.misses == 2
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.hits == cache.misses == 0
+
+
+def test_cached_search():
+    """
+    Test searches on a BKTree with a result cache.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+    tree = BKTree(string_list, cache_size=16)
+    uncached_tree = BKTree(string_list)
+
+    # --- Exercise functionality
+    search1 = bk_search('ffff', tree, 3)
+    search2 = bk_search('ffff', tree, 3)
+    search2.append('modified')
+    search3 = bk_search('ffff', tree, 3)
+    search4 = bk_nearest_neighbor_search('ter', tree)
+    search5 = bk_nearest_neighbor_search('ter', tree)
+    search6 = bk_knn_search('ter', tree, 2)
+    search7 = bk_search_many(['ffff', 'fife'], tree, 3)
+
+    # --- Check results
+    assert search1 == search3 == bk_search('ffff', uncached_tree, 3)
+    assert search4 == search5 == [1, 'ten']
+    assert search6 == bk_knn_search('ter', uncached_tree, 2)
+    assert search7 == bk_search_many(['ffff', 'fife'], uncached_tree, 3)
+    assert tree.cache.hits == 4
+    assert tree.cache.misses == 4
+
+    # --- Exercise functionality
+    tree.update(['fffff'])
+    search8 = bk_search('ffff', tree, 3)
+
+    # --- Check results
+    assert search8 == search1 + ['fffff']
+    assert tree.cache.misses == 5
+    assert uncached_tree.cache is None
+
+
+def test_distance_memo():
+    """
+    Test searches on a BKTree with memoized distances.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten']
+    tree = BKTree(string_list, distance_cache_size=100)
+    uncached_tree = BKTree(string_list)
+
+    # --- Exercise functionality
+    search1 = bk_nearest_neighbor_search('ffff', tree)
+    hits1 = tree.distance_memo.hits
+    search2 = bk_search('ffff', tree, 3)
+    hits2 = tree.distance_memo.hits
+
+    # --- Check results
+    assert search1 == bk_nearest_neighbor_search('ffff', uncached_tree)
+    assert search2 == bk_search('ffff', uncached_tree, 3)
+    assert hits1 == 0
+    assert hits2 > 0
+    assert uncached_tree.distance_memo is None
+
+
+def test_asymmetric_distance_memo():
+    """
+    Test that memoized distances of an asymmetric metric are not reused
+    with the strings swapped.
+    """
+    # --- Preparations
+    def count_missing(string1, string2):
+        return sum(1 for symbol in string1 if symbol not in string2)
+
+    metric = Metric('missing', count_missing, triangle_inequality=False,
+                    symmetric=False)
+    tree = BKTree(['ab', 'abc'], metric=metric, distance_cache_size=100)
+    uncached_tree = BKTree(['ab', 'abc'], metric=metric)
+
+    # --- Exercise functionality
+    search1 = tree.search('abc', 1)
+    search2 = tree.search('ab', 0)
+
+    # --- Check results
+    assert search1 == uncached_tree.search('abc', 1)
+    assert search2 == uncached_tree.search('ab', 0) == ['ab']
+    assert not tree.distance_memo.symmetric
@@ -0,0 +1,60 @@
+"""
+Unit tests for 'bktrie.TrieIndex'
+"""
+# --- Imports
+
+# External packages
+import pytest
+
+# BKTree
+from bktree import BKTree
+from bktree import bk_iter_search
+from bktree import bk_search
+from bktrie import TrieIndex
+
+
+# --- Test Suites
+
+def test_trie_search():
+    """
+    Test trie searches against tree searches.
+    """
+    # --- Preparations
+    string_list = ['one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                   'eight', 'nine', 'ten', 'one', '', 'on']
+    search_strings = ['eight', 'ter', '123456789', 'ffff', '', 'onee']
+    tree = BKTree(string_list)
+
+    # --- Exercise functionality
+    index = TrieIndex(string_list[:5])
+    index.update(string_list[5:])
+
+    # --- Check results
+    assert index.count() == len(set(string_list))
+    assert index.search('eight') == ['eight']
+    assert list(bk_iter_search('onee', index, 1)) == [('one', 1)]
+    assert index.search('on', 1) == ['on', 'one']
+    for search_string in search_strings:
+        for threshold in range(5):
+            assert sorted(bk_search(search_string, index,
+                                    threshold)[1:]) == \
+                sorted(bk_search(search_string, tree, threshold)[1:])
+        distance, matches = index.nearest_neighbors(search_string)
+        assert distance == tree.nearest_neighbors(search_string)[0]
+        assert sorted(matches) == \
+            sorted(tree.nearest_neighbors(search_string)[1])
+        assert [distance for string, distance in
+                index.k_nearest_neighbors(search_string, 3)] == \
+            [distance for string, distance in
+             tree.k_nearest_neighbors(search_string, 3)]
+
+
+def test_trie_metric():
+    """
+    Test that tries reject metrics other than levenshtein distance.
+    """
+    # --- Exercise functionality and check results
+    with pytest.raises(ValueError):
+        TrieIndex(['abc'], metric='q_gram')
+    assert TrieIndex().nearest_neighbors('abc') == (None, [])
+    assert TrieIndex().k_nearest_neighbors('abc', 2) == []
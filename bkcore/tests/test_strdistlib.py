@@ -3,13 +3,32 @@ Unit tests for string distance algorithms in 'strdistlib'
 """
 # --- Imports
 
+# External packages
+import pytest
+
 # String distance metrics
 from strdistlib import calculate_levenshtein_distance
+from strdistlib import calculate_bounded_levenshtein_distance
+from strdistlib import calculate_bit_parallel_levenshtein_distance
+from strdistlib import LevenshteinPattern
+from strdistlib import generate_symbol_histogram
+from strdistlib import calculate_histogram_lower_bound
 from strdistlib import calculate_lc_substring_length
 from strdistlib import calculate_hamming_distance
+from strdistlib import count_hamming_mismatches
 from strdistlib import generate_q_gram_matrix
 from strdistlib import calculate_q_gram_distance
 from strdistlib import calculate_jaccard_distance
+from strdistlib import generate_q_gram_profile
+from strdistlib import count_shared_q_grams
+from strdistlib import calculate_q_gram_profile_distance
+from strdistlib import calculate_jaccard_profile_distance
+from strdistlib import encode_strings
+from strdistlib import calculate_levenshtein_distances
+from strdistlib import calculate_hamming_distances
+from strdistlib import calculate_q_gram_distances
+from strdistlib import calculate_jaccard_distances
+from strdistlib import DistanceMemo
 
 
 # --- Test Suites
@@ -46,6 +65,124 @@ def test_levenshtein_distance():
     assert result9 == 3 == len(string_list[12]) == len(string_list[13])
 
 
+def test_bounded_levenshtein_distance():
+    """
+    Test calculations for bounded levenshtein distance.
+    """
+    # --- Preparations
+    string_list = ['kitten', 'sitting', 'flaw', 'lawn', 'Saturday', 'Sunday',
+                   'GUMBO', 'GAMBOL', 'levensthein', 'meilenstein', '',
+                   '123456789', 'abc', 'ABC']
+
+    # --- Exercise functionality and check results
+    for string1 in string_list:
+        for string2 in string_list:
+            distance = calculate_levenshtein_distance(string1, string2)
+            for max_distance in range(0, 12):
+                result = calculate_bounded_levenshtein_distance(
+                    string1, string2, max_distance)
+                if distance <= max_distance:
+                    assert result == distance
+                else:
+                    assert result == max_distance + 1
+
+    # --- Exercise functionality
+    result1 = calculate_bounded_levenshtein_distance('kitten', 'sitting', 3)
+    result2 = calculate_bounded_levenshtein_distance('kitten', 'sitting', 2)
+    result3 = calculate_bounded_levenshtein_distance('', '123456789', 4)
+
+    # --- Check results
+    assert result1 == 3
+    assert result2 == 3
+    assert result3 == 5
+
+
+def test_bit_parallel_levenshtein_distance():
+    """
+    Test calculations for bit-parallel levenshtein distance.
+    """
+    # --- Preparations
+    string_list = ['kitten', 'sitting', 'flaw', 'lawn', 'Saturday', 'Sunday',
+                   'GUMBO', 'GAMBOL', 'levensthein', 'meilenstein', '',
+                   '123456789', 'abc', 'ABC', 'a' * 70 + 'b', 'b' + 'a' * 75]
+
+    # --- Exercise functionality and check results
+    for string1 in string_list:
+        for string2 in string_list:
+            assert calculate_bit_parallel_levenshtein_distance(
+                string1, string2) == \
+                calculate_levenshtein_distance(string1, string2)
+
+
+def test_levenshtein_pattern():
+    """
+    Test reuse and cutoff of precomputed levenshtein pattern.
+    """
+    # --- Preparations
+    string_list = ['kitten', 'sitting', 'flaw', 'lawn', 'Saturday', 'Sunday',
+                   'GUMBO', 'GAMBOL', '', '123456789']
+    pattern = LevenshteinPattern('sitting')
+
+    # --- Exercise functionality and check results
+    assert pattern.masks['t'] == 0b0001100
+    for string in string_list:
+        distance = calculate_levenshtein_distance('sitting', string)
+        assert pattern.distance(string) == distance
+        for max_distance in range(0, 10):
+            result = pattern.distance(string, max_distance)
+            if distance <= max_distance:
+                assert result == distance
+            else:
+                assert result == max_distance + 1
+
+
+def test_hamming_mismatches():
+    """
+    Test counting of hamming mismatches.
+    """
+    # --- Preparations
+    string_list = ['karolin', 'kathrin', '1011101', '1001001', '']
+
+    # --- Exercise functionality
+    result1 = count_hamming_mismatches(string_list[0], string_list[1])
+    result2 = count_hamming_mismatches(string_list[2], string_list[3])
+    result3 = count_hamming_mismatches(string_list[4], string_list[4])
+
+    # --- Check results
+    assert result1 == 3
+    assert result2 == 2
+    assert result3 == 0
+    with pytest.raises(ValueError):
+        count_hamming_mismatches(string_list[0], string_list[4])
+
+
+def test_histogram_lower_bound():
+    """
+    Test symbol histogram lower bound on levenshtein distance.
+    """
+    # --- Preparations
+    string_list = ['kitten', 'sitting', 'flaw', 'lawn', 'Saturday', 'Sunday',
+                   'GUMBO', 'GAMBOL', 'levensthein', 'meilenstein', '',
+                   '123456789', 'abc', 'ABC', 'aaaa', 'aa']
+    histograms = [generate_symbol_histogram(string)
+                  for string in string_list]
+
+    # --- Exercise functionality
+    result1 = calculate_histogram_lower_bound(histograms[0], histograms[1])
+    result2 = calculate_histogram_lower_bound(histograms[14], histograms[15])
+    result3 = calculate_histogram_lower_bound(histograms[12], histograms[13])
+
+    # --- Check results
+    assert result1 == 3
+    assert result2 == 2
+    assert result3 == 3
+    for string1, histogram1 in zip(string_list, histograms):
+        for string2, histogram2 in zip(string_list, histograms):
+            assert calculate_histogram_lower_bound(histogram1,
+                                                   histogram2) <= \
+                calculate_levenshtein_distance(string1, string2)
+
+
 def test_lc_substring_length():
     """
     Test calculations for longest common substring length.
@@ -127,6 +264,55 @@ def test_generate_q_gram_matrix():
     assert result3 == 'Error: q_value larger than string length'
 
 
+def test_generate_q_gram_profile():
+    """
+    Test generation of q-gram profiles.
+    """
+    # --- Preparations
+    string1 = 'abcde'
+    string2 = 'aaaa'
+
+    # --- Exercise functionality
+    result1 = generate_q_gram_profile(string1, 2)
+    result2 = generate_q_gram_profile(string2, 2)
+    result3 = generate_q_gram_profile(string1, 99)
+
+    # --- Check results
+    assert result1 == {'ab': 1, 'bc': 1, 'cd': 1, 'de': 1}
+    assert result2 == {'aa': 3}
+    assert not result3
+
+
+def test_q_gram_profile_distance():
+    """
+    Test q-gram distances computed from q-gram profiles.
+    """
+    # --- Preparations
+    profile1 = generate_q_gram_profile('abcde', 2)
+    profile2 = generate_q_gram_profile('abdcde', 2)
+    profile3 = generate_q_gram_profile('aaaa', 2)
+    profile4 = generate_q_gram_profile('aa', 2)
+    profile5 = generate_q_gram_profile('', 2)
+
+    # --- Exercise functionality
+    result1 = count_shared_q_grams(profile1, profile2)
+    result2 = count_shared_q_grams(profile3, profile4)
+    result3 = calculate_q_gram_profile_distance(profile1, profile2)
+    result4 = calculate_q_gram_profile_distance(profile3, profile4)
+    result5 = calculate_jaccard_profile_distance(profile1, profile2)
+    result6 = calculate_jaccard_profile_distance(profile3, profile4)
+    result7 = calculate_jaccard_profile_distance(profile5, profile5)
+
+    # --- Check results
+    assert result1 == 3
+    assert result2 == 1
+    assert result3 == 3
+    assert result4 == 2
+    assert result5 == 0.5
+    assert abs(result6 - (1 - 1.0 / 3)) < 1e-12
+    assert result7 == 0.0
+
+
 def test_q_gram_distance():
     """
     Test calculations for q-gram distance.
@@ -137,9 +323,13 @@ def test_q_gram_distance():
 
     # --- Exercise functionality
     result1 = calculate_q_gram_distance(string1, string2, 2)
+    result2 = calculate_q_gram_distance('aaaa', 'aa', 2)
+    result3 = calculate_q_gram_distance(string1, string2)
 
     # --- Check results
     assert result1 == 3
+    assert result2 == 2
+    assert result3 == result1
 
 
 def test_jaccard_distance():
@@ -155,3 +345,105 @@ def test_jaccard_distance():
 
     # --- Check results
     assert result1 == 0.5
+
+
+def test_distance_memo():
+    """
+    Test memoization of string distance calculations.
+    """
+    # --- Preparations
+    memo = DistanceMemo(calculate_levenshtein_distance, maxsize=2)
+    asymmetric_memo = DistanceMemo(calculate_q_gram_distance,
+                                   symmetric=False)
+
+    # --- Exercise functionality
+    result1 = memo('kitten', 'sitting')
+    result2 = memo('sitting', 'kitten')
+    result3 = memo('flaw', 'lawn')
+    result4 = memo('abc', 'ABC')
+    result5 = memo.get('kitten', 'sitting')
+    result6 = asymmetric_memo('abcde', 'abdcde', 2)
+    result7 = asymmetric_memo('abdcde', 'abcde', 2)
+    result8 = asymmetric_memo('abcde', 'abdcde', 3)
+
+    # --- Check results
+    assert result1 == result2 == 3
+    assert result3 == 2
+    assert result4 == 3
+    assert result5 is None
+    assert len(memo) == 2
+    assert memo.hits == 1
+    assert memo.misses == 4
+    assert result6 == result7 == 3
+    assert result8 == calculate_q_gram_distance('abcde', 'abdcde', 3)
+    assert asymmetric_memo.hits == 0
+    assert len(asymmetric_memo) == 3
+    memo.clear()
+    assert len(memo) == 0
+    assert memo.hits == memo.misses == 0
+
+
+def test_encode_strings():
+    """
+    Test encoding of strings as a padded code point matrix.
+    """
+    # --- Preparations
+    pytest.importorskip('numpy')
+    string_list = ['ab', '', 'caf\xe9']
+
+    # --- Exercise functionality
+    matrix, lengths = encode_strings(string_list)
+
+    # --- Check results
+    assert matrix.dtype.name == 'uint32'
+    assert matrix.tolist() == [[97, 98, 0, 0], [0, 0, 0, 0],
+                               [99, 97, 102, 233]]
+    assert lengths.tolist() == [2, 0, 4]
+
+
+def test_vectorized_distances():
+    """
+    Test one-to-many distance calculations against the scalar versions.
+    """
+    # --- Preparations
+    pytest.importorskip('numpy')
+    string_list = ['kitten', 'sitting', 'flaw', 'lawn', 'Saturday', 'Sunday',
+                   'GUMBO', 'GAMBOL', 'levensthein', 'meilenstein', '',
+                   '123456789', 'abc', 'ABC', 'aaaa', 'aa']
+    long_string = 'abcdefghij' * 7
+
+    # --- Exercise functionality
+    levenshtein = [calculate_levenshtein_distances(string, string_list)
+                   for string in string_list]
+    levenshtein_long = calculate_levenshtein_distances(long_string,
+                                                       string_list)
+    levenshtein_bounded = calculate_levenshtein_distances(
+        'kitten', string_list, 3, encode_strings(string_list))
+    hamming = calculate_hamming_distances('kitten', string_list)
+    q_gram = [calculate_q_gram_distances(string, string_list, 2)
+              for string in string_list]
+    q_gram_wide = calculate_q_gram_distances('levensthein', string_list, 4)
+    jaccard = calculate_jaccard_distances('aaaa', string_list, 2)
+
+    # --- Check results
+    for string, distances in zip(string_list, levenshtein):
+        assert distances.tolist() == [
+            calculate_levenshtein_distance(string, other)
+            for other in string_list]
+    assert levenshtein_long.tolist() == [
+        calculate_levenshtein_distance(long_string, other)
+        for other in string_list]
+    assert levenshtein_bounded.tolist() == [
+        min(calculate_levenshtein_distance('kitten', other), 4)
+        for other in string_list]
+    assert hamming.tolist()[:3] == [0, 3, 6]
+    for string, distances in zip(string_list, q_gram):
+        assert distances.tolist() == [
+            calculate_q_gram_distance(string, other, 2)
+            for other in string_list]
+    assert q_gram_wide.tolist() == [
+        calculate_q_gram_distance('levensthein', other, 4)
+        for other in string_list]
+    assert jaccard.tolist() == pytest.approx([
+        calculate_jaccard_distance('aaaa', other, 2)
+        for other in string_list])
@@ -25,6 +25,11 @@ TESTING_REQUIREMENTS = [
 DEV_REQUIREMENTS = TESTING_REQUIREMENTS + [
     ]
 
+# Optional vectorized distance kernels
+NUMPY_REQUIREMENTS = [
+    'numpy',
+    ]
+
 
 # --- pytest class
 
@@ -82,6 +87,7 @@ setup(
     tests_require=TESTING_REQUIREMENTS,
     extras_require={
         'dev': DEV_REQUIREMENTS,
+        'numpy': NUMPY_REQUIREMENTS,
         'testing': TESTING_REQUIREMENTS,
     }
 )